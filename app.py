@@ -2,179 +2,3449 @@ from flask import Flask, render_template, send_file, jsonify, request
 import os
 import shutil
 import json
+import re
 import uuid
+import base64
+import bisect
+import threading
+import time
+import select
+import struct
+import ctypes
+import ctypes.util
+import queue
+import collections
+import contextlib
+import sqlite3
+import gzip
+import zlib
+import hashlib
+import mimetypes
+import urllib.request
+import io
+import zipfile
+import multiprocessing
+import concurrent.futures
+import click
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process is always in charge
+    fcntl = None
 from datetime import datetime
 from pathlib import Path
 from werkzeug.utils import secure_filename
-from flask import Flask, render_template, jsonify, request, send_file, redirect
+from werkzeug.security import safe_join
+from werkzeug.urls import url_quote
+from werkzeug.exceptions import HTTPException
+from flask import Flask, render_template, jsonify, request, send_file, redirect, abort, g, has_request_context
+from svg_export_worker import render_svg_export, write_job_record
+
+try:
+    # Optional: rlottie-python (with Pillow) renders posters and hover previews
+    from rlottie_python import LottieAnimation
+except ImportError:
+    LottieAnimation = None
+
+try:
+    # Optional: brotli adds .br variants next to the .gz ones
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    # Optional: boto3 keeps animation files in S3 or an S3-compatible object store
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:
+    boto3 = None
+
+try:
+    # Optional: python-lottie renders frames to SVG for server-side SVG export
+    # (the rendering itself happens in svg_export_worker)
+    from lottie.objects import Animation as LottieDocument
+except ImportError:
+    LottieDocument = None
+
+# The static folder and instance folder can be moved (benchmark.py points them at synthetic catalogs)
+app = Flask(
+    __name__,
+    static_folder=os.environ.get('LOOTBOX_STATIC_FOLDER', 'static'),
+    static_url_path='/static',
+    instance_path=os.path.abspath(os.environ['LOOTBOX_INSTANCE_PATH']) if os.environ.get('LOOTBOX_INSTANCE_PATH') else None
+)
+
+# Background watcher for files dropped into the static folders by hand
+# (set LOOTBOX_WATCH=0 to turn it off)
+app.config['CATALOG_WATCH'] = os.environ.get('LOOTBOX_WATCH', '1') != '0'
+app.config['CATALOG_POLL_INTERVAL'] = float(os.environ.get('LOOTBOX_POLL_INTERVAL', '0.5'))
+
+# Poster frames and hover previews rendered for each animation
+app.config['POSTER_FORMAT'] = 'webp'
+app.config['POSTER_SIZE'] = 320
+app.config['POSTER_FRAME_POSITION'] = 0.5
+app.config['PREVIEW_SIZE'] = 160
+app.config['PREVIEW_FPS'] = 12
+
+# Decimal places kept for floats in the optimized Lottie variant
+app.config['LOTTIE_PRECISION'] = int(os.environ.get('LOOTBOX_LOTTIE_PRECISION', '3'))
+
+# Cache lifetime for asset URLs that carry a content version (?v=<hash>)
+app.config['IMMUTABLE_MAX_AGE'] = 365 * 24 * 3600
+# '' streams files from the app; 'x-sendfile' or 'x-accel-redirect' hands them to the front server
+app.config['SENDFILE_MODE'] = os.environ.get('LOOTBOX_SENDFILE', '').lower()
+app.config['ACCEL_REDIRECT_PREFIX'] = os.environ.get('LOOTBOX_ACCEL_PREFIX', '/_protected/')
+
+# Chunked uploads: size clients are asked to send per request, and the largest file accepted
+app.config['UPLOAD_CHUNK_SIZE'] = 2 * 1024 * 1024
+app.config['UPLOAD_MAX_SIZE'] = int(os.environ.get('LOOTBOX_UPLOAD_MAX_SIZE', str(512 * 1024 * 1024)))
+
+# Staged uploads that are never saved are removed after STAGING_TTL seconds, and
+# the oldest go first once the staging folder outgrows STAGING_QUOTA bytes.
+# STAGING_SESSION_QUOTA caps what a single upload session may hold at once.
+# Chunked uploads that received data within STAGING_ACTIVE_WINDOW seconds are
+# in progress and never removed to make room.
+app.config['STAGING_TTL'] = int(os.environ.get('LOOTBOX_STAGING_TTL', str(24 * 3600)))
+app.config['STAGING_QUOTA'] = int(os.environ.get('LOOTBOX_STAGING_QUOTA', str(2 * 1024 ** 3)))
+app.config['STAGING_SESSION_QUOTA'] = int(os.environ.get('LOOTBOX_STAGING_SESSION_QUOTA', str(1024 ** 3)))
+app.config['STAGING_ACTIVE_WINDOW'] = int(os.environ.get('LOOTBOX_STAGING_ACTIVE_WINDOW', '600'))
+app.config['STAGING_REAP_INTERVAL'] = 60
+
+# SQLite database holding animation metadata (hashtags, dates, file manifests)
+app.config['METADATA_DB'] = os.environ.get('LOOTBOX_METADATA_DB', os.path.join(app.instance_path, 'metadata.db'))
+
+# Where the animation files and metadata of record live: 'local' (the static
+# folder and the metadata database) or 's3', a bucket shared by several app
+# nodes. With s3 the static folder holds each node's copies, the exported media
+# among them kept under STORAGE_CACHE_SIZE bytes, and the leader follows the
+# bucket's change journal every STORAGE_SYNC_INTERVAL seconds. Credentials
+# come from the usual AWS variables.
+app.config['STORAGE'] = os.environ.get('LOOTBOX_STORAGE', 'local')
+app.config['S3_BUCKET'] = os.environ.get('LOOTBOX_S3_BUCKET')
+app.config['S3_PREFIX'] = os.environ.get('LOOTBOX_S3_PREFIX', '')
+# Set for MinIO, Ceph, R2 and other S3-compatible stores
+app.config['S3_ENDPOINT'] = os.environ.get('LOOTBOX_S3_ENDPOINT')
+app.config['STORAGE_CACHE_SIZE'] = int(os.environ.get('LOOTBOX_STORAGE_CACHE_SIZE', str(10 * 1024 ** 3)))
+app.config['STORAGE_SYNC_INTERVAL'] = float(os.environ.get('LOOTBOX_STORAGE_SYNC_INTERVAL', '10'))
+
+# How often each worker process picks up catalog changes made by the others,
+# and how long those changes are kept in the change log
+app.config['CHANGE_POLL_INTERVAL'] = float(os.environ.get('LOOTBOX_CHANGE_POLL_INTERVAL', '0.5'))
+app.config['CHANGE_LOG_RETENTION'] = 3600
+# Whether the leader queues missing derived files for the whole library at startup
+app.config['INGEST_BACKFILL'] = os.environ.get('LOOTBOX_BACKFILL', '1') != '0'
+
+# Cached /api/animations responses: how many are kept, and for how long at most
+app.config['RESPONSE_CACHE_SIZE'] = int(os.environ.get('LOOTBOX_RESPONSE_CACHE_SIZE', '512'))
+app.config['RESPONSE_CACHE_TTL'] = 300
+
+# Request metrics served at /metrics (LOOTBOX_METRICS=0 turns them off). Requests
+# slower than SLOW_REQUEST_THRESHOLD seconds are logged with their spans, and each
+# worker shares its counters with the others every METRICS_SNAPSHOT_INTERVAL seconds.
+app.config['METRICS_ENABLED'] = os.environ.get('LOOTBOX_METRICS', '1') != '0'
+app.config['SLOW_REQUEST_THRESHOLD'] = float(os.environ.get('LOOTBOX_SLOW_REQUEST_THRESHOLD', '1.0'))
+app.config['METRICS_SNAPSHOT_INTERVAL'] = 5
+
+# Server-side SVG export: processes rendering frames, jobs allowed to wait for
+# them, the most frames one job may render, and how large the result cache may grow
+app.config['SVG_EXPORT_WORKERS'] = int(os.environ.get('LOOTBOX_SVG_EXPORT_WORKERS', '2'))
+app.config['SVG_EXPORT_QUEUE_LIMIT'] = 16
+app.config['SVG_EXPORT_MAX_FRAMES'] = 600
+app.config['SVG_EXPORT_CACHE_SIZE'] = int(os.environ.get('LOOTBOX_SVG_EXPORT_CACHE_SIZE', str(1024 ** 3)))
+# A running job that hasn't reported progress for this long is considered dead
+app.config['SVG_EXPORT_TIMEOUT'] = 600
+
+app.config['PAGE_SIZE'] = 12
+# How many grid previews may play at once in the browser; the lightest on screen are picked
+app.config['GRID_PLAYBACK_BUDGET'] = int(os.environ.get('LOOTBOX_GRID_PLAYBACK_BUDGET', '6'))
+app.config['MAX_PAGE_SIZE'] = int(os.environ.get('LOOTBOX_MAX_PAGE_SIZE', '100'))
+
+# Path to store metadata
+META_DIR = os.path.join(app.static_folder, 'metadata')
+# Exported formats stored next to the Lottie JSON, one subfolder each
+MEDIA_FORMATS = ['mp4', 'gif', 'svg']
+os.makedirs(META_DIR, exist_ok=True)
+
+# Uploads in progress, and the content-addressed store uploaded files are linked from
+UPLOAD_DIR = os.path.join(app.static_folder, 'temp_uploads')
+# Results of server-side SVG exports, named by the hash of what was rendered
+EXPORT_DIR = os.path.join(app.static_folder, 'exports')
+BLOB_DIR = os.path.join(app.static_folder, 'blobs')
+ALLOWED_UPLOAD_EXTENSIONS = ['.json', '.gif', '.mp4', '.svg']
+os.makedirs(UPLOAD_DIR, exist_ok=True)
+os.makedirs(BLOB_DIR, exist_ok=True)
+os.makedirs(EXPORT_DIR, exist_ok=True)
+
+# Define animation categories
+CATEGORIES = {
+    'illustrations': 'Illustrations',
+    'loadings': 'Loadings',
+    'logo-animations': 'Logo Animations',
+    'backgrounds': 'Backgrounds',
+    'design-elements': 'Design Elements',
+    'icons': 'Icons'
+}
+
+# Ensure media and metadata directories exist
+for category in CATEGORIES:
+    for media_type in ['lottie', 'mp4', 'gif']:
+        media_dir = os.path.join(app.static_folder, 'animations', category, media_type)
+        os.makedirs(media_dir, exist_ok=True)
+    os.makedirs(os.path.join(META_DIR, category), exist_ok=True)
+
+# Locations of an animation's files on disk
+def lottie_file_path(category, name):
+    """Path of the original Lottie JSON for an animation, or None if it is missing"""
+    animations_dir = os.path.join(app.static_folder, 'animations', category)
+    for file_path in [os.path.join(animations_dir, 'lottie', f'{name}.json'), os.path.join(animations_dir, f'{name}.json')]:
+        if os.path.exists(file_path):
+            return file_path
+    return None
+
+
+def optimized_file_path(category, name):
+    return os.path.join(app.static_folder, 'animations', category, 'optimized', f'{name}.json')
+
+
+def media_file_path(category, name, media_type):
+    """Location of an exported mp4, gif or svg file"""
+    return os.path.join(app.static_folder, 'animations', category, media_type, f'{name}.{media_type}')
+
+
+def poster_paths(category, name):
+    filename = f"{name}.{app.config['POSTER_FORMAT']}"
+    animations_dir = os.path.join(app.static_folder, 'animations', category)
+    return os.path.join(animations_dir, 'poster', filename), os.path.join(animations_dir, 'preview', filename)
+
+
+# Content digests of served files, cached until the file's mtime or size changes.
+# Those of animation files are also kept in the metadata store (file_digests
+# table), so a restart doesn't have to hash the library again.
+file_digests = {}
+
+
+def _persists_digest(file_path):
+    return file_path.startswith(os.path.join(app.static_folder, 'animations') + os.sep)
+
+
+def known_file_digest(file_path, stat=None):
+    """SHA-256 of a file if it has been computed for its current mtime and size, else None"""
+    stat = stat or os.stat(file_path)
+    cached = file_digests.get(file_path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    if _persists_digest(file_path):
+        row = metadata_db().execute('SELECT mtime_ns, size, sha256 FROM file_digests WHERE path = ?',
+                                    (file_path,)).fetchone()
+        if row and (row['mtime_ns'], row['size']) == (stat.st_mtime_ns, stat.st_size):
+            file_digests[file_path] = (stat.st_mtime_ns, stat.st_size, row['sha256'])
+            return row['sha256']
+    return None
+
+
+def file_digest(file_path):
+    """SHA-256 of a file's content, used for strong ETags and versioned URLs"""
+    stat = os.stat(file_path)
+    known = known_file_digest(file_path, stat)
+    if known:
+        return known
+    
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    file_digests[file_path] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+    if _persists_digest(file_path):
+        db = metadata_db()
+        with db:
+            db.execute('INSERT OR REPLACE INTO file_digests (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)',
+                       (file_path, stat.st_mtime_ns, stat.st_size, digest.hexdigest()))
+    return digest.hexdigest()
+
+
+def load_file_digests():
+    """Fill the in-memory digest cache from the metadata store in one query"""
+    for row in metadata_db().execute('SELECT path, mtime_ns, size, sha256 FROM file_digests'):
+        file_digests[row['path']] = (row['mtime_ns'], row['size'], row['sha256'])
+
+
+def versioned_url(url, file_path):
+    """Append the content version so the URL can be cached forever"""
+    return f'{url}?v={file_digest(file_path)[:12]}'
+
+
+# Content-addressed blob store. Uploaded files are kept once under
+# blobs/<aa>/<sha256> and every category/name path shares its blob's storage:
+# as a copy-on-write clone where the filesystem supports it (btrfs, XFS), so
+# editing one file in place leaves the others alone, and as a hard link
+# elsewhere. The app only ever replaces files with os.replace; in-place edits
+# of hard links made by hand are caught by break_shared_links.
+FICLONE = 0x40049409
+# st_dev -> whether that filesystem can clone files
+clone_support = {}
+
+
+def blob_path(digest):
+    return os.path.join(BLOB_DIR, digest[:2], digest)
+
+
+def _clone(source, target):
+    """Make target a copy-on-write clone of source; returns False where that isn't supported"""
+    device = os.stat(os.path.dirname(target)).st_dev
+    if fcntl is None or clone_support.get(device) is False:
+        return False
+    try:
+        with open(source, 'rb') as src, open(target, 'wb') as dst:
+            fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+    except OSError:
+        if os.path.exists(target):
+            os.remove(target)
+        clone_support[device] = False
+        return False
+    clone_support[device] = True
+    shutil.copystat(source, target)
+    return True
+
+
+def _link_or_copy(source, target):
+    if _clone(source, target):
+        return
+    try:
+        os.link(source, target)
+    except OSError:
+        # Different filesystem or no hard link support: fall back to a copy
+        shutil.copy2(source, target)
+
+
+def place_file(source, target):
+    """Store a file's content in the blob store and link it in at target.
+    
+    Returns the content digest. The source is left in place for the caller to
+    remove; source and target may be the same file.
+    """
+    digest = file_digest(source)
+    blob = blob_path(digest)
+    if not os.path.exists(blob):
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        staging = f'{blob}.{uuid.uuid4().hex}.tmp'
+        _link_or_copy(source, staging)
+        os.replace(staging, blob)
+    
+    if os.path.exists(target) and os.path.samefile(blob, target):
+        # Already in place; renaming a link over the same file would leave the staging link behind
+        return digest
+    
+    # The blob the old file was linked from may no longer be needed
+    replaced = None
+    if os.path.exists(target):
+        replaced = file_digest(target) if os.stat(target).st_nlink > 1 else known_file_digest(target)
+    
+    staging = os.path.join(os.path.dirname(target), f'.{uuid.uuid4().hex}.tmp')
+    _link_or_copy(blob, staging)
+    os.replace(staging, target)
+    if replaced:
+        prune_blob(replaced)
+    return digest
+
+
+def paths_with_digest(digest):
+    """Existing animation files last known to have this content"""
+    rows = metadata_db().execute('SELECT path FROM file_digests WHERE sha256 = ?', (digest,)).fetchall()
+    return [row['path'] for row in rows if os.path.exists(row['path']) and known_file_digest(row['path']) == digest]
+
+
+def prune_blob(digest):
+    """Remove a blob once no animation file links to it or is cloned from it any more"""
+    blob = blob_path(digest)
+    try:
+        if os.stat(blob).st_nlink > 1:
+            return
+    except FileNotFoundError:
+        return
+    # Clones don't count as links, so look for files that still have the content
+    if not paths_with_digest(digest):
+        os.remove(blob)
+
+
+def remove_file(file_path):
+    """Delete an animation file, and its blob if this was the last link"""
+    stat = os.stat(file_path)
+    digest = file_digest(file_path) if stat.st_nlink > 1 else known_file_digest(file_path, stat)
+    os.remove(file_path)
+    if digest:
+        prune_blob(digest)
+
+
+def break_shared_links(file_paths):
+    """Give hard-linked files that were edited in place their own copy.
+    
+    An in-place write (an editor, rsync --inplace) to a hard link changes the
+    blob and every file linked to it. The edited file is copied out so that it
+    no longer shares storage, and the blob, whose name no longer matches its
+    content, is dropped so nothing new gets linked to it. Returns the paths of
+    the other files that share the edited content; they have changed too.
+    """
+    affected = set()
+    for file_path in file_paths:
+        try:
+            stat = os.stat(file_path)
+        except FileNotFoundError:
+            continue
+        cached = file_digests.get(file_path)
+        if stat.st_nlink < 2 or not cached or cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            continue
+        blob = blob_path(cached[2])
+        if not os.path.exists(blob) or not os.path.samefile(blob, file_path):
+            continue
+        digest = file_digest(file_path)
+        if digest == cached[2]:
+            continue
+        
+        staging = os.path.join(os.path.dirname(file_path), f'.{uuid.uuid4().hex}.tmp')
+        shutil.copy2(file_path, staging)
+        os.replace(staging, file_path)
+        os.remove(blob)
+        rows = metadata_db().execute('SELECT path FROM file_digests WHERE sha256 = ?', (cached[2],)).fetchall()
+        siblings = []
+        for row in rows:
+            try:
+                if row['path'] != file_path and os.stat(row['path']).st_ino == stat.st_ino:
+                    siblings.append(row['path'])
+            except FileNotFoundError:
+                continue
+        affected.update(siblings)
+        app.logger.warning(f"{file_path} was edited in place while sharing its content with "
+                           f"{len(siblings)} other files, which changed with it: {', '.join(siblings)}")
+    return affected
+
+
+def save_upload(file, target):
+    """Save an uploaded file to target through the animation storage"""
+    temp_path = os.path.join(UPLOAD_DIR, f'{uuid.uuid4()}.part')
+    file.save(temp_path)
+    try:
+        return storage.put(storage_key(target), temp_path)
+    finally:
+        os.remove(temp_path)
+
+
+# Storage of the animation files of record (Lottie JSON and exported media),
+# addressed by their path under the static folder, such as
+# 'animations/loadings/mp4/Spinner.mp4'. LocalStorage keeps them in the static
+# folder itself. RemoteStorage keeps them in an object store and treats the
+# static folder as this node's copy of it. Lottie JSON is mirrored to every
+# node, since search, ingest and bundles read it. Media is downloaded on first
+# use and evicted least recently used first. The stored_objects table records
+# what the bucket holds, so every worker lists the same formats whether or not
+# the file is on its disk. Derived files (optimized JSON, posters, compressed
+# copies) are always built per node.
+#
+# With several nodes the bucket also holds each animation's metadata record
+# (metadata/<category>/<name>.json: its hashtags, display name, path and date)
+# and a journal of the animations changed (changes/<id>.json, ids claimed with
+# conditional writes so they run without gaps). Writers publish to both; each
+# node's leader follows the journal and mirrors what changed into its metadata
+# store, whose change log then carries the journal id, so every node reports
+# the same manifest versions. Complexity and optimization reports stay per node.
+def storage_key(file_path):
+    return os.path.relpath(file_path, app.static_folder).replace(os.sep, '/')
+
+
+def storage_path(key):
+    return os.path.join(app.static_folder, *key.split('/'))
+
+
+METADATA_PREFIX = 'metadata/'
+JOURNAL_PREFIX = 'changes/'
+# Metadata shared through remote storage; the rest is derived by each node
+SHARED_METADATA_FIELDS = ['display_name', 'path', 'date_added', 'hashtags']
+
+
+def metadata_key(category, name):
+    return f'{METADATA_PREFIX}{category}/{name}.json'
+
+
+def journal_key(change_id):
+    return f'{JOURNAL_PREFIX}{change_id:012d}.json'
+
+
+def journal_id_of(key):
+    return int(key[len(JOURNAL_PREFIX):-len('.json')])
+
+
+def is_media_key(key):
+    """Whether key is exported media ('animations/<category>/<format>/<file>'), which nodes evict"""
+    parts = key.split('/')
+    return len(parts) == 4 and parts[0] == 'animations' and parts[2] in MEDIA_FORMATS
+
+
+class LocalStorage:
+    """Animation files on this node's disk, deduplicated through the blob store"""
+    remote = False
+    
+    def put(self, key, source):
+        """Store the content of source under key; returns its digest"""
+        target = storage_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        return place_file(source, target)
+    
+    def delete(self, key):
+        """Remove a file; returns whether there was one"""
+        file_path = storage_path(key)
+        if not os.path.exists(file_path):
+            return False
+        remove_file(file_path)
+        return True
+    
+    def fetch(self, key):
+        """Local path of a file, or None if there is no such file"""
+        file_path = storage_path(key)
+        return file_path if os.path.exists(file_path) else None
+    
+    def publish(self, category, name):
+        """Tell the other nodes an animation changed; there are none with local storage"""
+    
+    def trim_journal(self, before):
+        """Drop journal entries written before a time; local storage keeps none"""
+
+
+class S3Store:
+    """Objects in an S3 bucket, or in any store speaking its API"""
+    
+    def __init__(self, bucket, prefix='', endpoint_url=None):
+        if boto3 is None:
+            raise RuntimeError('S3 storage needs boto3 (pip install boto3)')
+        if not bucket:
+            raise RuntimeError('S3 storage needs a bucket (LOOTBOX_S3_BUCKET)')
+        self.client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+    
+    def upload(self, key, source, digest):
+        self.client.upload_file(source, self.bucket, self.prefix + key, ExtraArgs={'Metadata': {'sha256': digest}})
+    
+    def download(self, key, target):
+        self.client.download_file(self.bucket, self.prefix + key, target)
+    
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=self.prefix + key)
+    
+    def put_bytes(self, key, body, exclusive=False):
+        """Write an object; returns its ETag, or None if exclusive and the key is taken"""
+        conditions = {'IfNoneMatch': '*'} if exclusive else {}
+        try:
+            response = self.client.put_object(Bucket=self.bucket, Key=self.prefix + key, Body=body, **conditions)
+        except ClientError as e:
+            if exclusive and e.response['Error']['Code'] in ('PreconditionFailed', 'ConditionalRequestConflict'):
+                return None
+            raise
+        return response['ETag'].strip('"')
+    
+    def get_bytes(self, key):
+        """Content and ETag of an object, or None if it doesn't exist"""
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return response['Body'].read(), response['ETag'].strip('"')
+    
+    def head(self, key):
+        """Size, ETag and recorded sha256 (None if unknown) of an object, or None if it doesn't exist"""
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return None
+            raise
+        return {'size': response['ContentLength'], 'etag': response['ETag'].strip('"'),
+                'sha256': response.get('Metadata', {}).get('sha256')}
+    
+    def list(self, prefix, start_after=None):
+        """Size, ETag and modification time of every object under prefix (after start_after), by key"""
+        objects = {}
+        options = {'StartAfter': self.prefix + start_after} if start_after else {}
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix, **options):
+            for item in page.get('Contents', []):
+                objects[item['Key'][len(self.prefix):]] = {
+                    'size': item['Size'],
+                    'etag': item['ETag'].strip('"'),
+                    'modified': item['LastModified'].timestamp()
+                }
+        return objects
+
+
+class RemoteStorage(LocalStorage):
+    """Animation files in an object store, with this node's copies in the static folder"""
+    remote = True
+    
+    def __init__(self, store, cache_size):
+        self.store = store
+        self.cache_size = cache_size
+        # Media copies on disk, least recently used first (path -> size), and
+        # their total. Read from the disk by access time on first use, then
+        # kept by fetch, _download and the removals, so eviction never scans
+        # the media folders. Each worker process keeps its own.
+        self.copies = None
+        self.copies_size = 0
+        self.copies_lock = threading.Lock()
+        # Newest journal id this process has seen claimed, and the last one sync applied
+        self.journal_head = None
+        self.journal_lock = threading.Lock()
+        self.journal_position = None
+    
+    def put(self, key, source):
+        digest = super().put(key, source)
+        self.store.upload(key, storage_path(key), digest)
+        info = self.store.head(key)
+        record_stored_object(key, info['size'], info['etag'], digest)
+        if is_media_key(key):
+            self._used(storage_path(key), info['size'])
+        return digest
+    
+    def delete(self, key):
+        existed = super().delete(key) or stored_object(key) is not None
+        self.store.delete(key)
+        forget_stored_object(key)
+        self._dropped(storage_path(key))
+        return existed
+    
+    def fetch(self, key):
+        file_path = storage_path(key)
+        if os.path.exists(file_path):
+            if is_media_key(key):
+                self._used(file_path)
+            return file_path
+        if stored_object(key) is None:
+            return None
+        self._download(key)
+        self.evict(keep=file_path)
+        return file_path
+    
+    def _download(self, key):
+        """Copy an object into place; returns its digest"""
+        temp_path = os.path.join(UPLOAD_DIR, f'{uuid.uuid4()}.part')
+        try:
+            self.store.download(key, temp_path)
+            target = storage_path(key)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            size = os.path.getsize(temp_path)
+            digest = place_file(temp_path, target)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if is_media_key(key):
+            self._used(target, size)
+        return digest
+    
+    def _media_copies(self):
+        """The LRU of media copies; call with copies_lock held"""
+        if self.copies is None:
+            found = []
+            for category in CATEGORIES:
+                for media_type in MEDIA_FORMATS:
+                    media_dir = os.path.join(app.static_folder, 'animations', category, media_type)
+                    if not os.path.isdir(media_dir):
+                        continue
+                    with os.scandir(media_dir) as entries:
+                        for entry in entries:
+                            if entry.is_file() and not entry.name.startswith('.'):
+                                stat = entry.stat()
+                                found.append((stat.st_atime, entry.path, stat.st_size))
+            self.copies = collections.OrderedDict((file_path, size) for _, file_path, size in sorted(found))
+            self.copies_size = sum(self.copies.values())
+        return self.copies
+    
+    def _used(self, file_path, size=None):
+        """Move a media copy to the recently used end, adding it if it is new to this process"""
+        with self.copies_lock:
+            copies = self._media_copies()
+            if size is None and file_path in copies:
+                copies.move_to_end(file_path)
+                return
+            if size is None:
+                size = os.path.getsize(file_path)
+            self.copies_size += size - copies.pop(file_path, 0)
+            copies[file_path] = size
+    
+    def _dropped(self, file_path):
+        with self.copies_lock:
+            if self.copies is not None:
+                self.copies_size -= self.copies.pop(file_path, 0)
+    
+    def evict(self, keep=None):
+        """Remove the least recently used media copies until they fit in the cache size.
+        
+        keep is a copy about to be served, which stays even if it alone is over the size.
+        """
+        with self.copies_lock:
+            copies = self._media_copies()
+            excess = self.copies_size - self.cache_size
+            if excess <= 0:
+                return
+            oldest = list(copies.items())
+        
+        for file_path, size in oldest:
+            if excess <= 0:
+                break
+            # Only copies of files the bucket has can be dropped
+            if file_path == keep or stored_object(storage_key(file_path)) is None:
+                continue
+            try:
+                remove_file(file_path)
+            except FileNotFoundError:
+                # Another worker evicted it first
+                pass
+            self._dropped(file_path)
+            excess -= size
+    
+    def publish(self, category, name):
+        """Share an animation's metadata record and journal the change; returns the journal id"""
+        self.share_metadata(category, name)
+        return self.journal(category, name)
+    
+    def share_metadata(self, category, name):
+        """Write an animation's metadata record to the bucket, or remove it; returns whether one was written"""
+        key = metadata_key(category, name)
+        record = read_metadata(category, name)
+        if record is None:
+            self.store.delete(key)
+            forget_stored_object(key)
+            return False
+        body = json.dumps({field: record[field] for field in SHARED_METADATA_FIELDS}).encode()
+        etag = self.store.put_bytes(key, body)
+        record_stored_object(key, len(body), etag, hashlib.sha256(body).hexdigest())
+        return True
+    
+    def journal(self, category, name):
+        """Append a change to the journal (None for everything); returns its id"""
+        body = json.dumps({'category': category, 'name': name, 'at': time.time()}).encode()
+        with self.journal_lock:
+            if self.journal_head is None:
+                self.journal_head = self._last_journal_id(0)
+            while True:
+                change_id = self.journal_head + 1
+                if self.store.put_bytes(journal_key(change_id), body, exclusive=True):
+                    self.journal_head = change_id
+                    return change_id
+                # Another writer took the id; carry on after the newest entry
+                self.journal_head = self._last_journal_id(change_id)
+    
+    def _last_journal_id(self, after):
+        entries = self.store.list(JOURNAL_PREFIX, journal_key(after) if after else None)
+        return max(map(journal_id_of, entries), default=after)
+    
+    def trim_journal(self, before):
+        entries = self.store.list(JOURNAL_PREFIX)
+        # The newest entry stays, so that ids carry on from it
+        for key in sorted(entries)[:-1]:
+            if entries[key]['modified'] < before:
+                self.store.delete(key)
+    
+    def sync(self):
+        """Bring this node in line with the bucket; returns the number of journal entries applied.
+        
+        Follows the journal from the last entry applied. A node's first sync,
+        and one finding the journal trimmed past that entry or an entry for
+        everything (as push-storage writes), compares every object instead.
+        """
+        if self.journal_position is None:
+            self.journal_position = latest_journal_id()
+            full = self.journal_position == 0
+        else:
+            full = False
+        position = self.journal_position
+        ids = sorted(map(journal_id_of, self.store.list(JOURNAL_PREFIX, journal_key(position) if position else None)))
+        entries = []
+        for change_id in ids:
+            found = self.store.get_bytes(journal_key(change_id))
+            entry = json.loads(found[0]) if found else {'category': None}
+            entries.append((change_id, entry['category'], entry.get('name')))
+        if ids and ids[0] != position + 1 or any(category is None for _, category, _ in entries):
+            full = True
+        if not full and not entries:
+            return 0
+        
+        known = stored_objects()
+        if full:
+            changed, updated = self._compare_all(known)
+        else:
+            changed, updated = [], set()
+            for _, category, name in entries:
+                changed += self._sync_animation(category, name, known)
+                updated.add((category, name))
+        self.evict()
+        
+        # The catalog is brought up to date before the journal ids are
+        # published, since other workers report them as the manifest version
+        refreshed = apply_file_changes(changed)
+        for category, name in updated - refreshed:
+            refresh_catalog_entry(category, name, publish=False)
+        position = ids[-1] if ids else position
+        if full:
+            publish_change(None, None, journal_id=position)
+        else:
+            for change_id, category, name in entries:
+                publish_change(category, name, journal_id=change_id)
+        self.journal_position = position
+        return len(entries)
+    
+    def _sync_object(self, key, info, known):
+        """Bring this node's copy of a file in line with info (None if the bucket has none); returns whether it changed"""
+        file_path = storage_path(key)
+        if info is None:
+            if key not in known:
+                return False
+            forget_stored_object(key)
+            if os.path.exists(file_path):
+                remove_file(file_path)
+                self._dropped(file_path)
+            return True
+        if not catalog_keys_for_path(file_path) or (key in known and known[key]['etag'] == info['etag']):
+            return False
+        digest = info['sha256'] if 'sha256' in info else self.store.head(key)['sha256']
+        up_to_date = os.path.exists(file_path) and digest == file_digest(file_path)
+        # Lottie JSON is mirrored, and stale copies of media are refreshed;
+        # other media is only downloaded here when nothing recorded its digest
+        if not up_to_date and (key.endswith('.json') or os.path.exists(file_path) or not digest):
+            digest = self._download(key)
+        record_stored_object(key, info['size'], info['etag'], digest)
+        return True
+    
+    def _pull_metadata(self, category, name, known):
+        """Mirror an animation's shared metadata record; returns whether it changed"""
+        key = metadata_key(category, name)
+        found = self.store.get_bytes(key)
+        if found is None:
+            # Only a record this node had mirrored can have been removed
+            if key not in known:
+                return False
+            forget_stored_object(key)
+            delete_metadata(category, name)
+            return True
+        body, etag = found
+        if key in known and known[key]['etag'] == etag:
+            return False
+        record = json.loads(body)
+        write_metadata(category, name, hashtags=record['hashtags'],
+                       **{field: record[field] for field in SHARED_METADATA_FIELDS if field != 'hashtags'})
+        record_stored_object(key, len(body), etag, hashlib.sha256(body).hexdigest())
+        return True
+    
+    def _sync_animation(self, category, name, known):
+        """Mirror what the bucket holds for one animation; returns the paths of the files that changed"""
+        animations_dir = f'animations/{category}'
+        keys = [f'{animations_dir}/lottie/{name}.json', f'{animations_dir}/{name}.json']
+        keys += [f'{animations_dir}/{media_type}/{name}.{media_type}' for media_type in MEDIA_FORMATS]
+        self._pull_metadata(category, name, known)
+        return [storage_path(key) for key in keys if self._sync_object(key, self.store.head(key), known)]
+    
+    def _compare_all(self, known):
+        """Compare every object with this node's copies.
+        
+        Returns the paths of the files that changed and the (category, name)
+        of the animations whose metadata record changed.
+        """
+        objects = self.store.list('animations/')
+        changed = [storage_path(key) for key, info in objects.items() if self._sync_object(key, info, known)]
+        changed += [storage_path(key) for key in known
+                    if key.startswith('animations/') and key not in objects and self._sync_object(key, None, known)]
+        
+        records = self.store.list(METADATA_PREFIX)
+        updated = set()
+        for key in records.keys() | {key for key in known if key.startswith(METADATA_PREFIX)}:
+            if key in records and key in known and known[key]['etag'] == records[key]['etag']:
+                continue
+            category, name = key[len(METADATA_PREFIX):-len('.json')].split('/', 1)
+            if self._pull_metadata(category, name, known):
+                updated.add((category, name))
+        return changed, updated
+
+
+def create_storage():
+    if app.config['STORAGE'] == 's3':
+        store = S3Store(app.config['S3_BUCKET'], app.config['S3_PREFIX'], app.config['S3_ENDPOINT'])
+        return RemoteStorage(store, app.config['STORAGE_CACHE_SIZE'])
+    return LocalStorage()
+
+
+storage = create_storage()
+storage_sync = None
+
+
+def _run_storage_sync():
+    while True:
+        try:
+            storage.sync()
+        except Exception as e:
+            app.logger.error(f"Error syncing with remote storage: {str(e)}")
+        time.sleep(app.config['STORAGE_SYNC_INTERVAL'])
+
+
+def start_storage_sync():
+    """Start the bucket sync thread once per process"""
+    global storage_sync
+    if storage_sync is None:
+        storage_sync = threading.Thread(target=_run_storage_sync, name='storage-sync', daemon=True)
+        storage_sync.start()
+
+
+@app.cli.command('push-storage')
+def push_storage_command():
+    """Copy the animation files and metadata on this node into remote storage."""
+    if not storage.remote:
+        raise click.ClickException('Set LOOTBOX_STORAGE=s3 to push the library to a bucket')
+    with catalog_lock:
+        keys = sorted(catalog)
+    files = records = 0
+    for category, name in keys:
+        sources = [lottie_file_path(category, name)]
+        sources += [media_file_path(category, name, media_type) for media_type in MEDIA_FORMATS]
+        for file_path in sources:
+            if not file_path or not os.path.exists(file_path):
+                continue
+            key = storage_key(file_path)
+            stored = stored_object(key)
+            if stored is None or stored['sha256'] != file_digest(file_path):
+                storage.put(key, file_path)
+                files += 1
+        records += storage.share_metadata(category, name)
+    # Every node compares the whole bucket once it reads this
+    storage.journal(None, None)
+    click.echo(f'Pushed {files} files and {records} metadata records to remote storage')
+
+
+# Metadata store. Hashtags, dates and optimization reports live in one SQLite
+# database in WAL mode, so readers never wait for a writer and several worker
+# processes can share it. The JSON sidecars in static/metadata that used to
+# hold this are folded in once by import_metadata_sidecars.
+METADATA_SCHEMA = """
+CREATE TABLE IF NOT EXISTS animations (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    display_name TEXT,
+    path TEXT,
+    date_added TEXT,
+    optimization TEXT,
+    complexity TEXT,
+    PRIMARY KEY (category, name)
+);
+CREATE INDEX IF NOT EXISTS animations_date_added ON animations (date_added);
+CREATE TABLE IF NOT EXISTS hashtags (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (category, name, tag)
+);
+CREATE INDEX IF NOT EXISTS hashtags_tag ON hashtags (tag);
+CREATE TABLE IF NOT EXISTS files (
+    category TEXT NOT NULL,
+    name TEXT NOT NULL,
+    format TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    PRIMARY KEY (category, name, format)
+);
+CREATE INDEX IF NOT EXISTS files_sha256 ON files (sha256);
+CREATE TABLE IF NOT EXISTS staged_uploads (
+    filename TEXT PRIMARY KEY,
+    session TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS staged_uploads_session ON staged_uploads (session);
+CREATE TABLE IF NOT EXISTS stored_objects (
+    key TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    etag TEXT NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS file_digests (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    sha256 TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS file_digests_sha256 ON file_digests (sha256);
+CREATE TABLE IF NOT EXISTS changes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    category TEXT,
+    name TEXT,
+    pid INTEGER NOT NULL,
+    at REAL NOT NULL,
+    journal_id INTEGER
+);
+"""
+METADATA_COLUMNS = {'display_name', 'path', 'date_added', 'optimization', 'complexity'}
+# Columns holding JSON documents
+METADATA_JSON_COLUMNS = {'optimization', 'complexity'}
+
+metadata_local = threading.local()
+
+
+def metadata_db():
+    """This thread's connection to the metadata store"""
+    # Connections must not cross a fork, so worker processes open their own
+    if getattr(metadata_local, 'pid', None) != os.getpid():
+        os.makedirs(os.path.dirname(app.config['METADATA_DB']), exist_ok=True)
+        db = sqlite3.connect(app.config['METADATA_DB'], timeout=30)
+        db.row_factory = sqlite3.Row
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')
+        metadata_local.db = db
+        metadata_local.pid = os.getpid()
+    return metadata_local.db
+
+
+def _metadata_record(row, hashtags):
+    return {
+        'display_name': row['display_name'],
+        'path': row['path'],
+        'date_added': row['date_added'],
+        'optimization': json.loads(row['optimization']) if row['optimization'] else None,
+        'complexity': json.loads(row['complexity']) if row['complexity'] else None,
+        'hashtags': hashtags
+    }
+
+
+def read_metadata(category, name):
+    """An animation's metadata record, or None if it has none"""
+    db = metadata_db()
+    row = db.execute('SELECT * FROM animations WHERE category = ? AND name = ?', (category, name)).fetchone()
+    if row is None:
+        return None
+    hashtags = [tag for tag, in db.execute(
+        'SELECT tag FROM hashtags WHERE category = ? AND name = ? ORDER BY position', (category, name))]
+    return _metadata_record(row, hashtags)
+
+
+def read_all_metadata():
+    """Every metadata record keyed by (category, name), in two queries"""
+    db = metadata_db()
+    hashtags = {}
+    for category, name, tag in db.execute('SELECT category, name, tag FROM hashtags ORDER BY position'):
+        hashtags.setdefault((category, name), []).append(tag)
+    return {
+        (row['category'], row['name']): _metadata_record(row, hashtags.get((row['category'], row['name']), []))
+        for row in db.execute('SELECT * FROM animations')
+    }
+
+
+def write_metadata(category, name, hashtags=None, **fields):
+    """Create or update an animation's record; hashtags replace the existing ones when given"""
+    unknown = set(fields) - METADATA_COLUMNS
+    if unknown:
+        raise ValueError(f'Unknown metadata fields: {", ".join(sorted(unknown))}')
+    for column in METADATA_JSON_COLUMNS & set(fields):
+        fields[column] = json.dumps(fields[column]) if fields[column] else None
+    
+    db = metadata_db()
+    with db:
+        db.execute('INSERT OR IGNORE INTO animations (category, name) VALUES (?, ?)', (category, name))
+        for column, value in fields.items():
+            db.execute(f'UPDATE animations SET {column} = ? WHERE category = ? AND name = ?', (value, category, name))
+        if hashtags is not None:
+            db.execute('DELETE FROM hashtags WHERE category = ? AND name = ?', (category, name))
+            db.executemany('INSERT OR IGNORE INTO hashtags (category, name, tag, position) VALUES (?, ?, ?, ?)',
+                           [(category, name, tag, position) for position, tag in enumerate(hashtags)])
+
+
+def delete_metadata(category, name):
+    db = metadata_db()
+    with db:
+        for table in ['animations', 'hashtags', 'files']:
+            db.execute(f'DELETE FROM {table} WHERE category = ? AND name = ?', (category, name))
+
+
+def publish_change(category, name, journal_id=None):
+    """Tell the other worker processes to refresh an animation (or everything, for None).
+    
+    journal_id is the remote storage journal entry the change applies, if any.
+    """
+    db = metadata_db()
+    with db:
+        db.execute('INSERT INTO changes (category, name, pid, at, journal_id) VALUES (?, ?, ?, ?, ?)',
+                   (category, name, os.getpid(), time.time(), journal_id))
+
+
+def latest_change_id():
+    # The AUTOINCREMENT counter, which survives the change log being trimmed empty
+    row = metadata_db().execute("SELECT seq FROM sqlite_sequence WHERE name = 'changes'").fetchone()
+    return row[0] if row else 0
+
+
+def latest_journal_id():
+    """The newest remote storage journal entry this node has applied, 0 if none"""
+    return metadata_db().execute('SELECT MAX(journal_id) FROM changes').fetchone()[0] or 0
+
+
+def changes_since(since, until):
+    """Animations changed after change since up to until, as a set of (category, name).
+    
+    With remote storage since and until are journal ids, which every node
+    shares; otherwise they are ids of this node's change log. None means the
+    log can't tell: part of it has been trimmed, it records a full rebuild,
+    or since comes from another metadata store.
+    """
+    column = 'journal_id' if storage.remote else 'id'
+    if since > until:
+        # Another worker has applied more of the log than this one
+        latest = latest_journal_id() if storage.remote else latest_change_id()
+        return set() if since <= latest else None
+    db = metadata_db()
+    oldest = db.execute(f'SELECT MIN({column}) FROM changes').fetchone()[0]
+    if since < until and (oldest is None or oldest > since + 1):
+        return None
+    rows = db.execute(f'SELECT category, name FROM changes WHERE {column} > ? AND {column} <= ?', (since, until)).fetchall()
+    if any(category is None for category, _ in rows):
+        return None
+    return set(rows)
+
+
+def stored_object(key):
+    """What remote storage holds under key ({'size', 'etag', 'sha256'}), or None"""
+    row = metadata_db().execute('SELECT size, etag, sha256 FROM stored_objects WHERE key = ?', (key,)).fetchone()
+    return dict(row) if row else None
+
+
+def stored_objects():
+    rows = metadata_db().execute('SELECT key, size, etag, sha256 FROM stored_objects').fetchall()
+    return {row['key']: dict(row) for row in rows}
+
+
+def record_stored_object(key, size, etag, sha256):
+    db = metadata_db()
+    with db:
+        db.execute('INSERT OR REPLACE INTO stored_objects (key, size, etag, sha256) VALUES (?, ?, ?, ?)',
+                   (key, size, etag, sha256))
+
+
+def forget_stored_object(key):
+    db = metadata_db()
+    with db:
+        db.execute('DELETE FROM stored_objects WHERE key = ?', (key,))
+
+
+def store_file_manifests(manifests):
+    """Record the files on disk (format, size, hash), given format manifests by (category, name)"""
+    db = metadata_db()
+    with db:
+        for key, manifest in manifests.items():
+            db.execute('DELETE FROM files WHERE category = ? AND name = ?', key)
+            # Files whose digest is still being computed are recorded once it is known
+            db.executemany('INSERT INTO files (category, name, format, size, sha256) VALUES (?, ?, ?, ?, ?)',
+                           [key + (format_type, info['size'], info['sha256']) for format_type, info in manifest.items()
+                            if info['sha256']])
+
+
+def _read_metadata_file(meta_path):
+    """Load a metadata sidecar, returning None if it is missing or invalid"""
+    if not os.path.exists(meta_path):
+        return None
+    try:
+        with open(meta_path, 'r') as f:
+            return json.load(f)
+    except Exception as e:
+        app.logger.error(f"Error loading metadata file {meta_path}: {str(e)}")
+        return None
+
+
+def import_metadata_sidecar(meta_path, overwrite=True):
+    """Fold one JSON sidecar into the metadata store; returns the (category, name) keys written.
+    
+    A full record in metadata/<category>/ applies to that animation, a
+    hashtag-only file in metadata/ to the name in every category without a
+    full record of its own. Records already in the store are kept unless
+    overwrite is set.
+    """
+    parts = os.path.relpath(meta_path, META_DIR).split(os.sep)
+    filename = parts[-1]
+    name, ext = os.path.splitext(filename)
+    meta = _read_metadata_file(meta_path) if ext == '.json' and os.path.isfile(meta_path) else None
+    if meta is None:
+        return set()
+    
+    if len(parts) == 2 and parts[0] in CATEGORIES:
+        category = parts[0]
+        if not overwrite and read_metadata(category, name) is not None:
+            return set()
+        write_metadata(
+            category, name,
+            hashtags=meta.get('hashtags', []),
+            display_name=meta.get('name'),
+            path=meta.get('path') or f'/static/animations/{category}/lottie/{name}.json',
+            date_added=meta.get('date_added') or meta.get('added_date'),
+            optimization=meta.get('optimization')
+        )
+        return {(category, name)}
+    
+    written = set()
+    if len(parts) == 1:
+        for category in CATEGORIES:
+            if lottie_file_path(category, name) is None or os.path.exists(os.path.join(META_DIR, category, filename)):
+                continue
+            if not overwrite and read_metadata(category, name) is not None:
+                continue
+            write_metadata(category, name, hashtags=meta.get('hashtags', []))
+            written.add((category, name))
+    return written
+
+
+def import_metadata_sidecars(overwrite=False):
+    """Fold the JSON sidecars in static/metadata into the metadata store.
+    
+    Full records in metadata/<category>/ go first, so they take priority over
+    the hashtag-only files. Returns the number of records written.
+    """
+    imported = 0
+    for category in CATEGORIES:
+        folder = os.path.join(META_DIR, category)
+        for filename in sorted(os.listdir(folder)) if os.path.isdir(folder) else []:
+            imported += len(import_metadata_sidecar(os.path.join(folder, filename), overwrite))
+    for filename in sorted(os.listdir(META_DIR)):
+        imported += len(import_metadata_sidecar(os.path.join(META_DIR, filename), overwrite))
+    return imported
+
+
+def init_metadata_store():
+    """Create the schema, importing the sidecars the first time the store is created"""
+    db = metadata_db()
+    db.executescript(METADATA_SCHEMA)
+    version = db.execute('PRAGMA user_version').fetchone()[0]
+    if version == 0:
+        imported = import_metadata_sidecars()
+        if imported:
+            app.logger.info(f'Imported {imported} metadata sidecars into {app.config["METADATA_DB"]}')
+    else:
+        with db:
+            if version < 2:
+                # Stores created before complexity profiles existed
+                db.execute('ALTER TABLE animations ADD COLUMN complexity TEXT')
+            if version < 3:
+                # and before remote storage had a shared journal
+                db.execute('ALTER TABLE changes ADD COLUMN journal_id INTEGER')
+    db.execute('PRAGMA user_version = 3')
+
+
+init_metadata_store()
+
+
+# Request metrics in the Prometheus text format: request counts, latency
+# histograms and response bytes per route, plus spans timing the stages of
+# the hot paths (catalog scans, search, sort, serialization, file reads and
+# sends). Each worker process counts on its own and saves a snapshot to
+# instance/metrics now and then; /metrics adds them up, so a scrape covers
+# every worker whichever one answers it.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_DIR = os.path.join(app.instance_path, 'metrics')
+metrics_lock = threading.Lock()
+# (route, method, status) -> [requests, response bytes]
+request_counts = {}
+# (route, method) for requests and (route, span) for spans ->
+# [count per bucket..., count above the last bucket, sum of seconds]
+request_latencies = {}
+span_latencies = {}
+last_metrics_snapshot = 0
+
+
+def _observe(histograms, key, seconds):
+    """Add one duration to a histogram; the caller holds metrics_lock"""
+    histogram = histograms.get(key)
+    if histogram is None:
+        histogram = histograms[key] = [0] * (len(LATENCY_BUCKETS) + 2)
+    histogram[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    histogram[-1] += seconds
+
+
+def _metrics_route():
+    """Route pattern of the current request, so paths don't each get their own series"""
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+@contextlib.contextmanager
+def metrics_span(name):
+    """Time a stage of the current request, or of background work outside one"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if app.config['METRICS_ENABLED']:
+            seconds = time.perf_counter() - start
+            if has_request_context():
+                # Recorded with the request once it completes
+                g.setdefault('metrics_spans', []).append((name, seconds))
+            else:
+                with metrics_lock:
+                    _observe(span_latencies, ('background', name), seconds)
+
+
+def _count_sent(chunks, sent):
+    """Pass a streamed body through, adding up its size"""
+    try:
+        for chunk in chunks:
+            sent[0] += len(chunk)
+            yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            chunks.close()
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    """Count the request once its body has been sent"""
+    started = g.get('request_started')
+    if not app.config['METRICS_ENABLED'] or started is None:
+        return response
+    handled = time.perf_counter()
+    route = _metrics_route()
+    method = request.method
+    status = str(response.status_code)
+    spans = g.get('metrics_spans', [])
+    path = request.full_path.rstrip('?')
+    
+    # Bodies without a length (streamed NDJSON) are counted as they go out
+    sent = [0]
+    length = response.content_length
+    if length is None and response.is_streamed and not response.direct_passthrough:
+        response.response = _count_sent(response.response, sent)
+    
+    def finish():
+        done = time.perf_counter()
+        with metrics_lock:
+            counts = request_counts.setdefault((route, method, status), [0, 0])
+            counts[0] += 1
+            counts[1] += length if length is not None else sent[0]
+            _observe(request_latencies, (route, method), done - started)
+            for name, seconds in spans:
+                _observe(span_latencies, (route, name), seconds)
+            _observe(span_latencies, (route, 'send'), done - handled)
+        if done - started >= app.config['SLOW_REQUEST_THRESHOLD']:
+            breakdown = ', '.join(f'{name} {seconds * 1000:.1f} ms' for name, seconds in spans + [('send', done - handled)])
+            app.logger.warning(f'Slow request: {method} {path} -> {status} in {(done - started) * 1000:.1f} ms ({breakdown})')
+    
+    if response.direct_passthrough:
+        # File bodies go straight to the server (and its sendfile support),
+        # skipping the response's close callbacks, so finish when it closes them
+        body = response.response
+        close = getattr(body, 'close', None)
+        
+        def close_body():
+            try:
+                if close is not None:
+                    close()
+            finally:
+                finish()
+        body.close = close_body
+    else:
+        response.call_on_close(finish)
+    return response
+
+
+def metrics_snapshot():
+    """This process's counters in a JSON-friendly form"""
+    with metrics_lock:
+        snapshot = {
+            section: [[list(key), list(values)] for key, values in metrics.items()]
+            for section, metrics in [('requests', request_counts), ('latencies', request_latencies), ('spans', span_latencies)]
+        }
+    with response_cache_lock:
+        snapshot['cache'] = dict(response_cache_stats, entries=len(response_cache))
+    return snapshot
+
+
+def write_metrics_snapshot():
+    """Save this process's counters for the /metrics of the other workers"""
+    global last_metrics_snapshot
+    last_metrics_snapshot = time.time()
+    if not request_counts and not span_latencies:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    snapshot_path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+    tmp_path = f'{snapshot_path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(metrics_snapshot(), f)
+    os.replace(tmp_path, snapshot_path)
+
+
+def clear_metrics_snapshots():
+    """Forget the snapshots of processes from earlier runs"""
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+
+
+def collect_metrics():
+    """This process's counters added to the latest snapshots of the other workers"""
+    snapshots = [metrics_snapshot()]
+    own_file = f'{os.getpid()}.json'
+    if os.path.isdir(METRICS_DIR):
+        for filename in os.listdir(METRICS_DIR):
+            if filename.endswith('.json') and filename != own_file:
+                try:
+                    with open(os.path.join(METRICS_DIR, filename)) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+    
+    totals = {'requests': {}, 'latencies': {}, 'spans': {}, 'cache': collections.Counter()}
+    for snapshot in snapshots:
+        for section in ['requests', 'latencies', 'spans']:
+            merged = totals[section]
+            for key, values in snapshot.get(section, []):
+                key = tuple(key)
+                current = merged.get(key)
+                merged[key] = values if current is None else [a + b for a, b in zip(current, values)]
+        totals['cache'].update(snapshot.get('cache', {}))
+    return totals
+
+
+def _metric_labels(**labels):
+    pairs = []
+    for name, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        pairs.append(f'{name}="{value}"')
+    return '{' + ','.join(pairs) + '}'
+
+
+def _histogram_lines(name, histograms, label_names):
+    lines = []
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key))
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ('+Inf',), histogram):
+            cumulative += count
+            lines.append(f'{name}_bucket{_metric_labels(**labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{_metric_labels(**labels)} {histogram[-1]:.6f}')
+        lines.append(f'{name}_count{_metric_labels(**labels)} {cumulative}')
+    return lines
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    totals = collect_metrics()
+    lines = []
+    
+    def family(name, kind, description):
+        lines.append(f'# HELP {name} {description}')
+        lines.append(f'# TYPE {name} {kind}')
+    
+    family('lootbox_http_requests_total', 'counter', 'Requests handled, by route, method and status.')
+    for (route, method, status), (count, _) in sorted(totals['requests'].items()):
+        lines.append(f'lootbox_http_requests_total{_metric_labels(route=route, method=method, status=status)} {count}')
+    family('lootbox_http_response_bytes_total', 'counter', 'Response body bytes sent, by route, method and status.')
+    for (route, method, status), (_, size) in sorted(totals['requests'].items()):
+        lines.append(f'lootbox_http_response_bytes_total{_metric_labels(route=route, method=method, status=status)} {size}')
+    family('lootbox_http_request_duration_seconds', 'histogram', 'Time from receiving a request to sending the last byte.')
+    lines.extend(_histogram_lines('lootbox_http_request_duration_seconds', totals['latencies'], ['route', 'method']))
+    family('lootbox_span_duration_seconds', 'histogram', 'Time spent in each stage of a request (or of background work).')
+    lines.extend(_histogram_lines('lootbox_span_duration_seconds', totals['spans'], ['route', 'span']))
+    
+    cache = totals['cache']
+    for stat in ['hits', 'misses', 'evictions', 'invalidations', 'expirations']:
+        family(f'lootbox_response_cache_{stat}_total', 'counter', f'Response cache {stat} across workers.')
+        lines.append(f'lootbox_response_cache_{stat}_total {cache[stat]}')
+    family('lootbox_response_cache_entries', 'gauge', 'Cached /api/animations responses across workers.')
+    lines.append(f"lootbox_response_cache_entries {cache['entries']}")
+    
+    with catalog_lock:
+        animations = len(catalog)
+    family('lootbox_catalog_animations', 'gauge', 'Animations in the catalog.')
+    lines.append(f'lootbox_catalog_animations {animations}')
+    family('lootbox_ingest_queue_length', 'gauge', 'Animations waiting for the ingest worker of the answering process.')
+    lines.append(f'lootbox_ingest_queue_length {ingest_queue.qsize()}')
+    staging = staging_stats()
+    family('lootbox_staging_bytes', 'gauge', 'Bytes held in the upload staging folder.')
+    lines.append(f"lootbox_staging_bytes {staging['bytes']}")
+    family('lootbox_staging_files', 'gauge', 'Files held in the upload staging folder.')
+    lines.append(f"lootbox_staging_files {staging['files']}")
+    return '\n'.join(lines) + '\n'
+
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus scrape endpoint"""
+    if not app.config['METRICS_ENABLED']:
+        abort(404)
+    return app.response_class(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+# In-memory catalog of every animation, keyed by (category, name).
+# It is built once at startup and the write endpoints keep it up to date,
+# so listing requests never have to walk the animation folders.
+catalog = {}
+catalog_lock = threading.RLock()
+# Last entry of the change log (see publish_change) this process has applied,
+# and of the remote storage journal
+last_change_id = 0
+last_journal_id = 0
+
+# Listing sort options. Each catalog view is a sorted list of rows
+# (sort value, name, category), so a row identifies its animation and a
+# cursor can resume right after it with bisect.
+SORT_VALUES = {
+    'name': lambda entry: entry['name'],
+    'date_added': lambda entry: entry['date_added'],
+    'category': lambda entry: entry['category'],
+    # Cost score of the complexity profile; -1 until the animation has been analyzed
+    'complexity': lambda entry: entry['complexity']['cost'] if entry.get('complexity') else -1
+}
+# Newest first is the natural order for dates
+DEFAULT_SORT_ORDER = {'name': 'asc', 'date_added': 'desc', 'category': 'asc', 'complexity': 'asc', 'relevance': 'asc'}
+# (scope, sort) -> sorted rows, where scope is a category or None for all animations
+catalog_views = {}
+# Bumped on every change to a category (and under None on every change at
+# all), so anything derived from a scope can tell exactly when it is stale
+catalog_generations = dict.fromkeys([None, *CATEGORIES], 0)
+
+
+def _bump_generation(category):
+    catalog_generations[category] += 1
+    catalog_generations[None] += 1
+
+
+def load_catalog_entry(category, name, records=None, lazy_digests=False):
+    """Resolve a single animation from disk, or None if it no longer exists.
+    
+    records is the result of read_all_metadata when many entries are loaded at once.
+    With lazy_digests, files that were never hashed are listed without their
+    sha256 and content version; backfill_digests fills them in later.
+    """
+    animations_dir = os.path.join(app.static_folder, 'animations', category)
+    lottie_file = os.path.join(animations_dir, 'lottie', f'{name}.json')
+    legacy_file = os.path.join(animations_dir, f'{name}.json')
+    
+    # Full records written by save_animation/upload_animation carry the path;
+    # hashtag-only records need the file to exist
+    meta = read_metadata(category, name) if records is None else records.get((category, name))
+    meta = meta or {}
+    
+    # A record can outlive its file (the animation was deleted on another
+    # node), so it only counts while the JSON, or its stored object, exists
+    has_file = os.path.exists(lottie_file) or (name != 'metadata' and os.path.exists(legacy_file))
+    if not has_file and storage.remote:
+        has_file = stored_object(storage_key(lottie_file)) is not None
+    
+    if meta.get('path') and has_file:
+        path = meta['path']
+    elif os.path.exists(lottie_file):
+        path = f'/static/animations/{category}/lottie/{name}.json'
+    elif name != 'metadata' and os.path.exists(legacy_file):
+        # Files in the category root are kept for backwards compatibility
+        path = f'/static/animations/{category}/{name}.json'
+    else:
+        return None
+    
+    hashtags = meta.get('hashtags', [])
+    json_file = lottie_file if os.path.exists(lottie_file) else legacy_file
+    
+    # Work out which formats are actually on disk, with their sizes and content
+    # hashes, so clients never have to probe for them
+    format_files = {'json': (json_file, path if path.endswith('.json') else f'/static/animations/{category}/lottie/{name}.json')}
+    for media_type in MEDIA_FORMATS:
+        format_files[media_type] = (media_file_path(category, name, media_type),
+                                    f'/static/animations/{category}/{media_type}/{name}.{media_type}')
+    def digest_of(file_path):
+        return known_file_digest(file_path) if lazy_digests else file_digest(file_path)
+    
+    def version(url, file_path):
+        digest = digest_of(file_path)
+        return f'{url}?v={digest[:12]}' if digest else url
+    
+    format_manifest = {}
+    for format_type, (format_file, url) in format_files.items():
+        if os.path.exists(format_file):
+            format_manifest[format_type] = {
+                'url': version(url, format_file),
+                'size': os.path.getsize(format_file),
+                'sha256': digest_of(format_file)
+            }
+        elif storage.remote:
+            # Media this node has no copy of is still listed from what the bucket holds
+            stored = stored_object(storage_key(format_file))
+            if stored:
+                format_manifest[format_type] = {
+                    'url': f"{url}?v={stored['sha256'][:12]}",
+                    'size': stored['size'],
+                    'sha256': stored['sha256']
+                }
+    formats = list(format_manifest)
+    
+    # Serve the optimized variant of the JSON once the ingest pipeline has built
+    # it, with the content version in the URL so browsers can cache it for good
+    served_path = path
+    optimized_file = optimized_file_path(category, name)
+    if os.path.exists(optimized_file):
+        served_path = version(f'/static/animations/{category}/optimized/{name}.json', optimized_file)
+    elif path.endswith('.json') and os.path.exists(json_file):
+        served_path = version(path, json_file)
+    
+    # Rendered stills for the grid, if the poster pipeline has produced them
+    images = {}
+    for kind in ['poster', 'preview']:
+        filename = f"{name}.{app.config['POSTER_FORMAT']}"
+        if os.path.exists(os.path.join(animations_dir, kind, filename)):
+            images[kind] = f'/static/animations/{category}/{kind}/{filename}'
+    
+    date_added = meta.get('date_added')
+    if not date_added and os.path.exists(json_file):
+        mtime = os.path.getmtime(json_file)
+        date_added = datetime.fromtimestamp(mtime).strftime('%Y-%m-%d %H:%M:%S')
+    
+    return {
+        'name': name,
+        'path': served_path,
+        'original_path': path,
+        'category': category,
+        'hashtags': hashtags,
+        'formats': formats,
+        'format_manifest': format_manifest,
+        'poster': images.get('poster'),
+        'preview': images.get('preview'),
+        'date_added': date_added or '',
+        'complexity': meta.get('complexity')
+    }
+
+
+def serialize_catalog_entry(entry):
+    """Public view of a catalog entry for API responses"""
+    return dict(entry)
+
+
+# Inverted search index over animation names and hashtags.
+# Normalized token -> set of (category, name) keys, kept separately for names
+# and hashtags because name matches rank higher
+search_name_postings = {}
+search_hashtag_postings = {}
+# Every indexed token in sorted order, so prefixes can be looked up with bisect
+search_tokens = []
+# Compact name ('iconstar' for 'Icon_Star') -> keys, for the exact-name bonus
+search_compact_names = {}
+# What was indexed for each key, so entries can be unindexed
+search_entry_tokens = {}
+
+WORD_RE = re.compile(r'[^\W_]+')
+CAMEL_CASE_RE = re.compile(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+')
+
+# Score for one query term by how it matched, and the bonus for a whole-name match
+EXACT_NAME_SCORE = 4
+PREFIX_NAME_SCORE = 2
+EXACT_HASHTAG_SCORE = 2
+PREFIX_HASHTAG_SCORE = 1
+FULL_NAME_BONUS = 10
+
+
+def tokenize(text):
+    """Split a name or hashtag into lowercase search tokens.
+    
+    Words are also split on camelCase boundaries and indexed in their
+    compact form, so 'CreditAssement' matches 'credit' and 'Icon_Star'
+    matches 'iconstar'.
+    """
+    words = WORD_RE.findall(text)
+    tokens = {word.lower() for word in words}
+    for word in words:
+        tokens.update(part.lower() for part in CAMEL_CASE_RE.findall(word))
+    if len(words) > 1:
+        tokens.add(''.join(words).lower())
+    return tokens
+
+
+def _compact(text):
+    return ''.join(WORD_RE.findall(text)).lower()
+
+
+def _add_posting(postings, token, key, keep_sorted):
+    keys = postings.get(token)
+    if keys is None:
+        if keep_sorted and token not in search_name_postings and token not in search_hashtag_postings:
+            bisect.insort(search_tokens, token)
+        keys = postings[token] = set()
+    keys.add(key)
+
+
+def _discard_posting(postings, token, key):
+    keys = postings[token]
+    keys.discard(key)
+    if not keys:
+        del postings[token]
+        if token not in search_name_postings and token not in search_hashtag_postings:
+            del search_tokens[bisect.bisect_left(search_tokens, token)]
+
+
+def _index_entry(key, entry, keep_sorted=True):
+    _unindex_entry(key)
+    name_tokens = tokenize(entry['name'])
+    hashtag_tokens = set()
+    for hashtag in entry['hashtags']:
+        hashtag_tokens.update(tokenize(hashtag))
+    compact_name = _compact(entry['name'])
+    
+    for token in name_tokens:
+        _add_posting(search_name_postings, token, key, keep_sorted)
+    for token in hashtag_tokens:
+        _add_posting(search_hashtag_postings, token, key, keep_sorted)
+    search_compact_names.setdefault(compact_name, set()).add(key)
+    search_entry_tokens[key] = (name_tokens, hashtag_tokens, compact_name)
+
+
+def _unindex_entry(key):
+    indexed = search_entry_tokens.pop(key, None)
+    if indexed is None:
+        return
+    name_tokens, hashtag_tokens, compact_name = indexed
+    for token in name_tokens:
+        _discard_posting(search_name_postings, token, key)
+    for token in hashtag_tokens:
+        _discard_posting(search_hashtag_postings, token, key)
+    keys = search_compact_names[compact_name]
+    keys.discard(key)
+    if not keys:
+        del search_compact_names[compact_name]
+
+
+def _match_term(term):
+    """Score tiers (best first) for one query term, as (score, keys) pairs"""
+    lo = bisect.bisect_left(search_tokens, term)
+    hi = bisect.bisect_left(search_tokens, term + '\U0010ffff')
+    prefix_tokens = search_tokens[lo:hi]
+    empty = set()
+    return [
+        (EXACT_NAME_SCORE, search_name_postings.get(term, empty)),
+        (PREFIX_NAME_SCORE, empty.union(*(search_name_postings.get(t, empty) for t in prefix_tokens))),
+        (EXACT_HASHTAG_SCORE, search_hashtag_postings.get(term, empty)),
+        (PREFIX_HASHTAG_SCORE, empty.union(*(search_hashtag_postings.get(t, empty) for t in prefix_tokens)))
+    ]
+
+
+def search_catalog(query, category=None):
+    """Return (score, key) for every animation matching all terms of the query,
+    best matches first.
+    
+    Each term matches tokens exactly or as a prefix (for search-as-you-type).
+    Exact matches score higher than prefix matches, name matches higher than
+    hashtag matches, and a query that spells out the whole name ranks first.
+    Ties are ordered by name.
+    """
+    terms = sorted({word.lower() for word in WORD_RE.findall(query)}, key=len, reverse=True)
+    if not terms:
+        return []
+    
+    with catalog_lock:
+        term_tiers = []
+        matched = None
+        # Longest terms first - they usually match the fewest animations
+        for term in terms:
+            tiers = _match_term(term)
+            keys = tiers[1][1] | tiers[3][1]
+            matched = keys if matched is None else matched & keys
+            if not matched:
+                return []
+            term_tiers.append(tiers)
+        
+        if category:
+            matched = {key for key in matched if key[0] == category}
+        full_name_matches = matched & search_compact_names.get(''.join(terms) if len(terms) == 1 else _compact(query), set())
+    
+    # Group the matches by total score
+    groups = {}
+    if len(term_tiers) == 1:
+        # Single term (the search-as-you-type case): score whole tiers with set operations
+        remaining = set(matched)
+        for score, keys in sorted(term_tiers[0], key=lambda tier: -tier[0]):
+            group = remaining & keys
+            if group:
+                groups.setdefault(score, set()).update(group)
+                remaining -= group
+    else:
+        for key in matched:
+            score = sum(max(score for score, keys in tiers if key in keys) for tiers in term_tiers)
+            groups.setdefault(score, set()).add(key)
+    
+    for score, keys in list(groups.items()):
+        bonus = keys & full_name_matches
+        if bonus:
+            keys -= bonus
+            groups.setdefault(score + FULL_NAME_BONUS, set()).update(bonus)
+    
+    ranked = []
+    for score in sorted(groups, reverse=True):
+        ranked.extend((score, key) for key in sorted(groups[score], key=lambda key: (key[1], key[0])))
+    return ranked
+
+
+def sort_row(sort, entry):
+    return (SORT_VALUES[sort](entry), entry['name'], entry['category'])
+
+
+def _add_to_views(entry):
+    for sort in SORT_VALUES:
+        row = sort_row(sort, entry)
+        for scope in (None, entry['category']):
+            bisect.insort(catalog_views[(scope, sort)], row)
+
+
+def _remove_from_views(entry):
+    for sort in SORT_VALUES:
+        row = sort_row(sort, entry)
+        for scope in (None, entry['category']):
+            rows = catalog_views[(scope, sort)]
+            del rows[bisect.bisect_left(rows, row)]
+
+
+# Facet aggregates, counted as entries enter and leave the catalog so that
+# /api/facets never scans it. Per scope (a category, or None for all
+# animations): the number of animations, how many have each format, and how
+# many carry each hashtag, with the hashtags also kept as sorted
+# (-count, hashtag) rows so the most frequent are a slice away.
+facet_totals = dict.fromkeys([None, *CATEGORIES], 0)
+facet_formats = {scope: dict.fromkeys(['json'] + MEDIA_FORMATS, 0) for scope in [None, *CATEGORIES]}
+facet_hashtags = {scope: {} for scope in [None, *CATEGORIES]}
+facet_hashtag_ranks = {scope: [] for scope in [None, *CATEGORIES]}
+
+
+def _count_facets(entry, delta, keep_sorted=True):
+    """Add (delta=1) or remove (delta=-1) an entry's contribution to the aggregates"""
+    for scope in (None, entry['category']):
+        facet_totals[scope] += delta
+        formats = facet_formats[scope]
+        for format_type in entry['formats']:
+            formats[format_type] = formats.get(format_type, 0) + delta
+        counts = facet_hashtags[scope]
+        ranks = facet_hashtag_ranks[scope]
+        for hashtag in set(entry['hashtags']):
+            count = counts.get(hashtag, 0)
+            if keep_sorted and count:
+                del ranks[bisect.bisect_left(ranks, (-count, hashtag))]
+            count += delta
+            if count:
+                counts[hashtag] = count
+                if keep_sorted:
+                    bisect.insort(ranks, (-count, hashtag))
+            else:
+                del counts[hashtag]
+
+
+def _facets_changed(previous, entry):
+    return (previous['formats'] != entry['formats']
+            or set(previous['hashtags']) != set(entry['hashtags']))
+
+
+def _catalog_put(entry):
+    key = (entry['category'], entry['name'])
+    with catalog_lock:
+        previous = catalog.get(key)
+        if previous is None or any(sort_row(sort, previous) != sort_row(sort, entry) for sort in SORT_VALUES):
+            if previous is not None:
+                _remove_from_views(previous)
+            _add_to_views(entry)
+        if previous is None or _facets_changed(previous, entry):
+            if previous is not None:
+                _count_facets(previous, -1)
+            _count_facets(entry, 1)
+        catalog[key] = entry
+        _index_entry(key, entry)
+        _bump_generation(entry['category'])
+
+
+def _catalog_remove(category, name):
+    with catalog_lock:
+        entry = catalog.pop((category, name), None)
+        if entry is None:
+            return
+        _remove_from_views(entry)
+        _unindex_entry((category, name))
+        _count_facets(entry, -1)
+        _bump_generation(category)
+
+
+def refresh_catalog_entry(category, name, publish=True):
+    """Re-read one animation from disk and update the catalog in place.
+    
+    The change is published to the other worker processes unless it came
+    from them.
+    """
+    if category not in CATEGORIES:
+        return None
+    
+    with metrics_span('load_entry'):
+        entry = load_catalog_entry(category, name)
+    if entry:
+        _catalog_put(entry)
+    else:
+        _catalog_remove(category, name)
+    store_file_manifests({(category, name): entry['format_manifest'] if entry else {}})
+    if publish:
+        publish_change(category, name)
+    return entry
+
+
+def build_catalog():
+    """Scan every category once and (re)populate the catalog"""
+    global last_change_id, last_journal_id
+    # Changes published while scanning are replayed afterwards
+    last_change_id = latest_change_id()
+    last_journal_id = latest_journal_id()
+    entries = {}
+    with metrics_span('metadata'):
+        records = read_all_metadata()
+        load_file_digests()
+    for category in CATEGORIES:
+        animations_dir = os.path.join(app.static_folder, 'animations', category)
+        names = {name for (record_category, name), record in records.items()
+                 if record_category == category and record['path']}
+        with metrics_span('listdir'):
+            for folder in [os.path.join(animations_dir, 'lottie'), animations_dir]:
+                if os.path.exists(folder):
+                    names.update(os.path.splitext(f)[0] for f in os.listdir(folder) if f.endswith('.json'))
+        
+        with metrics_span('load_entries'):
+            for name in names:
+                # Files never hashed before are left to backfill_digests, so
+                # startup doesn't wait on reading the whole library
+                entry = load_catalog_entry(category, name, records, lazy_digests=True)
+                if entry:
+                    entries[(category, name)] = entry
+    
+    db = metadata_db()
+    with db:
+        db.execute('DELETE FROM files')
+    store_file_manifests({key: entry['format_manifest'] for key, entry in entries.items()})
+    
+    with catalog_lock:
+        catalog.clear()
+        catalog.update(entries)
+        catalog_views.clear()
+        for sort in SORT_VALUES:
+            rows = sorted(sort_row(sort, entry) for entry in entries.values())
+            catalog_views[(None, sort)] = rows
+            for category in CATEGORIES:
+                catalog_views[(category, sort)] = [row for row in rows if row[2] == category]
+        
+        search_name_postings.clear()
+        search_hashtag_postings.clear()
+        search_compact_names.clear()
+        search_entry_tokens.clear()
+        for key, entry in entries.items():
+            _index_entry(key, entry, keep_sorted=False)
+        search_tokens[:] = sorted(search_name_postings.keys() | search_hashtag_postings.keys())
+        
+        for scope in [None, *CATEGORIES]:
+            facet_totals[scope] = 0
+            facet_formats[scope] = dict.fromkeys(['json'] + MEDIA_FORMATS, 0)
+            facet_hashtags[scope].clear()
+        for entry in entries.values():
+            _count_facets(entry, 1, keep_sorted=False)
+        for scope, counts in facet_hashtags.items():
+            facet_hashtag_ranks[scope][:] = sorted((-count, hashtag) for hashtag, count in counts.items())
+        
+        for category in CATEGORIES:
+            _bump_generation(category)
+
+
+build_catalog()
+
+
+# Catalog watcher: picks up files that are created, changed or deleted under
+# static/animations outside of the API (by hand, rsync...)
+# and refreshes only the animations they belong to.
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+INOTIFY_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct('iIII')
+
+catalog_watcher = None
+
+
+def _watchable_dirs():
+    """Every folder that can hold animation files or metadata sidecars, plus the folders they are created in"""
+    dirs = [os.path.join(app.static_folder, 'animations'), META_DIR]
+    dirs.extend(os.path.join(META_DIR, category) for category in CATEGORIES)
+    for category in CATEGORIES:
+        animations_dir = os.path.join(app.static_folder, 'animations', category)
+        dirs.append(animations_dir)
+        dirs.extend(os.path.join(animations_dir, media_type) for media_type in ['lottie'] + MEDIA_FORMATS)
+    return dirs
+
+
+def _watched_dirs():
+    return [d for d in _watchable_dirs() if os.path.isdir(d)]
+
+
+def catalog_keys_for_path(file_path):
+    """Map a file under the static folder to the (category, name) keys it affects"""
+    parts = os.path.relpath(file_path, app.static_folder).split(os.sep)
+    name, ext = os.path.splitext(parts[-1])
+    
+    if parts[0] == 'animations' and len(parts) > 2 and parts[1] in CATEGORIES:
+        if len(parts) == 3 and ext == '.json':
+            return {(parts[1], name)}
+        if len(parts) == 4 and (parts[2], ext) in [('lottie', '.json')] + [(t, f'.{t}') for t in MEDIA_FORMATS]:
+            return {(parts[1], name)}
+    return set()
+
+
+def apply_file_changes(file_paths):
+    """Refresh the catalog entries touched by a batch of changed files"""
+    file_paths = set(file_paths)
+    file_paths |= break_shared_links(file_paths)
+    keys = set()
+    # Sidecars dropped into static/metadata are imported as they arrive;
+    # removing one leaves the store as it is
+    imported = set()
+    for file_path in sorted(file_paths):
+        if os.path.dirname(file_path) == META_DIR or os.path.dirname(os.path.dirname(file_path)) == META_DIR:
+            imported.update(import_metadata_sidecar(file_path))
+        else:
+            keys.update(catalog_keys_for_path(file_path))
+    for category, name in keys | imported:
+        if refresh_catalog_entry(category, name) and (category, name) in keys:
+            queue_ingest(category, name)
+    for category, name in imported:
+        storage.publish(category, name)
+    return keys | imported
+
+
+def _inotify_watch(dirs):
+    """Yield batches of changed paths using Linux inotify (raises OSError elsewhere)"""
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    if not hasattr(libc, 'inotify_init1'):
+        raise OSError('inotify is not available on this platform')
+    
+    fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+    
+    watches = {}
+    for directory in dirs:
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), f'inotify_add_watch failed for {directory}')
+        watches[wd] = directory
+    watchable = set(_watchable_dirs())
+    
+    def watch_new_dir(directory, changed):
+        """Watch a folder created after the watcher started, and report what is already in it"""
+        wd = libc.inotify_add_watch(fd, os.fsencode(directory), INOTIFY_MASK)
+        if wd < 0:
+            app.logger.error(f"Can't watch {directory}: {os.strerror(ctypes.get_errno())}")
+            return
+        watches[wd] = directory
+        # Files (and subfolders) may have arrived before the watch was added
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir() and entry.path in watchable:
+                        watch_new_dir(entry.path, changed)
+                    elif entry.is_file():
+                        changed.add(entry.path)
+        except FileNotFoundError:
+            pass
+    
+    def read_events():
+        try:
+            while True:
+                select.select([fd], [], [])
+                # Give writers a moment so bursts (rsync, editors) arrive as one batch
+                time.sleep(0.05)
+                changed = set()
+                while True:
+                    try:
+                        data = os.read(fd, 65536)
+                    except BlockingIOError:
+                        break
+                    offset = 0
+                    while offset < len(data):
+                        wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                        offset += INOTIFY_EVENT.size
+                        name = data[offset:offset + length].rstrip(b'\0')
+                        offset += length
+                        if mask & IN_Q_OVERFLOW:
+                            changed.add(None)
+                        elif wd in watches and name:
+                            file_path = os.path.join(watches[wd], os.fsdecode(name))
+                            if mask & IN_ISDIR:
+                                if mask & (IN_CREATE | IN_MOVED_TO) and file_path in watchable:
+                                    watch_new_dir(file_path, changed)
+                            else:
+                                changed.add(file_path)
+                if changed:
+                    yield changed
+        finally:
+            os.close(fd)
+    
+    return read_events()
+
+
+def _snapshot_dirs(dirs):
+    snapshot = {}
+    for directory in dirs:
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        stat = entry.stat()
+                        snapshot[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            continue
+    return snapshot
+
+
+def _poll_watch(interval):
+    """Yield batches of changed paths by comparing mtimes and sizes"""
+    previous = _snapshot_dirs(_watched_dirs())
+    while True:
+        time.sleep(interval)
+        # Listed again each time, so folders created since are included
+        current = _snapshot_dirs(_watched_dirs())
+        changed = {p for p in previous.keys() | current.keys() if previous.get(p) != current.get(p)}
+        previous = current
+        if changed:
+            yield changed
+
+
+def _run_catalog_watcher():
+    # Category folders are created inside it, so it has to exist to be watched
+    os.makedirs(os.path.join(app.static_folder, 'animations'), exist_ok=True)
+    dirs = _watched_dirs()
+    try:
+        batches = _inotify_watch(dirs)
+        app.logger.info(f"Watching {len(dirs)} folders with inotify")
+    except (OSError, AttributeError) as e:
+        app.logger.info(f"inotify unavailable ({str(e)}), polling for changes instead")
+        batches = _poll_watch(app.config['CATALOG_POLL_INTERVAL'])
+    
+    for changed in batches:
+        try:
+            if None in changed:
+                # The kernel queue overflowed, so individual events were lost
+                build_catalog()
+                publish_change(None, None)
+            else:
+                apply_file_changes(changed)
+        except Exception as e:
+            app.logger.error(f"Error applying file changes: {str(e)}")
+
+
+def start_catalog_watcher():
+    """Start the background watcher thread once per process"""
+    global catalog_watcher
+    if catalog_watcher is None and app.config['CATALOG_WATCH']:
+        catalog_watcher = threading.Thread(target=_run_catalog_watcher, name='catalog-watcher', daemon=True)
+        catalog_watcher.start()
+
+
+# Ingest pipeline: derived files built for each accepted animation.
+# Runs synchronously from the save endpoints where the result is needed in the
+# response, and in a background worker for everything else (renders, backfill).
+ingest_queue = queue.Queue()
+ingest_worker = None
+
+
+def _is_fresh(output, source):
+    return os.path.exists(output) and os.path.getmtime(output) >= os.path.getmtime(source)
+
+
+# Lottie optimizer: a smaller variant of each animation's JSON that the
+# listing, preview and export paths serve by default.
+# Editor-only fields that players never read
+LOTTIE_EDITOR_FIELDS = {'mn', 'np', 'meta'}
+# Fields that expressions can refer to, so they are only dropped without expressions
+LOTTIE_EXPRESSION_FIELDS = {'nm', 'ix', 'cix'}
+
+
+def _has_expressions(value):
+    if isinstance(value, dict):
+        if isinstance(value.get('x'), str):
+            return True
+        return any(_has_expressions(v) for v in value.values())
+    if isinstance(value, list):
+        return any(_has_expressions(v) for v in value)
+    return False
+
+
+def _drop_hidden(items):
+    """Remove hidden layers/shapes that nothing depends on"""
+    # Only layers (items with an ind) can be parents or mattes; hidden shapes always go
+    parents = {item['parent'] for item in items if isinstance(item, dict) and 'parent' in item}
+    return [
+        item for item in items
+        if not (isinstance(item, dict) and item.get('hd') is True and not item.get('td')
+                and ('ind' not in item or item['ind'] not in parents))
+    ]
+
+
+def _clean_lottie(value, drop_fields, precision):
+    if isinstance(value, float):
+        value = round(value, precision)
+        return int(value) if value.is_integer() else value
+    if isinstance(value, list):
+        return [_clean_lottie(v, drop_fields, precision) for v in value]
+    if isinstance(value, dict):
+        cleaned = {}
+        for key, v in value.items():
+            if key in drop_fields or (key == 'hd' and v is False):
+                continue
+            if key in ('layers', 'shapes', 'it') and isinstance(v, list):
+                v = _drop_hidden(v)
+            cleaned[key] = _clean_lottie(v, drop_fields, precision)
+        return cleaned
+    return value
+
+
+def _rename_refs(value, renames):
+    if isinstance(value, dict):
+        if value.get('refId') in renames:
+            value['refId'] = renames[value['refId']]
+        for v in value.values():
+            _rename_refs(v, renames)
+    elif isinstance(value, list):
+        for v in value:
+            _rename_refs(v, renames)
+
+
+def _collect_refs(value, refs):
+    if isinstance(value, dict):
+        if 'refId' in value:
+            refs.add(value['refId'])
+        for v in value.values():
+            _collect_refs(v, refs)
+    elif isinstance(value, list):
+        for v in value:
+            _collect_refs(v, refs)
+    return refs
+
+
+def optimize_lottie(data, precision=3):
+    """Return an optimized copy of parsed Lottie data.
+    
+    Rounds floats to the given number of decimals, strips editor-only fields,
+    drops hidden layers and shapes, and merges duplicate assets and precomps.
+    """
+    drop_fields = set(LOTTIE_EDITOR_FIELDS)
+    if not _has_expressions(data):
+        drop_fields |= LOTTIE_EXPRESSION_FIELDS
+    data = _clean_lottie(data, drop_fields, precision)
+    
+    assets = data.get('assets')
+    if isinstance(assets, list) and assets:
+        # Merge assets with identical content, pointing references at the first copy
+        seen = {}
+        renames = {}
+        unique_assets = []
+        for asset in assets:
+            fingerprint = json.dumps({k: v for k, v in asset.items() if k != 'id'}, sort_keys=True)
+            if fingerprint in seen and 'id' in asset:
+                renames[asset['id']] = seen[fingerprint]
+                continue
+            seen[fingerprint] = asset.get('id')
+            unique_assets.append(asset)
+        if renames:
+            _rename_refs(data, renames)
+        
+        # Precomps and images that no layer references are never drawn
+        refs = _collect_refs(data.get('layers', []), set())
+        pending = [a for a in unique_assets if a.get('id') in refs]
+        while pending:
+            asset = pending.pop()
+            for ref in _collect_refs(asset.get('layers', []), set()) - refs:
+                refs.add(ref)
+                pending.extend(a for a in unique_assets if a.get('id') == ref)
+        data['assets'] = [
+            asset for asset in unique_assets
+            if asset.get('id') in refs or not ('layers' in asset or 'p' in asset)
+        ]
+    return data
+
+
+# Shared image assets. Raster images embedded in Lottie files as base64 data
+# URIs are written once to static/assets/<aa>/<sha256>.<ext>, and the optimized
+# variant points at them instead, so its JSON shrinks and an image used by
+# several animations is downloaded and cached only once.
+ASSET_DIR = os.path.join(app.static_folder, 'assets')
+# Asset folders are referenced relative to the optimized JSON
+# (/static/animations/<category>/optimized/), four levels below the site root.
+# Players given the parsed data resolve the same path against the page
+# instead, which the extra '..' also turns into /static/assets/.
+ASSET_URL_PREFIX = '../../../../static/assets/'
+DATA_URI_RE = re.compile(r'data:(image/[\w.+-]+);base64,(.*)', re.S)
+IMAGE_EXTENSIONS = {'image/png': 'png', 'image/jpeg': 'jpg', 'image/jpg': 'jpg', 'image/webp': 'webp',
+                    'image/gif': 'gif', 'image/svg+xml': 'svg'}
+
+
+def extract_embedded_images(data):
+    """Move base64 images in data['assets'] into the shared asset store, in place.
+    
+    Returns (images extracted, bytes of data URIs removed).
+    """
+    extracted = removed = 0
+    for asset in data.get('assets') or []:
+        if not isinstance(asset, dict) or not isinstance(asset.get('p'), str):
+            continue
+        match = DATA_URI_RE.fullmatch(asset['p'])
+        extension = IMAGE_EXTENSIONS.get(match.group(1).lower()) if match else None
+        if extension is None:
+            continue
+        try:
+            image = base64.b64decode(match.group(2))
+        except ValueError:
+            continue
+        
+        digest = hashlib.sha256(image).hexdigest()
+        filename = f'{digest}.{extension}'
+        target = os.path.join(ASSET_DIR, digest[:2], filename)
+        if not os.path.exists(target):
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            tmp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(image)
+            os.replace(tmp_path, target)
+        removed += len(asset['p'])
+        asset.update(u=f'{ASSET_URL_PREFIX}{digest[:2]}/', p=filename, e=0)
+        extracted += 1
+    return extracted, removed
+
+
+def inline_shared_images(data):
+    """Put shared images back into data as data URIs, in place, for a self-contained file.
+    
+    Returns the number of images inlined.
+    """
+    inlined = 0
+    for asset in data.get('assets') or []:
+        if not isinstance(asset, dict) or not str(asset.get('u', '')).startswith(ASSET_URL_PREFIX):
+            continue
+        image_path = safe_join(ASSET_DIR, asset['u'][len(ASSET_URL_PREFIX):] + str(asset.get('p', '')))
+        if image_path is None or not os.path.isfile(image_path):
+            continue
+        with open(image_path, 'rb') as f:
+            encoded = base64.b64encode(f.read()).decode('ascii')
+        mimetype = mimetypes.guess_type(image_path)[0] or 'application/octet-stream'
+        asset.update(u='', p=f'data:{mimetype};base64,{encoded}', e=1)
+        inlined += 1
+    return inlined
+
+
+def referenced_assets():
+    """Asset files that some optimized variant still points at"""
+    referenced = set()
+    for category in CATEGORIES:
+        folder = os.path.join(app.static_folder, 'animations', category, 'optimized')
+        for filename in os.listdir(folder) if os.path.isdir(folder) else []:
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(folder, filename), 'rb') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            for asset in data.get('assets') or []:
+                if isinstance(asset, dict) and str(asset.get('u', '')).startswith(ASSET_URL_PREFIX):
+                    referenced.add(asset['u'][len(ASSET_URL_PREFIX):] + str(asset.get('p', '')))
+    return referenced
+
+
+def optimize_animation(category, name, force=False):
+    """Write the optimized variant of one animation and report the savings.
+    
+    Returns None when there is no source file or the variant is already up to date.
+    """
+    source = lottie_file_path(category, name)
+    target = optimized_file_path(category, name)
+    if source is None or (not force and _is_fresh(target, source)):
+        return None
+    
+    with open(source, 'rb') as f:
+        raw = f.read()
+    started = time.perf_counter()
+    data = json.loads(raw)
+    original_parse = time.perf_counter() - started
+    
+    optimized_data = optimize_lottie(data, app.config['LOTTIE_PRECISION'])
+    images, image_bytes = extract_embedded_images(optimized_data)
+    optimized = json.dumps(optimized_data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    started = time.perf_counter()
+    json.loads(optimized)
+    optimized_parse = time.perf_counter() - started
+    
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    tmp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(optimized)
+    os.replace(tmp_path, target)
+    
+    return {
+        'original_bytes': len(raw),
+        'optimized_bytes': len(optimized),
+        'saved_percent': round(100 * (1 - len(optimized) / len(raw)), 1) if raw else 0,
+        'original_parse_ms': round(original_parse * 1000, 2),
+        'optimized_parse_ms': round(optimized_parse * 1000, 2),
+        'extracted_images': images,
+        'extracted_image_bytes': image_bytes
+    }
+
+
+# Complexity profiles: what an animation costs to play, measured from its
+# JSON when it is saved, so clients can pick an autoplay policy or renderer
+# per animation and listings can be sorted or filtered by cost.
+# Weights of each feature in the cost score, roughly in vertices' worth of rendering
+# work. The sum is scaled up for canvases larger than 512x512, which take longer to fill.
+COMPLEXITY_WEIGHTS = {'vertices': 1, 'layers': 25, 'masks': 150, 'mattes': 150, 'effects': 100,
+                      'embedded_asset_bytes': 0.01}
+COMPLEXITY_REFERENCE_AREA = 512 * 512
+# Cost score bounds of the 'light' and 'medium' tiers; anything above is 'heavy'
+COMPLEXITY_TIERS = [(1500, 'light'), (5000, 'medium')]
+
+
+def _path_vertices(path_property):
+    """Vertices in a static or animated path property"""
+    if not isinstance(path_property, dict):
+        return 0
+    value = path_property.get('k')
+    if isinstance(value, list) and value and isinstance(value[0], dict):
+        # Animated: every keyframe holds the same number of vertices
+        value = value[0].get('s')
+        value = value[0] if isinstance(value, list) and value else None
+    if isinstance(value, dict):
+        return len(value.get('v') or [])
+    return 0
+
+
+def analyze_lottie(data):
+    """Complexity profile of parsed Lottie data.
+    
+    Precomps are counted once for every layer that uses them, since each use
+    is drawn separately.
+    """
+    assets = {asset.get('id'): asset for asset in data.get('assets') or [] if isinstance(asset, dict)}
+    profile = dict.fromkeys(['layers', 'shapes', 'vertices', 'masks', 'mattes', 'effects', 'precomp_depth'], 0)
+    
+    def walk_shapes(shapes):
+        for shape in shapes or []:
+            if not isinstance(shape, dict):
+                continue
+            profile['shapes'] += 1
+            if shape.get('ty') == 'gr':
+                walk_shapes(shape.get('it'))
+            elif shape.get('ty') == 'sh':
+                profile['vertices'] += _path_vertices(shape.get('ks'))
+    
+    def walk_layers(layers, depth, parents):
+        profile['precomp_depth'] = max(profile['precomp_depth'], depth)
+        for layer in layers or []:
+            if not isinstance(layer, dict):
+                continue
+            profile['layers'] += 1
+            masks = layer.get('masksProperties') or []
+            profile['masks'] += len(masks)
+            profile['vertices'] += sum(_path_vertices(mask.get('pt')) for mask in masks if isinstance(mask, dict))
+            profile['mattes'] += 1 if layer.get('tt') else 0
+            profile['effects'] += len(layer.get('ef') or [])
+            walk_shapes(layer.get('shapes'))
+            ref = layer.get('refId')
+            if layer.get('ty') == 0 and ref in assets and ref not in parents:
+                walk_layers(assets[ref].get('layers'), depth + 1, parents | {ref})
+    
+    walk_layers(data.get('layers'), 0, frozenset())
+    embedded = [asset['p'] for asset in assets.values()
+                if isinstance(asset.get('p'), str) and asset['p'].startswith('data:')]
+    
+    frame_rate = data.get('fr') or 0
+    profile.update(
+        frames=round((data.get('op') or 0) - (data.get('ip') or 0)),
+        frame_rate=frame_rate,
+        width=data.get('w') or 0,
+        height=data.get('h') or 0,
+        embedded_assets=len(embedded),
+        embedded_asset_bytes=sum(len(uri) for uri in embedded)
+    )
+    canvas_scale = max(1, (profile['width'] * profile['height'] / COMPLEXITY_REFERENCE_AREA) ** 0.5)
+    profile['cost'] = round(sum(profile[feature] * weight for feature, weight in COMPLEXITY_WEIGHTS.items()) * canvas_scale)
+    profile['tier'] = next((tier for bound, tier in COMPLEXITY_TIERS if profile['cost'] < bound), 'heavy')
+    return profile
+
+
+def analyze_animation(category, name):
+    """Complexity profile of an animation's original JSON, or None if there is none.
+    
+    The profile records the file's content hash, so a replaced file is analyzed again.
+    """
+    source = lottie_file_path(category, name)
+    if source is None:
+        return None
+    with open(source, 'rb') as f:
+        data = json.loads(f.read())
+    profile = analyze_lottie(data)
+    profile['sha256'] = file_digest(source)
+    return profile
+
+
+def _complexity_is_fresh(entry):
+    complexity = entry.get('complexity')
+    json_file = entry['format_manifest'].get('json')
+    return json_file is None or (complexity is not None and complexity.get('sha256') == json_file['sha256'])
+
+
+# Posters: a static poster frame and a small animated preview for each
+# animation, so the grid can show images and only load the full Lottie JSON
+# on hover or when the animation is opened.
+def _fit(width, height, max_size):
+    scale = min(1.0, max_size / max(width, height, 1))
+    return max(1, int(width * scale)), max(1, int(height * scale))
+
+
+def generate_poster(category, name, force=False):
+    """Render the poster and preview for one animation.
+    
+    Returns True if new images were written. Up-to-date outputs are left
+    alone unless force is set.
+    """
+    source = lottie_file_path(category, name)
+    if LottieAnimation is None or source is None:
+        return False
+    
+    poster_path, preview_path = poster_paths(category, name)
+    if not force and all(_is_fresh(p, source) for p in [poster_path, preview_path]):
+        return False
+    
+    for output in [poster_path, preview_path]:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    
+    # Render into temporary files and rename, so clients never see half-written images
+    ext = app.config['POSTER_FORMAT']
+    # Unique per writer, so concurrent renders never share a file; the extension picks the encoder
+    poster_tmp = f'{poster_path}.{uuid.uuid4().hex}.tmp.{ext}'
+    preview_tmp = f'{preview_path}.{uuid.uuid4().hex}.tmp.{ext}'
+    try:
+        with LottieAnimation.from_file(source) as animation:
+            width, height = animation.lottie_animation_get_size()
+            total_frames = animation.lottie_animation_get_totalframe()
+            frame = int((total_frames - 1) * app.config['POSTER_FRAME_POSITION'])
+            
+            poster_width, poster_height = _fit(width, height, app.config['POSTER_SIZE'])
+            animation.save_frame(poster_tmp, frame_num=frame, width=poster_width, height=poster_height)
+            
+            preview_width, preview_height = _fit(width, height, app.config['PREVIEW_SIZE'])
+            animation.save_animation(preview_tmp, fps=app.config['PREVIEW_FPS'],
+                                     width=preview_width, height=preview_height, quality=60)
+        os.replace(poster_tmp, poster_path)
+        os.replace(preview_tmp, preview_path)
+    finally:
+        for tmp in [poster_tmp, preview_tmp]:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return True
+
+
+# Precompression: .gz (and .br with brotli installed) siblings of each JSON
+# file, so responses can be compressed without spending CPU per request.
+def compressed_paths(file_path):
+    paths = {'gzip': f'{file_path}.gz'}
+    if brotli is not None:
+        paths['br'] = f'{file_path}.br'
+    return paths
+
+
+def precompress_file(file_path, force=False):
+    """Write compressed siblings for a file; returns True if any were written"""
+    written = False
+    for encoding, target in compressed_paths(file_path).items():
+        if not force and _is_fresh(target, file_path):
+            continue
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        if encoding == 'br':
+            compressed = brotli.compress(data, quality=11)
+        else:
+            # A fixed mtime keeps the output (and its ETag) reproducible
+            compressed = gzip.compress(data, compresslevel=9, mtime=0)
+        tmp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(compressed)
+        os.replace(tmp_path, target)
+        written = True
+    return written
+
+
+def _ingest_outputs(category, name):
+    """Every derived file the ingest stages produce for an animation"""
+    outputs = [optimized_file_path(category, name)]
+    for json_file in [lottie_file_path(category, name), optimized_file_path(category, name)]:
+        if json_file:
+            outputs.extend(compressed_paths(json_file).values())
+    if LottieAnimation is not None:
+        outputs.extend(poster_paths(category, name))
+    return outputs
+
+
+def process_animation(category, name, force=False):
+    """Run every ingest stage for one animation and refresh its catalog entry"""
+    entry = catalog.get((category, name))
+    if entry and (force or not _complexity_is_fresh(entry)):
+        try:
+            write_metadata(category, name, complexity=analyze_animation(category, name))
+        except ValueError as e:
+            app.logger.error(f"Could not analyze {category}/{name}: {str(e)}")
+        else:
+            refresh_catalog_entry(category, name)
+    report = optimize_animation(category, name, force=force)
+    for json_file in [lottie_file_path(category, name), optimized_file_path(category, name)]:
+        if json_file and os.path.exists(json_file):
+            precompress_file(json_file, force=force)
+    rendered = generate_poster(category, name, force=force)
+    if report or rendered:
+        refresh_catalog_entry(category, name)
+    return report
+
+
+def queue_ingest(category, name):
+    """Schedule the ingest stages for an animation on the background worker"""
+    ingest_queue.put((category, name))
+
+
+def _run_ingest_worker():
+    while True:
+        category, name = ingest_queue.get()
+        try:
+            process_animation(category, name)
+        except Exception as e:
+            app.logger.error(f"Error processing {category}/{name}: {str(e)}")
+        finally:
+            ingest_queue.task_done()
+
+
+def start_ingest_worker():
+    """Start the ingest worker thread once per process"""
+    global ingest_worker
+    if ingest_worker is None:
+        ingest_worker = threading.Thread(target=_run_ingest_worker, name='ingest-worker', daemon=True)
+        ingest_worker.start()
+
+
+def backfill_ingest():
+    """Queue every animation whose derived files are missing or out of date"""
+    with catalog_lock:
+        keys = [(key, _complexity_is_fresh(entry)) for key, entry in catalog.items() if 'json' in entry['formats']]
+    for (category, name), analyzed in keys:
+        source = lottie_file_path(category, name)
+        if source and not (analyzed and all(_is_fresh(output, source) for output in _ingest_outputs(category, name))):
+            queue_ingest(category, name)
+
+
+@app.cli.command('optimize-animations')
+@click.option('--force', is_flag=True, help='Rebuild variants that are already up to date.')
+def optimize_animations_command(force):
+    """Build the optimized JSON variant for every animation in the catalog."""
+    with catalog_lock:
+        keys = sorted(catalog)
+    original_bytes = optimized_bytes = 0
+    for category, name in keys:
+        try:
+            report = optimize_animation(category, name, force=force)
+        except Exception as e:
+            click.echo(f'{category}/{name}: {str(e)}', err=True)
+            continue
+        if report:
+            original_bytes += report['original_bytes']
+            optimized_bytes += report['optimized_bytes']
+    click.echo(f'Optimized {original_bytes} bytes down to {optimized_bytes} bytes')
+
+
+@app.cli.command('generate-posters')
+@click.option('--force', is_flag=True, help='Re-render posters that are already up to date.')
+def generate_posters_command(force):
+    """Render posters and previews for every animation in the catalog."""
+    if LottieAnimation is None:
+        raise click.ClickException('Poster generation needs rlottie-python and Pillow')
+    
+    with catalog_lock:
+        keys = sorted(catalog)
+    rendered = 0
+    for category, name in keys:
+        try:
+            rendered += generate_poster(category, name, force=force)
+        except Exception as e:
+            click.echo(f'{category}/{name}: {str(e)}', err=True)
+    click.echo(f'Rendered posters for {rendered} of {len(keys)} animations')
+
+
+@app.cli.command('import-metadata')
+@click.option('--overwrite', is_flag=True, help='Replace records that are already in the store.')
+def import_metadata_command(overwrite):
+    """Fold the JSON sidecars in static/metadata into the metadata store."""
+    imported = import_metadata_sidecars(overwrite=overwrite)
+    build_catalog()
+    click.echo(f'Imported {imported} metadata records into {app.config["METADATA_DB"]}')
+
+
+@app.cli.command('reap-uploads')
+def reap_uploads_command():
+    """Remove abandoned uploads from the staging folder now."""
+    removed, removed_bytes = reap_staged_uploads()
+    stats = staging_stats()
+    click.echo(f"Removed {removed} staged files ({removed_bytes} bytes); "
+               f"{stats['files']} files ({stats['bytes']} bytes) remain")
+
+
+@app.cli.command('dedupe-animations')
+def dedupe_animations_command():
+    """Move every animation file into the blob store so duplicates share storage."""
+    with catalog_lock:
+        keys = sorted(catalog)
+    files = saved = 0
+    for category, name in keys:
+        sources = [lottie_file_path(category, name)]
+        sources += [media_file_path(category, name, media_type) for media_type in MEDIA_FORMATS]
+        for file_path in sources:
+            if not file_path or not os.path.exists(file_path):
+                continue
+            blob = blob_path(file_digest(file_path))
+            if os.path.exists(blob) and not os.path.samefile(blob, file_path):
+                saved += os.path.getsize(file_path)
+            place_file(file_path, file_path)
+            files += 1
+    click.echo(f'Linked {files} files into the blob store, {saved} bytes of duplicates freed')
+
+
+@app.cli.command('prune-assets')
+def prune_assets_command():
+    """Remove shared images that no optimized animation refers to any more."""
+    referenced = referenced_assets()
+    removed = freed = 0
+    for folder in os.listdir(ASSET_DIR) if os.path.isdir(ASSET_DIR) else []:
+        for filename in os.listdir(os.path.join(ASSET_DIR, folder)):
+            if f'{folder}/{filename}' not in referenced:
+                image_path = os.path.join(ASSET_DIR, folder, filename)
+                freed += os.path.getsize(image_path)
+                os.remove(image_path)
+                removed += 1
+    click.echo(f'Removed {removed} unused shared images ({freed} bytes)')
+
+
+# Asset delivery: strong ETags, conditional GETs and precompressed variants
+# for everything under static/animations
+COMPRESSIBLE_TYPES = {'application/json', 'image/svg+xml', 'text/css', 'text/javascript', 'application/javascript'}
+
+
+def send_asset(file_path, mimetype=None, download_name=None):
+    """Send a file with a content-hash ETag, answering If-None-Match with 304.
+    
+    JSON and SVG are served from their precompressed siblings when the client
+    accepts the encoding. Requests whose ?v= matches the content version get
+    a long-lived immutable Cache-Control; everything else must revalidate.
+    Bodies are streamed in blocks and honour Range requests, or are handed to
+    the front server entirely when SENDFILE_MODE is set.
+    """
+    with metrics_span('read'):
+        return _prepare_asset(file_path, mimetype, download_name)
+
+
+def _prepare_asset(file_path, mimetype, download_name):
+    mimetype = mimetype or mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+    digest = file_digest(file_path)
+    etag = digest
+    served_path = file_path
+    encoding = None
+    offload = app.config['SENDFILE_MODE']
+    
+    # With offloading the front server picks the encoding (gzip_static / brotli_static)
+    if mimetype in COMPRESSIBLE_TYPES and not offload:
+        for candidate in ['br', 'gzip']:
+            sibling = compressed_paths(file_path).get(candidate)
+            if sibling and candidate in request.accept_encodings and _is_fresh(sibling, file_path):
+                served_path = sibling
+                encoding = candidate
+                etag = f'{digest}-{candidate}'
+                break
+    
+    if offload in ('x-sendfile', 'x-accel-redirect'):
+        response = _offload_response(served_path, mimetype, download_name, etag)
+    else:
+        response = send_file(
+            served_path,
+            mimetype=mimetype,
+            as_attachment=download_name is not None,
+            download_name=download_name,
+            conditional=True,
+            etag=etag
+        )
+        response.accept_ranges = 'bytes'
+    if mimetype in COMPRESSIBLE_TYPES:
+        response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    
+    if request.args.get('v') == digest[:12]:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = app.config['IMMUTABLE_MAX_AGE']
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response
+
+
+def _offload_response(file_path, mimetype, download_name, etag):
+    """Empty response telling nginx (X-Accel-Redirect) or Apache/lighttpd (X-Sendfile) to send the file.
+    
+    The front server handles Range requests itself, so only If-None-Match is
+    answered here.
+    """
+    response = app.response_class(mimetype=mimetype)
+    if app.config['SENDFILE_MODE'] == 'x-accel-redirect':
+        relative = os.path.relpath(file_path, app.static_folder).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = app.config['ACCEL_REDIRECT_PREFIX'].rstrip('/') + '/' + url_quote(relative)
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(file_path)
+    if download_name is not None:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    response.last_modified = int(os.path.getmtime(file_path))
+    response.set_etag(etag)
+    return response.make_conditional(request)
+
+
+@app.route('/static/animations/<category>/<path:filename>')
+def animation_asset(category, filename):
+    """Animation files, served through send_asset instead of the plain static route"""
+    if category not in CATEGORIES:
+        abort(404)
+    file_path = safe_join(os.path.join(app.static_folder, 'animations', category), filename)
+    if file_path is None:
+        abort(404)
+    file_path = storage.fetch(storage_key(file_path)) or file_path
+    if not os.path.isfile(file_path):
+        abort(404)
+    return send_asset(file_path)
+
+
+@app.route('/static/assets/<path:filename>')
+def shared_asset(filename):
+    """Images extracted from animations. They are named by content hash, so they never change."""
+    file_path = safe_join(ASSET_DIR, filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+    response = send_asset(file_path)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['IMMUTABLE_MAX_AGE']
+    response.cache_control.immutable = True
+    return response
+
+
+# Front-end bundles. The page's stylesheet and script live in static/css and
+# static/js, and the Lottie runtimes in static/vendor once vendor-runtimes has
+# fetched them. Templates link them with their content version, so browsers
+# cache them for good and pick up a new URL whenever a file changes.
+BUNDLE_FOLDERS = ['css', 'js', 'vendor']
+VENDOR_DIR = os.path.join(app.static_folder, 'vendor')
+# Pinned runtime builds, also linked directly while they aren't vendored
+VENDOR_RUNTIMES = {
+    'lottie-player.js': 'https://unpkg.com/@lottiefiles/lottie-player@2.0.12/dist/lottie-player.js',
+    'lottie.min.js': 'https://cdnjs.cloudflare.com/ajax/libs/bodymovin/5.9.4/lottie.min.js'
+}
+
+
+@app.template_global()
+def static_bundle(filename):
+    """Versioned URL of a file under static/"""
+    return versioned_url(f'/static/{filename}', os.path.join(app.static_folder, filename))
+
+
+@app.template_global()
+def vendor_script(filename):
+    """Local URL of a vendored runtime, or its pinned CDN URL while it isn't vendored"""
+    if os.path.isfile(os.path.join(VENDOR_DIR, filename)):
+        return static_bundle(f'vendor/{filename}')
+    return VENDOR_RUNTIMES[filename]
+
+
+def precompress_bundles():
+    """Refresh the compressed siblings of every bundle file"""
+    for folder in BUNDLE_FOLDERS:
+        bundle_dir = os.path.join(app.static_folder, folder)
+        if not os.path.isdir(bundle_dir):
+            continue
+        for filename in os.listdir(bundle_dir):
+            file_path = os.path.join(bundle_dir, filename)
+            if os.path.splitext(filename)[1] in ('.css', '.js') and os.path.isfile(file_path):
+                precompress_file(file_path)
+
+
+@app.route('/sw.js')
+def service_worker():
+    """The service worker, served from the root so that it controls the whole site"""
+    return send_asset(os.path.join(app.static_folder, 'js', 'sw.js'))
+
+
+@app.route('/static/<any(css, js, vendor):folder>/<path:filename>')
+def bundle_asset(folder, filename):
+    """Stylesheets and scripts, immutable when requested with their version"""
+    file_path = safe_join(os.path.join(app.static_folder, folder), filename)
+    if file_path is None or not os.path.isfile(file_path):
+        abort(404)
+    return send_asset(file_path)
+
+
+@app.cli.command('vendor-runtimes')
+def vendor_runtimes_command():
+    """Download the pinned Lottie runtimes into static/vendor so the page needs no CDN."""
+    os.makedirs(VENDOR_DIR, exist_ok=True)
+    for filename, url in VENDOR_RUNTIMES.items():
+        try:
+            with urllib.request.urlopen(url, timeout=60) as response:
+                data = response.read()
+        except OSError as e:
+            raise click.ClickException(f'Could not download {url}: {str(e)}')
+        target = os.path.join(VENDOR_DIR, filename)
+        tmp_path = f'{target}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, target)
+        click.echo(f'{filename}: {len(data)} bytes from {url}')
+    precompress_bundles()
+
+
+# Worker processes. Each process keeps its own in-memory catalog. Refreshes
+# caused by writes are recorded in the changes table of the metadata store,
+# and every process replays the ones made by the others. Only the process
+# holding the leader lock watches the folders and backfills the ingest
+# pipeline, so several workers don't repeat that work.
+change_listener = None
+leader_lock = None
+last_prune = 0
+
+
+def try_become_leader():
+    """Take the leader lock if no other process holds it"""
+    global leader_lock
+    if leader_lock is None:
+        if fcntl is None:
+            leader_lock = True
+        else:
+            os.makedirs(app.instance_path, exist_ok=True)
+            lock_file = open(os.path.join(app.instance_path, 'leader.lock'), 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            leader_lock = lock_file
+        start_catalog_watcher()
+        start_staging_reaper()
+        if storage.remote:
+            start_storage_sync()
+        precompress_bundles()
+        threading.Thread(target=_run_startup_backfill, name='startup-backfill', daemon=True).start()
+    return True
+
+
+def backfill_digests():
+    """Hash the files the catalog was built without a digest for, and forget deleted ones"""
+    with catalog_lock:
+        keys = [key for key, entry in catalog.items()
+                if any(info['sha256'] is None for info in entry['format_manifest'].values())]
+    for category, name in keys:
+        # Refreshing computes and stores the digests
+        refresh_catalog_entry(category, name, publish=False)
+    if keys:
+        # The other workers reload their catalogs once, with every digest now stored
+        publish_change(None, None)
+    
+    db = metadata_db()
+    stale = [path for path, in db.execute('SELECT path FROM file_digests') if not os.path.exists(path)]
+    with db:
+        db.executemany('DELETE FROM file_digests WHERE path = ?', [(path,) for path in stale])
+    if keys:
+        app.logger.info(f"Computed file digests for {len(keys)} animations")
+
 
-app = Flask(__name__)
+def _run_startup_backfill():
+    try:
+        backfill_digests()
+        # Complexity profiles are matched against the digests, so they go first
+        if app.config['INGEST_BACKFILL']:
+            backfill_ingest()
+    except Exception as e:
+        app.logger.error(f"Error backfilling derived data: {str(e)}")
 
-# Path to store metadata
-META_DIR = os.path.join(app.static_folder, 'metadata')
-os.makedirs(META_DIR, exist_ok=True)
 
-# Define animation categories
-CATEGORIES = {
-    'illustrations': 'Illustrations',
-    'loadings': 'Loadings',
-    'logo-animations': 'Logo Animations',
-    'backgrounds': 'Backgrounds',
-    'design-elements': 'Design Elements',
-    'icons': 'Icons'
-}
+def apply_published_changes():
+    """Refresh the animations other processes changed since the last call"""
+    global last_change_id, last_journal_id
+    rows = metadata_db().execute(
+        'SELECT id, category, name, pid, journal_id FROM changes WHERE id > ? ORDER BY id', (last_change_id,)).fetchall()
+    keys = set()
+    rebuild = False
+    latest = last_change_id
+    latest_journal = last_journal_id
+    for change_id, category, name, pid, journal_id in rows:
+        latest = change_id
+        latest_journal = max(latest_journal, journal_id or 0)
+        if pid == os.getpid():
+            continue
+        if category is None:
+            rebuild = True
+        else:
+            keys.add((category, name))
+    
+    if rebuild:
+        build_catalog()
+    else:
+        for category, name in keys:
+            refresh_catalog_entry(category, name, publish=False)
+    # Advanced only once the catalog reflects the changes, since the manifest
+    # version promises exactly that
+    last_change_id = max(last_change_id, latest)
+    last_journal_id = max(last_journal_id, latest_journal)
+    return len(rows)
 
-# Ensure media directories exist
-for category in CATEGORIES:
-    for media_type in ['mp4', 'gif']:
-        media_dir = os.path.join(app.static_folder, 'animations', category, media_type)
-        os.makedirs(media_dir, exist_ok=True)
+
+def _run_change_listener():
+    global last_prune
+    while True:
+        time.sleep(app.config['CHANGE_POLL_INTERVAL'])
+        try:
+            apply_published_changes()
+            # Take over the folder watcher if the leader went away; the
+            # leader also trims the change log now and then
+            if try_become_leader() and time.time() - last_prune > 60:
+                cutoff = time.time() - app.config['CHANGE_LOG_RETENTION']
+                db = metadata_db()
+                with db:
+                    # The row of the newest journal entry records how far the node has synced
+                    db.execute('DELETE FROM changes WHERE at < ? AND (journal_id IS NULL OR journal_id < ?)',
+                               (cutoff, latest_journal_id()))
+                storage.trim_journal(cutoff)
+                last_prune = time.time()
+            if app.config['METRICS_ENABLED'] and time.time() - last_metrics_snapshot > app.config['METRICS_SNAPSHOT_INTERVAL']:
+                write_metrics_snapshot()
+        except Exception as e:
+            app.logger.error(f"Error applying catalog changes: {str(e)}")
+
+
+def start_change_listener():
+    """Start following the change log once per process"""
+    global change_listener
+    if change_listener is None:
+        change_listener = threading.Thread(target=_run_change_listener, name='change-listener', daemon=True)
+        change_listener.start()
+
+
+def start_background_workers():
+    """Start this process's background threads, and the leader's if it takes the lock"""
+    start_ingest_worker()
+    start_change_listener()
+    try_become_leader()
+
+
+# run_server starts them before serving; this covers servers that import the
+# app themselves (gunicorn app:app and the like)
+app.before_first_request(start_background_workers)
 
 @app.route('/', defaults={'category': None})
 @app.route('/<category>')
 def index(category):
-    # Always return to homepage state
+    """Home page, or a category or search view with its first page rendered in place.
+    
+    Paths that aren't a category show the home page, as before.
+    """
+    current_category = category if category in CATEGORIES else ''
+    search_query = ' '.join(request.args.get('q', '').split())
+    listing = bool(current_category or search_query)
+    entries, total, next_cursor = [], 0, None
+    if listing:
+        entries, total, next_cursor = list_animations(category=current_category, query=search_query)
+    with catalog_lock:
+        category_counts = {key: facet_totals[key] for key in CATEGORIES}
+    animations = [serialize_catalog_entry(entry) for entry in entries]
+    
     return render_template('index.html',
                           categories=CATEGORIES,
-                          current_category='',
-                          search_query='',
-                          current_page=1,
-                          total_pages=1,
-                          total_animations=0,
-                          animations=[])
+                          category_counts=category_counts,
+                          current_category=current_category,
+                          search_query=search_query,
+                          total_animations=total,
+                          listing=listing,
+                          animations=animations,
+                          page_state={
+                              'categories': CATEGORIES,
+                              'current_category': current_category,
+                              'search_query': search_query,
+                              'listing': listing,
+                              'animations': animations,
+                              'next_cursor': next_cursor,
+                              'playback_budget': app.config['GRID_PLAYBACK_BUDGET']
+                          })
+
+def encode_cursor(row, sort, order):
+    """Opaque token for resuming a listing right after the given row"""
+    payload = json.dumps({'k': list(row), 's': sort, 'o': order}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, sort, order):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        row = tuple(payload['k'])
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if len(row) != 3 or payload.get('s') != sort or payload.get('o') != order:
+        raise ValueError('Cursor does not match the requested sort order')
+    return row
+
+
+def list_animations(category='', query='', sort=None, order=None, cursor=None, page=1, limit=None, max_cost=None):
+    """Return one page of the catalog as (entries, total, next_cursor).
+    
+    Without a query the page is read straight from a pre-sorted catalog view.
+    A cursor resumes right after the row it was issued for, so pages stay
+    stable while animations are added or removed in between requests.
+    max_cost keeps only analyzed animations whose complexity cost is at most that.
+    Raises ValueError for unknown sort options or malformed cursors.
+    """
+    # If category is specified, list only that category
+    scope = category if category in CATEGORIES else None
+    query = query.strip()
+    sort = sort or ('relevance' if query else 'name')
+    if sort not in SORT_VALUES and not (sort == 'relevance' and query):
+        raise ValueError(f'Invalid sort option: {sort}')
+    order = order or DEFAULT_SORT_ORDER[sort]
+    if order not in ('asc', 'desc'):
+        raise ValueError(f'Invalid sort order: {order}')
+    limit = limit or app.config['PAGE_SIZE']
+    after = decode_cursor(cursor, sort, order) if cursor else None
+    
+    with catalog_lock:
+        if query:
+            # Ranked lookup in the inverted search index
+            with metrics_span('search'):
+                matches = search_catalog(query, scope)
+        with metrics_span('sort'):
+            if not query:
+                rows = catalog_views[(scope, sort)]
+            elif sort == 'relevance':
+                rows = [(-score, key[1], key[0]) for score, key in matches]
+            else:
+                rows = sorted(sort_row(sort, catalog[key]) for _, key in matches)
+            if max_cost is not None:
+                cost = SORT_VALUES['complexity']
+                rows = [row for row in rows if 0 <= cost(catalog[(row[2], row[1])]) <= max_cost]
+            total = len(rows)
+            
+            if order == 'asc':
+                start = bisect.bisect_right(rows, after) if after else (page - 1) * limit
+                page_rows = rows[start:start + limit]
+                has_more = start + limit < total
+            else:
+                # Walk the view backwards from the end (or from just before the cursor)
+                end = bisect.bisect_left(rows, after) if after else total - (page - 1) * limit
+                start = max(end - limit, 0)
+                page_rows = rows[start:max(end, 0)][::-1]
+                has_more = start > 0
+        
+        entries = [catalog[(row[2], row[1])] for row in page_rows]
+    
+    next_cursor = encode_cursor(page_rows[-1], sort, order) if has_more and page_rows else None
+    return entries, total, next_cursor
+
+
+# Response cache for /api/animations. Each entry holds the serialized body
+# and the generation of the catalog scope it was built from, and is never
+# served once that scope has changed. The TTL only bounds how long
+# unpopular entries hold memory.
+response_cache = collections.OrderedDict()
+response_cache_lock = threading.Lock()
+response_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0, 'expirations': 0}
+
+
+def response_cache_get(key, scope):
+    """Cached body for key if it is still current, else None"""
+    with response_cache_lock:
+        cached = response_cache.get(key)
+        if cached is not None:
+            generation, expires, body = cached
+            if generation != catalog_generations[scope]:
+                del response_cache[key]
+                response_cache_stats['invalidations'] += 1
+            elif expires < time.monotonic():
+                del response_cache[key]
+                response_cache_stats['expirations'] += 1
+            else:
+                response_cache.move_to_end(key)
+                response_cache_stats['hits'] += 1
+                return body
+        response_cache_stats['misses'] += 1
+        return None
+
+
+def response_cache_put(key, generation, body):
+    with response_cache_lock:
+        response_cache[key] = (generation, time.monotonic() + app.config['RESPONSE_CACHE_TTL'], body)
+        response_cache.move_to_end(key)
+        while len(response_cache) > app.config['RESPONSE_CACHE_SIZE']:
+            response_cache.popitem(last=False)
+            response_cache_stats['evictions'] += 1
+
 
 @app.route('/api/animations')
 def get_animations():
     category = request.args.get('category', '')
-    page = int(request.args.get('page', 1))
-    per_page = 12
-    search_query = request.args.get('q', '').lower()
-    
-    animations = []
-    
-    # If category is specified, search only in that category
-    categories_to_search = [category] if category in CATEGORIES else CATEGORIES.keys()
-    
-    for current_category in categories_to_search:
-        # Look in the category metadata directory first (more reliable)
-        meta_dir = os.path.join(META_DIR, current_category)
-        lottie_dir = os.path.join(app.static_folder, 'animations', current_category, 'lottie')
-        animations_dir = os.path.join(app.static_folder, 'animations', current_category)
-        os.makedirs(animations_dir, exist_ok=True)
-        
-        # First check for metadata files in the category's metadata directory
-        if os.path.exists(meta_dir):
-            for meta_file in os.listdir(meta_dir):
-                if meta_file.endswith('.json'):
-                    meta_path = os.path.join(meta_dir, meta_file)
-                    name = os.path.splitext(meta_file)[0]
-                    
-                    try:
-                        with open(meta_path, 'r') as f:
-                            meta = json.load(f)
-                            path = meta.get('path')
-                            hashtags = meta.get('hashtags', [])
-                            formats = meta.get('formats', [])
-                            
-                            # If no path in metadata, try to construct it
-                            if not path:
-                                path = f'/static/animations/{current_category}/lottie/{name}.json'
-                            
-                            # Check if animation matches search query
-                            search_terms = name.lower() + ' ' + ' '.join(hashtags).lower()
-                            if not search_query or search_query in search_terms:
-                                animations.append({
-                                    'name': name,
-                                    'path': path,
-                                    'category': current_category,
-                                    'hashtags': hashtags,
-                                    'formats': formats
-                                })
-                    except Exception as e:
-                        app.logger.error(f"Error loading metadata file {meta_path}: {str(e)}")
-                        continue
+    # Case is kept, since camelCase in a query splits into words
+    search_query = ' '.join(request.args.get('q', '').split())
+    
+    try:
+        page = max(int(request.args.get('page', 1)), 1)
+        limit = max(1, min(int(request.args.get('limit', app.config['PAGE_SIZE'])), app.config['MAX_PAGE_SIZE']))
+        max_cost = request.args.get('max_cost', type=float)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    sort = request.args.get('sort')
+    order = request.args.get('order')
+    cursor = request.args.get('cursor')
+    
+    # Read the generation before listing, so a change landing in between
+    # makes the stored body stale rather than wrongly current
+    scope = category if category in CATEGORIES else None
+    cache_key = (scope, search_query, sort, order, cursor, None if cursor else page, limit, max_cost)
+    generation = catalog_generations[scope]
+    with metrics_span('cache'):
+        body = response_cache_get(cache_key, scope)
+    
+    if body is None:
+        try:
+            entries, total, next_cursor = list_animations(
+                category=category,
+                query=search_query,
+                sort=sort,
+                order=order,
+                cursor=cursor,
+                page=page,
+                limit=limit,
+                max_cost=max_cost
+            )
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Next look in lottie subfolder (for files that might not have metadata)
-        if os.path.exists(lottie_dir):
-            for file in os.listdir(lottie_dir):
-                if file.endswith('.json'):
-                    name = os.path.splitext(file)[0]
-                    
-                    # Skip if we already added this animation from metadata
-                    if any(a['name'] == name and a['category'] == current_category for a in animations):
-                        continue
-                    
-                    # Try to find metadata in other locations
-                    meta_file = os.path.join(META_DIR, current_category, f'{name}.json')
-                    if not os.path.exists(meta_file):
-                        meta_file = os.path.join(META_DIR, f'{name}.json')
-                    
-                    hashtags = []
-                    
-                    if os.path.exists(meta_file):
-                        with open(meta_file, 'r') as f:
-                            meta = json.load(f)
-                            hashtags = meta.get('hashtags', [])
-                    
-                    # Check if animation matches search query
-                    search_terms = name.lower() + ' ' + ' '.join(hashtags).lower()
-                    if not search_query or search_query in search_terms:
-                        animations.append({
-                            'name': name,
-                            'path': f'/static/animations/{current_category}/lottie/{file}',
-                            'category': current_category,
-                            'hashtags': hashtags
-                        })
-        
-        # Also check for files in the root directory (for backwards compatibility)
-        if os.path.exists(animations_dir):
-            for file in os.listdir(animations_dir):
-                if file.endswith('.json') and file != 'metadata.json':
-                    name = os.path.splitext(file)[0]
-                    # Skip if we already added this animation from the lottie folder or metadata
-                    if any(a['name'] == name and a['category'] == current_category for a in animations):
-                        continue
-                        
-                    # Try to find metadata
-                    meta_file = os.path.join(META_DIR, current_category, f'{name}.json')
-                    if not os.path.exists(meta_file):
-                        meta_file = os.path.join(META_DIR, f'{name}.json')
-                        
-                    hashtags = []
-                    
-                    if os.path.exists(meta_file):
-                        with open(meta_file, 'r') as f:
-                            try:
-                                meta = json.load(f)
-                                hashtags = meta.get('hashtags', [])
-                            except:
-                                # If metadata is invalid, just continue with empty hashtags
-                                pass
-                    
-                    # Check if animation matches search query
-                    search_terms = name.lower() + ' ' + ' '.join(hashtags).lower()
-                    if not search_query or search_query in search_terms:
-                        animations.append({
-                            'name': name,
-                            'path': f'/static/animations/{current_category}/{file}',
-                            'category': current_category,
-                            'hashtags': hashtags
-                        })
-    
-    # Sort animations by name
-    animations.sort(key=lambda x: x['name'])
-    
-    # Pagination
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_animations = animations[start:end]
+        with metrics_span('serialize'):
+            body = json.dumps({
+                'animations': [serialize_catalog_entry(entry) for entry in entries],
+                'total': total,
+                'has_more': next_cursor is not None,
+                'next_cursor': next_cursor
+            }, separators=(',', ':')).encode()
+        response_cache_put(cache_key, generation, body)
+        cache_status = 'MISS'
+    else:
+        cache_status = 'HIT'
     
-    return jsonify({
-        'animations': paginated_animations,
-        'total': len(animations),
-        'has_more': end < len(animations)
+    response = app.response_class(body, mimetype='application/json')
+    response.headers['X-Cache'] = cache_status
+    return response
+
+
+@app.route('/api/cache/stats')
+def get_cache_stats():
+    """Hit, miss and eviction counts of the /api/animations response cache"""
+    with response_cache_lock:
+        stats = dict(response_cache_stats, entries=len(response_cache))
+    stats['max_entries'] = app.config['RESPONSE_CACHE_SIZE']
+    return jsonify(stats)
+
+
+@app.route('/api/facets')
+def get_facets():
+    """Animation counts, format coverage and the most used hashtags, overall and per category"""
+    top = max(1, min(request.args.get('top', 20, type=int), 100))
+    
+    def scope_facets(scope):
+        return {
+            'total': facet_totals[scope],
+            'formats': dict(facet_formats[scope]),
+            'hashtags': [{'hashtag': hashtag, 'count': -count} for count, hashtag in facet_hashtag_ranks[scope][:top]]
+        }
+    
+    with catalog_lock:
+        facets = scope_facets(None)
+        facets['categories'] = {category: scope_facets(category) for category in CATEGORIES}
+        facets['generation'] = catalog_generations[None]
+    return jsonify(facets)
+
+
+@app.route('/api/formats', methods=['POST'])
+def get_formats():
+    """Bulk lookup of the format manifest for a list of animations"""
+    data = request.get_json(silent=True) or {}
+    animations = data.get('animations')
+    if not isinstance(animations, list):
+        return jsonify({'success': False, 'error': 'Expected a list of animations'}), 400
+    if len(animations) > app.config['MAX_PAGE_SIZE']:
+        return jsonify({'success': False, 'error': f"At most {app.config['MAX_PAGE_SIZE']} animations per request"}), 400
+    
+    # Keyed by 'category/name'; animations that don't exist map to null
+    formats = {}
+    for item in animations:
+        if not isinstance(item, dict):
+            return jsonify({'success': False, 'error': 'Each animation needs a category and a name'}), 400
+        category, name = item.get('category'), item.get('name')
+        if not isinstance(category, str) or not isinstance(name, str) or category not in CATEGORIES:
+            return jsonify({'success': False, 'error': 'Invalid name or category'}), 400
+        entry = catalog.get((category, name))
+        formats[f'{category}/{name}'] = entry['format_manifest'] if entry else None
+    
+    return jsonify({'success': True, 'formats': formats})
+
+
+# Client manifest: the content-versioned URLs (?v=<hash>) of every
+# animation's served JSON and of each format, so browsers can keep copies
+# keyed by content. Its version is the last change this process has applied
+# (the last journal entry, with remote storage); clients pass it back as
+# ?since= and get only what changed after it. Pages
+# ask for it one category at a time (?category=), as categories are shown.
+def manifest_entry(entry):
+    return {
+        'path': entry['path'],
+        'formats': {format_type: info['url'] for format_type, info in entry['format_manifest'].items()}
+    }
+
+
+@app.route('/api/manifest')
+def get_manifest():
+    """Manifest of every animation, or with ?since=<version> of those changed since then.
+    
+    ?category= limits it to one category. Animations removed since then map
+    to null. When the change log doesn't reach back to that version the whole
+    manifest (of the category) is returned, with full set.
+    """
+    since = request.args.get('since', type=int)
+    scope = request.args.get('category') or None
+    if scope is not None and scope not in CATEGORIES:
+        return jsonify({'success': False, 'error': 'Invalid category'}), 404
+    # With remote storage the version is the journal's, so any node can answer
+    version = last_journal_id if storage.remote else last_change_id
+    changed = changes_since(since, version) if since is not None else None
+    if changed is not None and scope is not None:
+        changed = {key for key in changed if key[0] == scope}
+    
+    with catalog_lock:
+        if changed is None and scope is not None:
+            rows = catalog_views[(scope, 'name')]
+            animations = {f'{category}/{name}': manifest_entry(catalog[(category, name)]) for _, name, category in rows}
+        elif changed is None:
+            animations = {f'{category}/{name}': manifest_entry(entry) for (category, name), entry in catalog.items()}
+        else:
+            animations = {f'{category}/{name}': manifest_entry(catalog[(category, name)]) if (category, name) in catalog else None
+                          for category, name in changed}
+    
+    response = jsonify({
+        'version': version if changed is None else max(version, since),
+        'full': changed is None,
+        'animations': animations
     })
+    response.cache_control.no_cache = True
+    return response
+
+
+def _bundle_line(entry, original=False):
+    """One NDJSON line carrying an animation's Lottie data"""
+    category, name = entry['category'], entry['name']
+    file_path = optimized_file_path(category, name)
+    if original or not os.path.exists(file_path):
+        file_path = lottie_file_path(category, name)
+    header = {'type': 'animation', 'category': category, 'name': name, 'path': entry['path']}
+    try:
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        # Optimized files are already compact; anything spanning lines is re-serialized
+        if b'\n' in data or b'\r' in data:
+            data = json.dumps(json.loads(data), separators=(',', ':')).encode()
+    except (TypeError, OSError, ValueError) as e:
+        return json.dumps(dict(header, type='error', error=f'Could not read animation: {str(e)}')).encode() + b'\n'
+    header['etag'] = file_digest(file_path)
+    return json.dumps(header)[:-1].encode() + b',"data":' + data + b'}\n'
+
 
+@app.route('/api/bundle', methods=['GET', 'POST'])
+def get_bundle():
+    """Stream the Lottie data of many animations as newline-delimited JSON.
+    
+    POST a list of animations, or GET with the /api/animations listing
+    parameters to bundle a whole page (its first line then describes the
+    page). Each animation is sent as soon as it has been read, gzip
+    compressed and flushed per line when the client accepts it.
+    """
+    lines = []
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        animations = data.get('animations')
+        if not isinstance(animations, list) or not all(isinstance(item, dict) for item in animations):
+            return jsonify({'success': False, 'error': 'Expected a list of animations'}), 400
+        if len(animations) > app.config['MAX_PAGE_SIZE']:
+            return jsonify({'success': False, 'error': f"At most {app.config['MAX_PAGE_SIZE']} animations per request"}), 400
+        keys = [(item.get('category'), item.get('name')) for item in animations]
+    else:
+        try:
+            entries, total, next_cursor = list_animations(
+                category=request.args.get('category', ''),
+                query=' '.join(request.args.get('q', '').split()),
+                sort=request.args.get('sort'),
+                order=request.args.get('order'),
+                cursor=request.args.get('cursor'),
+                page=max(int(request.args.get('page', 1)), 1),
+                limit=max(1, min(int(request.args.get('limit', app.config['PAGE_SIZE'])), app.config['MAX_PAGE_SIZE'])),
+                max_cost=request.args.get('max_cost', type=float)
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        keys = [(entry['category'], entry['name']) for entry in entries]
+        lines.append(json.dumps({
+            'type': 'page',
+            'animations': [serialize_catalog_entry(entry) for entry in entries],
+            'total': total,
+            'has_more': next_cursor is not None,
+            'next_cursor': next_cursor
+        }).encode() + b'\n')
+    
+    original = request.args.get('variant') == 'original'
+    compress = 'gzip' in request.accept_encodings
+    
+    def generate():
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        def emit(line):
+            return compressor.compress(line) + compressor.flush(zlib.Z_SYNC_FLUSH) if compressor else line
+        
+        for line in lines:
+            yield emit(line)
+        for category, name in keys:
+            entry = catalog.get((category, name))
+            if entry is None or 'json' not in entry['formats']:
+                yield emit(json.dumps({'type': 'error', 'category': category, 'name': name,
+                                       'error': 'Animation not found'}).encode() + b'\n')
+            else:
+                yield emit(_bundle_line(entry, original))
+        if compressor:
+            yield compressor.flush()
+    
+    response = app.response_class(generate(), mimetype='application/x-ndjson')
+    if compress:
+        response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = True
+    # Let nginx pass each line on as soon as it is written
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 
 @app.route('/api/hashtags/<name>', methods=['POST'])
@@ -182,9 +3452,15 @@ def update_hashtags(name):
     data = request.get_json()
     hashtags = data.get('hashtags', [])
     
-    meta_file = os.path.join(META_DIR, f'{name}.json')
-    with open(meta_file, 'w') as f:
-        json.dump({'hashtags': hashtags}, f)
+    # Hashtags apply to this name in every category it exists in
+    categories = [category for category in CATEGORIES if (category, name) in catalog]
+    if not categories:
+        return jsonify({'success': False, 'error': f'Animation not found: {name}'}), 404
+    
+    for category in categories:
+        write_metadata(category, name, hashtags=hashtags)
+        refresh_catalog_entry(category, name)
+        storage.publish(category, name)
     
     return jsonify({'status': 'success'})
 
@@ -204,23 +3480,31 @@ def export_animation(category, name):
         else:
             return jsonify({'error': f'Animation file not found: {name}'}), 404
     
+    # Serve the optimized variant unless the original is explicitly requested
+    if format_type == 'json' and request.args.get('variant') != 'original':
+        optimized_path = optimized_file_path(category, name)
+        if os.path.exists(optimized_path):
+            file_path = optimized_path
+    
+    if format_type == 'json' and request.args.get('inline') in ('1', 'true') and file_path == optimized_file_path(category, name):
+        # A self-contained copy with the shared images put back as data URIs
+        with open(file_path, 'rb') as f:
+            data = json.load(f)
+        if inline_shared_images(data):
+            response = app.response_class(json.dumps(data, separators=(',', ':'), ensure_ascii=False), mimetype='application/json')
+            response.headers.set('Content-Disposition', 'attachment', filename=f'{name}.json')
+            response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
+            return response
+    
     if format_type == 'json':
         try:
-            # Read the file content directly
-            with open(file_path, 'r') as f:
-                file_content = f.read()
-            
-            # Removed debug print
-            
-            # Return the raw file content with proper headers
-            response = app.response_class(
-                response=file_content,
-                status=200,
-                mimetype='application/json'
-            )
-            response.headers['Content-Disposition'] = f'attachment; filename={name}.json'
+            # Stream the (precompressed, when accepted) file with caching headers
+            response = send_asset(file_path, mimetype='application/json', download_name=f'{name}.json')
             response.headers['Access-Control-Expose-Headers'] = 'Content-Disposition'
             return response
+        except HTTPException:
+            # 416 for unsatisfiable ranges
+            raise
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     elif format_type == 'mp4':
@@ -228,15 +3512,14 @@ def export_animation(category, name):
         mp4_dir = os.path.join(app.static_folder, 'animations', category, 'mp4')
         mp4_file_path = os.path.join(mp4_dir, f'{name}.mp4')
         
-        if os.path.exists(mp4_file_path):
+        # With remote storage this downloads the file if this node has no copy
+        if storage.fetch(storage_key(mp4_file_path)):
             try:
-                # Return the mp4 file as an attachment
-                # Use a more compatible approach
-                return send_file(
-                    mp4_file_path,
-                    mimetype='video/mp4',
-                    as_attachment=True
-                )
+                # Stream the mp4 file as an attachment; Range requests allow seeking and resuming
+                return send_asset(mp4_file_path, mimetype='video/mp4', download_name=f'{name}.mp4')
+            except HTTPException:
+                # 416 for unsatisfiable ranges
+                raise
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         else:
@@ -247,22 +3530,239 @@ def export_animation(category, name):
         gif_dir = os.path.join(app.static_folder, 'animations', category, 'gif')
         gif_file_path = os.path.join(gif_dir, f'{name}.gif')
         
-        if os.path.exists(gif_file_path):
+        if storage.fetch(storage_key(gif_file_path)):
             try:
-                # Return the gif file as an attachment
-                # Use a more compatible approach
-                return send_file(
-                    gif_file_path,
-                    mimetype='image/gif',
-                    as_attachment=True
-                )
+                # Stream the gif file as an attachment; Range requests allow seeking and resuming
+                return send_asset(gif_file_path, mimetype='image/gif', download_name=f'{name}.gif')
+            except HTTPException:
+                # 416 for unsatisfiable ranges
+                raise
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
         else:
             return jsonify({'error': f'GIF version not available for {name}'}), 404
     
+    elif format_type == 'svg':
+        # An uploaded SVG is served as is; otherwise the frame (or the frame
+        # range, zipped) is rendered on the server and polled for while it runs
+        svg_file_path = media_file_path(category, name, 'svg')
+        if 'frame' not in request.args and 'start' not in request.args and storage.fetch(storage_key(svg_file_path)):
+            return send_asset(svg_file_path, mimetype='image/svg+xml', download_name=f'{name}.svg')
+        # type=int turns a malformed value into None, so check what was sent
+        for param in ['frame', 'start', 'end', 'stride']:
+            if param in request.args and request.args.get(param, type=int) is None:
+                return jsonify({'error': f'{param} must be an integer'}), 400
+        start = request.args.get('frame', type=int)
+        if start is None:
+            start = request.args.get('start', type=int)
+        record, error = start_svg_export(
+            category, name,
+            start,
+            request.args.get('end', type=int),
+            request.args.get('stride', 1, type=int)
+        )
+        if error:
+            return jsonify({'error': error[0]}), error[1]
+        if record['status'] == 'done':
+            return download_export_job(record['job_id'])
+        return jsonify(svg_export_status(record)), 202
+    
     return jsonify({'error': 'Invalid format'}), 400
 
+# Server-side SVG export. Frames are rendered with python-lottie in a small
+# process pool, so a long export can't hold up request threads. Each job is
+# named by the hash of the source content and the frames asked for, which
+# makes identical requests share one job and one cached result. The job
+# record (exports/<id>.json) lives next to its output, so any worker process
+# can answer a status poll.
+svg_export_pool = None
+svg_export_pool_lock = threading.Lock()
+# Jobs submitted by this process that haven't finished yet
+svg_export_pending = set()
+SVG_EXPORT_VERSION = 1
+
+
+def _svg_export_paths(job_id, multiple):
+    return (os.path.join(EXPORT_DIR, f'{job_id}.json'),
+            os.path.join(EXPORT_DIR, f"{job_id}.{'zip' if multiple else 'svg'}"))
+
+
+def read_svg_export_job(job_id):
+    """The job's record, or None for unknown ids. Runs that stopped reporting are marked failed."""
+    if not re.fullmatch(r'[0-9a-f]{32}', job_id or ''):
+        return None
+    record_path = os.path.join(EXPORT_DIR, f'{job_id}.json')
+    try:
+        with open(record_path) as f:
+            record = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if record['status'] in ('queued', 'running') and time.time() - record['updated'] > app.config['SVG_EXPORT_TIMEOUT']:
+        record['status'] = 'failed'
+        record['error'] = 'Export stopped responding'
+    return record
+
+
+def _svg_export_finished(job_id, record_path, record, future):
+    svg_export_pending.discard(job_id)
+    error = future.exception()
+    if error is not None:
+        app.logger.error(f"SVG export of {record['category']}/{record['name']} failed: {str(error)}")
+        # The worker has been updating the record file, so start from its copy
+        record = read_svg_export_job(job_id) or record
+        record.update(status='failed', error=str(error))
+        write_job_record(record_path, record)
+    prune_export_cache()
+
+
+def _svg_export_executor():
+    """The process pool, started on first use.
+    
+    Workers come from a fork server (spawned where there is none), never from
+    a fork of this multithreaded process, and only import svg_export_worker.
+    """
+    global svg_export_pool
+    with svg_export_pool_lock:
+        if svg_export_pool is None:
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+                context.set_forkserver_preload(['svg_export_worker'])
+            else:
+                context = multiprocessing.get_context('spawn')
+            svg_export_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=app.config['SVG_EXPORT_WORKERS'], mp_context=context)
+        return svg_export_pool
+
+
+def start_svg_export(category, name, start, end, stride):
+    """Start (or join) the export of frames start..end every stride frames.
+    
+    Returns (record, None) or (None, (error, status code)).
+    """
+    if LottieDocument is None:
+        return None, ('Server-side SVG export needs python-lottie (pip install lottie)', 501)
+    source_path = lottie_file_path(category, name) if (category, name) in catalog else None
+    if source_path is None:
+        return None, (f'Animation file not found: {name}', 404)
+    
+    with open(source_path, 'rb') as f:
+        meta = json.loads(f.read())
+    first, last = int(meta.get('ip', 0)), max(int(meta.get('op', 1)) - 1, int(meta.get('ip', 0)))
+    start = first if start is None else start
+    end = start if end is None else end
+    if stride < 1 or not first <= start <= end <= last:
+        return None, (f'Frames must be within {first}..{last} with a stride of at least 1', 400)
+    frame_count = len(range(start, end + 1, stride))
+    if frame_count > app.config['SVG_EXPORT_MAX_FRAMES']:
+        return None, (f"At most {app.config['SVG_EXPORT_MAX_FRAMES']} frames can be exported at once", 400)
+    
+    key = f'{file_digest(source_path)}:{start}:{end}:{stride}:{SVG_EXPORT_VERSION}'
+    job_id = hashlib.sha256(key.encode()).hexdigest()[:32]
+    record_path, output_path = _svg_export_paths(job_id, frame_count > 1)
+    
+    record = read_svg_export_job(job_id)
+    if record and (record['status'] in ('queued', 'running') or
+                   record['status'] == 'done' and os.path.exists(output_path)):
+        return record, None
+    if len(svg_export_pending) >= app.config['SVG_EXPORT_QUEUE_LIMIT']:
+        return None, ('Too many SVG exports are running, try again shortly', 503)
+    
+    record = {
+        'job_id': job_id, 'status': 'queued', 'category': category, 'name': name,
+        'start': start, 'end': end, 'stride': stride, 'frames': frame_count, 'frames_done': 0,
+        'format': 'zip' if frame_count > 1 else 'svg', 'created': time.time()
+    }
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    write_job_record(record_path, record)
+    svg_export_pending.add(job_id)
+    future = _svg_export_executor().submit(render_svg_export, source_path, output_path, record_path, dict(record))
+    future.add_done_callback(lambda future: _svg_export_finished(job_id, record_path, record, future))
+    return record, None
+
+
+def prune_export_cache():
+    """Remove the least recently used export results once they outgrow SVG_EXPORT_CACHE_SIZE"""
+    results = []
+    with os.scandir(EXPORT_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith(('.svg', '.zip')):
+                # Downloads touch the job record, so its mtime is the last use
+                record_path = os.path.join(EXPORT_DIR, os.path.splitext(entry.name)[0] + '.json')
+                try:
+                    used = os.path.getmtime(record_path)
+                except OSError:
+                    used = 0
+                results.append((used, entry.stat().st_size, entry.path))
+    total = sum(size for _, size, _ in results)
+    for _, size, path in sorted(results):
+        if total <= app.config['SVG_EXPORT_CACHE_SIZE']:
+            break
+        job_id = os.path.splitext(os.path.basename(path))[0]
+        for stale in [path, os.path.join(EXPORT_DIR, f'{job_id}.json')]:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+        total -= size
+
+
+def svg_export_status(record):
+    """Public view of a job record"""
+    status = {key: record[key] for key in ['job_id', 'status', 'category', 'name', 'start', 'end', 'stride',
+                                           'frames', 'frames_done', 'format']}
+    status['status_url'] = f"/api/export-jobs/{record['job_id']}"
+    if record['status'] == 'done':
+        status['download_url'] = f"/api/export-jobs/{record['job_id']}/download"
+        status['size'] = record.get('size')
+    elif record['status'] == 'failed':
+        status['error'] = record.get('error')
+    return status
+
+
+@app.route('/api/export-jobs', methods=['POST'])
+def create_export_job():
+    """Start a server-side SVG export of one frame or a frame range (zipped)"""
+    data = request.get_json(silent=True) or {}
+    try:
+        start = None if data.get('start') is None else int(data['start'])
+        end = None if data.get('end') is None else int(data['end'])
+        stride = int(data.get('stride', 1))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Frames and stride must be integers'}), 400
+    
+    record, error = start_svg_export(data.get('category'), data.get('name') or '', start, end, stride)
+    if error:
+        return jsonify({'success': False, 'error': error[0]}), error[1]
+    return jsonify(dict(svg_export_status(record), success=True)), 200 if record['status'] == 'done' else 202
+
+
+@app.route('/api/export-jobs/<job_id>')
+def get_export_job(job_id):
+    """Progress of an SVG export, with its download URL once done"""
+    record = read_svg_export_job(job_id)
+    if record is None:
+        return jsonify({'success': False, 'error': 'Export job not found'}), 404
+    return jsonify(dict(svg_export_status(record), success=True))
+
+
+@app.route('/api/export-jobs/<job_id>/download')
+def download_export_job(job_id):
+    """The finished SVG (single frame) or zip of SVGs (frame range)"""
+    record = read_svg_export_job(job_id)
+    if record is None or record['status'] != 'done':
+        return jsonify({'success': False, 'error': 'Export is not ready'}), 404
+    _, output_path = _svg_export_paths(job_id, record['format'] == 'zip')
+    if not os.path.exists(output_path):
+        return jsonify({'success': False, 'error': 'Export result has expired, start the export again'}), 410
+    # Mark it recently used for prune_export_cache
+    os.utime(os.path.join(EXPORT_DIR, f'{job_id}.json'))
+    if record['format'] == 'zip':
+        download_name = f"{record['name']}_frames_{record['start']}-{record['end']}.zip"
+    else:
+        download_name = f"{record['name']}_frame_{record['start']}.svg"
+    return send_asset(output_path, download_name=download_name)
+
+
 @app.route('/api/upload-media', methods=['POST'])
 def upload_media():
     """Handler for uploading MP4 and GIF files for existing animations"""
@@ -272,12 +3772,13 @@ def upload_media():
     
     # Get form data
     file = request.files.get('file')
+    temp_id = request.form.get('temp_id')  # A finished chunked upload, instead of a file
     name = request.form.get('name')
     category = request.form.get('category')
     format_type = request.form.get('format')  # 'mp4' or 'gif'
     
     # Validate input
-    if not file or not name or not category or not format_type:
+    if not (file or temp_id) or not name or not category or not format_type:
         return jsonify({
             'success': False,
             'error': 'Missing required parameters'
@@ -308,7 +3809,16 @@ def upload_media():
     file_path = os.path.join(media_dir, filename)
     
     try:
-        file.save(file_path)
+        if file:
+            save_upload(file, file_path)
+        else:
+            temp_path = os.path.join(UPLOAD_DIR, f'{secure_filename(temp_id)}.{format_type}')
+            if not os.path.exists(temp_path):
+                return jsonify({'success': False, 'error': 'Upload not found'}), 404
+            storage.put(storage_key(file_path), temp_path)
+            discard_staged(temp_path)
+        entry = refresh_catalog_entry(category, name)
+        storage.publish(category, name)
         
         # Return success response with the URL to the file
         file_url = f"/static/animations/{category}/{format_type}/{filename}"
@@ -316,7 +3826,8 @@ def upload_media():
         return jsonify({
             'success': True,
             'url': file_url,
-            'name': filename
+            'name': filename,
+            'formats': entry['format_manifest'] if entry else {}
         })
     except Exception as e:
         return jsonify({
@@ -324,6 +3835,157 @@ def upload_media():
             'error': str(e)
         }), 500
 
+# Staging area. Uploads wait in temp_uploads until save_animation or
+# upload_media commits them; committing links the file into place from the
+# blob store and renames it, so nothing is copied. Each staged file is
+# accounted to the upload session that sent it (the X-Upload-Session header,
+# or the client address), and a reaper in the leader process removes what
+# was abandoned.
+staging_reaper = None
+
+
+def upload_session_id():
+    return request.headers.get('X-Upload-Session') or request.remote_addr or 'unknown'
+
+
+def stage_upload(filename, size):
+    """Account a new file in temp_uploads to the current upload session.
+    
+    Returns an error message and status code when it would exceed a quota.
+    """
+    session = upload_session_id()
+    db = metadata_db()
+    session_bytes = db.execute('SELECT COALESCE(SUM(size), 0) FROM staged_uploads WHERE session = ?',
+                               (session,)).fetchone()[0]
+    if session_bytes + size > app.config['STAGING_SESSION_QUOTA']:
+        return 'Too many unsaved uploads in this session; save or discard some first', 413
+    if staging_stats()['bytes'] + size > app.config['STAGING_QUOTA']:
+        reap_staged_uploads()
+        if staging_stats()['bytes'] + size > app.config['STAGING_QUOTA']:
+            return 'The upload staging area is full, please try again later', 507
+    
+    with db:
+        db.execute('INSERT OR REPLACE INTO staged_uploads (filename, session, size, created) VALUES (?, ?, ?, ?)',
+                   (filename, session, size, time.time()))
+    return None
+
+
+def rename_staged(filename, new_filename):
+    db = metadata_db()
+    with db:
+        db.execute('UPDATE staged_uploads SET filename = ? WHERE filename = ?', (new_filename, filename))
+
+
+def discard_staged(temp_path):
+    """Remove a staged file once it has been committed or abandoned"""
+    try:
+        os.remove(temp_path)
+    except FileNotFoundError:
+        pass
+    db = metadata_db()
+    with db:
+        db.execute('DELETE FROM staged_uploads WHERE filename = ?', (os.path.basename(temp_path),))
+
+
+def staging_stats():
+    """Bytes, file count and oldest file age in temp_uploads"""
+    now = time.time()
+    total = files = 0
+    oldest = None
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if not entry.is_file():
+                continue
+            stat = entry.stat()
+            total += stat.st_size
+            files += 1
+            oldest = stat.st_mtime if oldest is None else min(oldest, stat.st_mtime)
+    return {'bytes': total, 'files': files, 'oldest_age': round(now - oldest, 1) if oldest else 0}
+
+
+def reap_staged_uploads():
+    """Remove staged files past their TTL, then the oldest ones while over quota.
+    
+    Files are aged by modification time. A chunked upload (its .upload.json
+    session and its .part data) is aged by whichever changed last, so one
+    still receiving data stays alive, and while it is active it isn't removed
+    to get under the quota. Returns the number of uploads and bytes removed.
+    """
+    now = time.time()
+    uploads = {}
+    with os.scandir(UPLOAD_DIR) as entries:
+        for entry in entries:
+            if entry.is_file():
+                stat = entry.stat()
+                key = entry.name
+                for suffix in ('.upload.json', '.part'):
+                    if entry.name.endswith(suffix):
+                        key = ('chunked', entry.name[:-len(suffix)])
+                upload = uploads.setdefault(key, [0, 0, []])
+                upload[0] = max(upload[0], stat.st_mtime)
+                upload[1] += stat.st_size
+                upload[2].append(entry.path)
+    staged = sorted((mtime, size, paths, isinstance(key, tuple)) for key, (mtime, size, paths) in uploads.items())
+    
+    total = sum(size for _, size, _, _ in staged)
+    removed = removed_bytes = 0
+    for mtime, size, paths, chunked in staged:
+        idle = now - mtime
+        if idle < app.config['STAGING_TTL'] and total <= app.config['STAGING_QUOTA']:
+            break
+        if idle < app.config['STAGING_TTL'] and chunked and idle < app.config['STAGING_ACTIVE_WINDOW']:
+            continue
+        for file_path in paths:
+            discard_staged(file_path)
+        total -= size
+        removed += 1
+        removed_bytes += size
+    
+    # Forget accounting for files that are gone
+    db = metadata_db()
+    with db:
+        for filename, in db.execute('SELECT filename FROM staged_uploads').fetchall():
+            if not os.path.exists(os.path.join(UPLOAD_DIR, filename)):
+                db.execute('DELETE FROM staged_uploads WHERE filename = ?', (filename,))
+    
+    if removed:
+        app.logger.info(f"Reaped {removed} abandoned uploads ({removed_bytes} bytes)")
+    return removed, removed_bytes
+
+
+def _run_staging_reaper():
+    while True:
+        try:
+            reap_staged_uploads()
+        except Exception as e:
+            app.logger.error(f"Error reaping staged uploads: {str(e)}")
+        time.sleep(app.config['STAGING_REAP_INTERVAL'])
+
+
+def start_staging_reaper():
+    """Start the reaper thread once per process"""
+    global staging_reaper
+    if staging_reaper is None:
+        staging_reaper = threading.Thread(target=_run_staging_reaper, name='staging-reaper', daemon=True)
+        staging_reaper.start()
+
+
+@app.route('/api/staging/stats')
+def get_staging_stats():
+    """Size of the upload staging area, for alerting before the disk fills"""
+    stats = staging_stats()
+    db = metadata_db()
+    stats['sessions'] = {
+        session: {'bytes': size, 'files': files}
+        for session, size, files in db.execute(
+            'SELECT session, SUM(size), COUNT(*) FROM staged_uploads GROUP BY session ORDER BY SUM(size) DESC')
+    }
+    stats['quota'] = app.config['STAGING_QUOTA']
+    stats['session_quota'] = app.config['STAGING_SESSION_QUOTA']
+    stats['ttl'] = app.config['STAGING_TTL']
+    return jsonify(stats)
+
+
 @app.route('/api/upload-temp', methods=['POST'])
 def upload_temp():
     """Temporary endpoint to handle individual file uploads with progress tracking"""
@@ -346,7 +4008,7 @@ def upload_temp():
         return jsonify({'success': False, 'error': f'File type {ext} not allowed. Allowed types: {", ".join(allowed_extensions)}'}), 400
     
     # Create temp directory if it doesn't exist
-    temp_dir = os.path.join(app.static_folder, 'temp_uploads')
+    temp_dir = UPLOAD_DIR
     os.makedirs(temp_dir, exist_ok=True)
     
     # Generate a unique filename to avoid conflicts
@@ -354,6 +4016,10 @@ def upload_temp():
     temp_filename = f"{temp_id}{ext}"
     temp_path = os.path.join(temp_dir, temp_filename)
     
+    quota_error = stage_upload(temp_filename, request.content_length or 0)
+    if quota_error:
+        return jsonify({'success': False, 'error': quota_error[0]}), quota_error[1]
+    
     try:
         # Save the file to temp directory
         file.save(temp_path)
@@ -366,9 +4032,159 @@ def upload_temp():
             'format': ext[1:] # Remove the dot from extension
         })
     except Exception as e:
+        discard_staged(temp_path)
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# Chunked, resumable uploads. A session is started with the file's name and
+# size, the bytes are appended in order with their offset, and completing it
+# leaves a temp file that save_animation/upload_media pick up like one from
+# upload_temp. The content hash is computed while the chunks stream in.
+upload_hashers = {}
+upload_lock = threading.Lock()
+
+
+def _upload_session_paths(upload_id):
+    upload_id = secure_filename(upload_id)
+    return os.path.join(UPLOAD_DIR, f'{upload_id}.upload.json'), os.path.join(UPLOAD_DIR, f'{upload_id}.part')
+
+
+def _load_upload_session(upload_id):
+    session_path, part_path = _upload_session_paths(upload_id)
+    try:
+        with open(session_path) as f:
+            session = json.load(f)
+    except (OSError, ValueError):
+        return None
+    session['offset'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return session
+
+
+def _upload_hasher(upload_id, part_path, offset):
+    """The running hash of a partial upload, rebuilt from disk after a restart"""
+    cached = upload_hashers.get(upload_id)
+    if cached and cached[0] == offset:
+        return cached[1]
+    hasher = hashlib.sha256()
+    with open(part_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            hasher.update(chunk)
+    return hasher
+
+
+@app.route('/api/uploads', methods=['POST'])
+def start_upload():
+    """Start a chunked upload session"""
+    data = request.get_json(silent=True) or {}
+    filename = secure_filename(data.get('filename') or '')
+    _, ext = os.path.splitext(filename)
+    
+    if not filename:
+        return jsonify({'success': False, 'error': 'No selected file'}), 400
+    if ext.lower() not in ALLOWED_UPLOAD_EXTENSIONS:
+        return jsonify({'success': False, 'error': f'File type {ext} not allowed. Allowed types: {", ".join(ALLOWED_UPLOAD_EXTENSIONS)}'}), 400
+    try:
+        size = int(data.get('size'))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid file size'}), 400
+    if size < 0 or size > app.config['UPLOAD_MAX_SIZE']:
+        return jsonify({'success': False, 'error': f"Files can be at most {app.config['UPLOAD_MAX_SIZE']} bytes"}), 400
+    
+    upload_id = str(uuid.uuid4())
+    session_path, part_path = _upload_session_paths(upload_id)
+    quota_error = stage_upload(os.path.basename(part_path), size)
+    if quota_error:
+        return jsonify({'success': False, 'error': quota_error[0]}), quota_error[1]
+    open(part_path, 'wb').close()
+    with open(session_path, 'w') as f:
+        json.dump({'filename': filename, 'format': ext[1:].lower(), 'size': size,
+                   'started': datetime.now().strftime('%Y-%m-%d %H:%M:%S')}, f)
+    
+    return jsonify({
+        'success': True,
+        'upload_id': upload_id,
+        'offset': 0,
+        'chunk_size': app.config['UPLOAD_CHUNK_SIZE']
+    })
+
+
+@app.route('/api/uploads/<upload_id>', methods=['GET'])
+def upload_status(upload_id):
+    """How much of an upload has arrived, so the client knows where to resume"""
+    session = _load_upload_session(upload_id)
+    if session is None:
+        return jsonify({'success': False, 'error': 'Upload not found'}), 404
+    return jsonify({'success': True, 'upload_id': upload_id, 'offset': session['offset'], 'size': session['size']})
+
+
+@app.route('/api/uploads/<upload_id>', methods=['PUT'])
+def append_upload(upload_id):
+    """Append the request body at ?offset= to a chunked upload"""
+    with upload_lock:
+        session = _load_upload_session(upload_id)
+        if session is None:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        
+        # Chunks must arrive in order; a mismatch tells the client where to resume
+        offset = request.args.get('offset', type=int)
+        if offset != session['offset']:
+            return jsonify({'success': False, 'error': 'Offset mismatch', 'offset': session['offset']}), 409
+        
+        _, part_path = _upload_session_paths(upload_id)
+        hasher = _upload_hasher(upload_id, part_path, offset)
+        remaining = session['size'] - offset
+        with open(part_path, 'ab') as f:
+            for chunk in iter(lambda: request.stream.read(64 * 1024), b''):
+                if len(chunk) > remaining:
+                    f.truncate(offset)
+                    upload_hashers.pop(upload_id, None)
+                    return jsonify({'success': False, 'error': 'Upload is larger than its declared size'}), 400
+                f.write(chunk)
+                hasher.update(chunk)
+                offset += len(chunk)
+                remaining -= len(chunk)
+        upload_hashers[upload_id] = (offset, hasher)
+    
+    return jsonify({'success': True, 'upload_id': upload_id, 'offset': offset, 'size': session['size']})
+
+
+@app.route('/api/uploads/<upload_id>/complete', methods=['POST'])
+def complete_upload(upload_id):
+    """Verify a finished upload and hand it over as a temp file"""
+    with upload_lock:
+        session = _load_upload_session(upload_id)
+        if session is None:
+            return jsonify({'success': False, 'error': 'Upload not found'}), 404
+        if session['offset'] != session['size']:
+            return jsonify({'success': False, 'error': 'Upload is incomplete', 'offset': session['offset']}), 409
+        
+        session_path, part_path = _upload_session_paths(upload_id)
+        digest = _upload_hasher(upload_id, part_path, session['offset']).hexdigest()
+        expected = (request.get_json(silent=True) or {}).get('sha256')
+        if expected and expected.lower() != digest:
+            return jsonify({'success': False, 'error': 'Checksum mismatch', 'sha256': digest}), 400
+        
+        # Seed the digest cache so the blob store does not hash the file again
+        temp_id = secure_filename(upload_id)
+        temp_path = os.path.join(UPLOAD_DIR, f"{temp_id}.{session['format']}")
+        os.replace(part_path, temp_path)
+        rename_staged(os.path.basename(part_path), os.path.basename(temp_path))
+        stat = os.stat(temp_path)
+        file_digests[temp_path] = (stat.st_mtime_ns, stat.st_size, digest)
+        os.remove(session_path)
+        upload_hashers.pop(upload_id, None)
+    
+    return jsonify({
+        'success': True,
+        'temp_id': temp_id,
+        'original_name': session['filename'],
+        'temp_path': temp_path,
+        'format': session['format'],
+        'size': session['size'],
+        'sha256': digest
+    })
+
+
 @app.route('/api/save-animation', methods=['POST'])
 def save_animation():
     """Save animation metadata and move files to their final locations"""
@@ -410,8 +4226,7 @@ def save_animation():
             continue
         
         # Find the temp file
-        temp_dir = os.path.join(app.static_folder, 'temp_uploads')
-        temp_path = os.path.join(temp_dir, f"{file_id}.{file_format}")
+        temp_path = os.path.join(UPLOAD_DIR, secure_filename(f"{file_id}.{file_format}"))
         
         if not os.path.exists(temp_path):
             # File may have been uploaded directly via the regular upload endpoint
@@ -435,9 +4250,9 @@ def save_animation():
         target_filename = f"{secure_filename(name)}.{file_format.lower()}"
         target_path = os.path.join(target_dir, target_filename)
         
-        # Copy the file to the target location
+        # Store the file, linked into place from the blob store
         try:
-            shutil.copy(temp_path, target_path)
+            storage.put(storage_key(target_path), temp_path)
             created_files[file_format] = target_path
             
             # Save the JSON path for metadata
@@ -446,8 +4261,8 @@ def save_animation():
             
             # Clean up temp file
             try:
-                os.remove(temp_path)
-            except:
+                discard_staged(temp_path)
+            except Exception:
                 pass  # Ignore errors in cleanup
         except Exception as e:
             return jsonify({'success': False, 'error': f'Error saving {file_format} file: {str(e)}'}), 500
@@ -463,26 +4278,34 @@ def save_animation():
     if not json_path:
         return jsonify({'success': False, 'error': 'No JSON animation file was uploaded'}), 400
     
-    # Create metadata
-    metadata = {
-        'name': name,
-        'path': json_path,
-        'category': category,
-        'hashtags': tags,
-        'date_added': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-        'formats': list(created_files.keys()) + ['json']
-    }
-    
-    # Save metadata
-    metadata_dir = os.path.join(META_DIR, category)
-    os.makedirs(metadata_dir, exist_ok=True)
-    metadata_path = os.path.join(metadata_dir, f"{secure_filename(name)}.json")
+    # Build the optimized variant right away so the savings can be reported
+    try:
+        optimization = optimize_animation(category, secure_filename(name), force=True)
+    except ValueError as e:
+        app.logger.error(f"Could not optimize {category}/{name}: {str(e)}")
+        optimization = None
+    try:
+        complexity = analyze_animation(category, secure_filename(name))
+    except ValueError:
+        complexity = None
     
+    # Save metadata (the formats on disk are recorded when the catalog entry is refreshed)
     try:
-        with open(metadata_path, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        write_metadata(
+            category, secure_filename(name),
+            hashtags=tags,
+            display_name=name,
+            path=json_path,
+            date_added=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            optimization=optimization,
+            complexity=complexity
+        )
+        
+        refresh_catalog_entry(category, secure_filename(name))
+        storage.publish(category, secure_filename(name))
+        queue_ingest(category, secure_filename(name))
             
-        return jsonify({'success': True})
+        return jsonify({'success': True, 'optimization': optimization, 'complexity': complexity})
     except Exception as e:
         return jsonify({'success': False, 'error': f'Error saving metadata: {str(e)}'}), 500
 
@@ -549,7 +4372,7 @@ def upload_animation():
     
     # Save the file
     file_path = os.path.join(category_dir, new_filename)
-    file.save(file_path)
+    save_upload(file, file_path)
     
     # Create animation metadata
     if ext.lower() == '.json':
@@ -568,20 +4391,30 @@ def upload_animation():
     
     # Save metadata if it's a JSON file
     if ext.lower() == '.json':
-        metadata_dir = os.path.join(META_DIR, category)
-        os.makedirs(metadata_dir, exist_ok=True)
-        meta_file = os.path.join(metadata_dir, f'{secure_filename(name)}.json')
-        
-        metadata = {
-            'name': name,
-            'path': path,
-            'category': category,
-            'hashtags': tags,
-            'date_added': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
+        try:
+            animation_data['optimization'] = optimize_animation(category, secure_filename(name), force=True)
+        except ValueError as e:
+            app.logger.error(f"Could not optimize {category}/{name}: {str(e)}")
+            animation_data['optimization'] = None
+        try:
+            animation_data['complexity'] = analyze_animation(category, secure_filename(name))
+        except ValueError:
+            animation_data['complexity'] = None
         
-        with open(meta_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        write_metadata(
+            category, secure_filename(name),
+            hashtags=tags,
+            display_name=name,
+            path=path,
+            date_added=datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            optimization=animation_data['optimization'],
+            complexity=animation_data['complexity']
+        )
+    
+    refresh_catalog_entry(category, secure_filename(name))
+    storage.publish(category, secure_filename(name))
+    if ext.lower() == '.json':
+        queue_ingest(category, secure_filename(name))
     
     return jsonify({'success': True, 'animation': animation_data, 'id': unique_id})
 
@@ -609,12 +4442,14 @@ def delete_animation():
     json_path_safe = os.path.join(app.static_folder, 'animations', category, 'lottie', f'{safe_name}.json')
     mp4_path_safe = os.path.join(app.static_folder, 'animations', category, 'mp4', f'{safe_name}.mp4')
     gif_path_safe = os.path.join(app.static_folder, 'animations', category, 'gif', f'{safe_name}.gif')
+    svg_path_safe = media_file_path(category, safe_name, 'svg')
     old_json_path_safe = os.path.join(app.static_folder, 'animations', category, f'{safe_name}.json')
     
     # Define paths with original filename (which may contain spaces)
     json_path = os.path.join(app.static_folder, 'animations', category, 'lottie', f'{name}.json')
     mp4_path = os.path.join(app.static_folder, 'animations', category, 'mp4', f'{name}.mp4')
     gif_path = os.path.join(app.static_folder, 'animations', category, 'gif', f'{name}.gif')
+    svg_path = media_file_path(category, name, 'svg')
     old_json_path = os.path.join(app.static_folder, 'animations', category, f'{name}.json')
     
     # Metadata files (try both safe and original filenames)
@@ -627,20 +4462,46 @@ def delete_animation():
     deleted_files = []
     
     # Try to delete each file if it exists (try both safe and original paths)
-    all_paths = [
-        json_path, mp4_path, gif_path, old_json_path, metadata_path, old_metadata_path,
-        json_path_safe, mp4_path_safe, gif_path_safe, old_json_path_safe, metadata_path_safe, old_metadata_path_safe
+    source_paths = [
+        json_path, mp4_path, gif_path, svg_path, old_json_path,
+        json_path_safe, mp4_path_safe, gif_path_safe, svg_path_safe, old_json_path_safe
     ]
+    metadata_paths = [metadata_path, old_metadata_path, metadata_path_safe, old_metadata_path_safe]
+    
+    # Optimized variants, posters and previews are only derived data, so they
+    # are not counted towards the files deleted
+    derived_paths = [optimized_file_path(category, name), optimized_file_path(category, safe_name)]
+    derived_paths += poster_paths(category, name) + poster_paths(category, safe_name)
+    for json_file in [json_path, old_json_path, json_path_safe, old_json_path_safe] + derived_paths[:2]:
+        derived_paths += [f'{json_file}.gz', f'{json_file}.br']
+    for derived_path in derived_paths:
+        if os.path.exists(derived_path):
+            os.remove(derived_path)
+    
+    # Animation files go through the storage, so remote copies are deleted too
+    for file_path in dict.fromkeys(source_paths):
+        try:
+            if storage.delete(storage_key(file_path)):
+                deleted_files.append(file_path)
+                app.logger.info(f"Successfully deleted: {file_path}")
+        except Exception as e:
+            app.logger.error(f"Error deleting {file_path}: {str(e)}")
     
-    for file_path in all_paths:
+    for file_path in metadata_paths:
         if os.path.exists(file_path):
             try:
-                os.remove(file_path)
+                remove_file(file_path)
                 deleted_files.append(file_path)
                 app.logger.info(f"Successfully deleted: {file_path}")
             except Exception as e:
                 app.logger.error(f"Error deleting {file_path}: {str(e)}")
     
+    # Drop the animation from the metadata store and the catalog under both of its possible names
+    for key_name in {name, safe_name}:
+        delete_metadata(category, key_name)
+        refresh_catalog_entry(category, key_name)
+        storage.publish(category, key_name)
+    
     # Check if we deleted at least one file
     if not deleted_files:
         return jsonify({
@@ -654,60 +4515,140 @@ def delete_animation():
         'deleted_files': deleted_files
     })
 
-def find_free_port(start_port=5000, max_port=5050):
-    """Find a free port to run the Flask app"""
+def port_available(host, port):
+    """Whether the app can listen on host:port"""
     import socket
     from contextlib import closing
     
-    for port in range(start_port, max_port):
-        with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
-            if sock.connect_ex(('127.0.0.1', port)) != 0:
-                return port
-    return start_port  # Fallback to default
+    with closing(socket.socket(socket.AF_INET, socket.SOCK_STREAM)) as sock:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        try:
+            sock.bind((host, port))
+        except OSError:
+            return False
+    return True
+
+# Serving. gunicorn (prefork workers with threads) is used when installed,
+# then waitress (threads in one process), then Flask's development server.
+# Every request holds a worker thread until its response is sent, so slow
+# clients are best kept away from the app by a buffering proxy (see README).
+DEFAULT_PORT = 8080
+SERVERS = ['auto', 'gunicorn', 'waitress', 'development']
+
+
+def _installed(module):
+    try:
+        __import__(module)
+        return True
+    except ImportError:
+        return False
+
+
+def run_server(host, port, server='auto', workers=1, threads=8):
+    """Serve the app with the chosen (or best installed) server"""
+    clear_metrics_snapshots()
+    if server == 'auto':
+        if workers > 1 and _installed('gunicorn'):
+            server = 'gunicorn'
+        elif _installed('waitress'):
+            server = 'waitress'
+        elif _installed('gunicorn'):
+            server = 'gunicorn'
+        else:
+            server = 'development'
+    
+    if server == 'gunicorn':
+        from gunicorn.app.base import BaseApplication
+        
+        class LootBoxApplication(BaseApplication):
+            def load_config(self):
+                self.cfg.set('bind', f'{host}:{port}')
+                self.cfg.set('workers', workers)
+                self.cfg.set('threads', threads)
+                self.cfg.set('worker_class', 'gthread')
+                # Large downloads to slow clients must not be killed mid-transfer
+                self.cfg.set('timeout', 120)
+                # Workers are forked from this process, so their threads start after the fork
+                self.cfg.set('post_worker_init', lambda worker: start_background_workers())
+            
+            def load(self):
+                return app
+        
+        LootBoxApplication().run()
+    elif server == 'waitress':
+        import waitress
+        if workers > 1:
+            app.logger.warning('waitress runs a single process; use gunicorn for several workers')
+        start_background_workers()
+        waitress.serve(app, host=host, port=port, threads=threads)
+    else:
+        if workers > 1:
+            app.logger.warning('The development server runs a single process; install gunicorn for several workers')
+        start_background_workers()
+        app.run(host=host, port=port, debug=False, threaded=True)
+
 
 if __name__ == '__main__':
-    # Run the app on 0.0.0.0 to make it accessible from other devices
-    # Find an available port
-    port = find_free_port(8000, 9000)
-    print("\n🚀 Lottie Library running at:")
-    print(f"💻 Local:   http://127.0.0.1:{port}")
+    import argparse
+    import sys
     
-    # Get all available IP addresses for better network access
-    import socket
+    parser = argparse.ArgumentParser(description='Run the Lottie Library')
+    parser.add_argument('--host', default=os.environ.get('LOOTBOX_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.environ.get('LOOTBOX_PORT', str(DEFAULT_PORT))),
+                        help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--server', choices=SERVERS, default=os.environ.get('LOOTBOX_SERVER', 'auto'))
+    parser.add_argument('--workers', type=int, default=int(os.environ.get('LOOTBOX_WORKERS', '1')))
+    parser.add_argument('--threads', type=int, default=int(os.environ.get('LOOTBOX_THREADS', '8')))
+    parser.add_argument('--headless', action='store_true', default=os.environ.get('LOOTBOX_HEADLESS') == '1',
+                        help='Skip the network discovery banner (implied when not attached to a terminal)')
+    args = parser.parse_args()
     
-    # Try multiple methods to get network IPs
-    try:
-        # Method 1: Basic hostname lookup
-        hostname = socket.gethostname()
-        basic_ip = socket.gethostbyname(hostname)
-        print(f"🌐 Network: http://{basic_ip}:{port}")
+    # Run the app on 0.0.0.0 to make it accessible from other devices
+    port = args.port
+    if not port_available(args.host, port):
+        sys.exit(f"Port {port} on {args.host} is already in use; stop what is using it or pick another with --port")
+    
+    if args.headless or not sys.stdout.isatty():
+        print(f"Lottie Library listening on {args.host}:{port}", flush=True)
+    else:
+        print("\n🚀 Lottie Library running at:")
+        print(f"💻 Local:   http://127.0.0.1:{port}")
+        
+        # Get all available IP addresses for better network access
+        import socket
         
-        # Method 2: Try to get a more reliable IP
-        s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # Try multiple methods to get network IPs
         try:
-            # Doesn't have to be reachable
-            s.connect(('10.255.255.255', 1))
-            ip = s.getsockname()[0]
-            if ip != basic_ip:
-                print(f"🌐 Alternative Network: http://{ip}:{port}")
-        except Exception:
-            pass
-        finally:
-            s.close()
+            # Method 1: Basic hostname lookup
+            hostname = socket.gethostname()
+            basic_ip = socket.gethostbyname(hostname)
+            print(f"🌐 Network: http://{basic_ip}:{port}")
+        
+            # Method 2: Try to get a more reliable IP
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            try:
+                # Doesn't have to be reachable
+                s.connect(('10.255.255.255', 1))
+                ip = s.getsockname()[0]
+                if ip != basic_ip:
+                    print(f"🌐 Alternative Network: http://{ip}:{port}")
+            except Exception:
+                pass
+            finally:
+                s.close()
             
-        print("\n📱 You can access the Lottie Library from other devices using the Network URL above.")
-        print("   For internet access, consider using a service like ngrok or deploying to a cloud platform.")
-    except Exception as e:
-        print(f"🌐 Network: Unable to determine network IP: {str(e)}")
-    
-    print("\n📌 Features available:")
-    print("   - Multi-format downloads (JSON, MP4, GIF, SVG)")
-    print("   - Admin mode for uploading missing media files")
-    print("   - Expandable thumbnail size controls")
-    print("   - Redesigned delete confirmation dialog")
-    print("   - Improved error handling with retry logic")
-    
-    print("\nPress CTRL+C to quit\n")
+            print("\n📱 You can access the Lottie Library from other devices using the Network URL above.")
+            print("   For internet access, consider using a service like ngrok or deploying to a cloud platform.")
+        except Exception as e:
+            print(f"🌐 Network: Unable to determine network IP: {str(e)}")
+        
+        print("\n📌 Features available:")
+        print("   - Multi-format downloads (JSON, MP4, GIF, SVG)")
+        print("   - Admin mode for uploading missing media files")
+        print("   - Expandable thumbnail size controls")
+        print("   - Redesigned delete confirmation dialog")
+        print("   - Improved error handling with retry logic")
+        
+        print("\nPress CTRL+C to quit\n")
     
-    # Run on all interfaces (0.0.0.0) with public port
-    app.run(host='0.0.0.0', port=port, debug=False)
+    run_server(args.host, port, server=args.server, workers=max(args.workers, 1), threads=max(args.threads, 1))
@@ -0,0 +1,575 @@
+"""Benchmarks for the Lottie Library.
+
+Generates synthetic catalogs, drives the app either in-process (Flask test
+client) or over a local socket (a real server started from app.py), and
+reports p50/p95/p99 latency and throughput per scenario. Results are saved
+as JSON and can be compared against an earlier run:
+
+    python benchmark.py run --sizes 1000 10000 --output results.json
+    python benchmark.py run --sizes 1000 --baseline results.json
+    python benchmark.py generate --size 100000 --dir /tmp/catalog-100k
+"""
+import argparse
+import ast
+import http.client
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def app_categories():
+    """The category slugs of app.CATEGORIES.
+
+    Read from app.py rather than imported: importing app builds a catalog of
+    whatever static folder is configured, before the benchmark has set one.
+    """
+    with open(os.path.join(REPO_DIR, 'app.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(isinstance(target, ast.Name) and target.id == 'CATEGORIES'
+                                                for target in node.targets):
+            return list(ast.literal_eval(node.value))
+    raise RuntimeError('CATEGORIES is not defined in app.py')
+
+
+CATEGORIES = app_categories()
+
+# Words animation names and hashtags are made of, so searches have realistic hit rates
+VOCABULARY = [
+    'loading', 'spinner', 'success', 'error', 'check', 'arrow', 'star', 'heart', 'bell', 'mail',
+    'cart', 'wallet', 'coin', 'card', 'rocket', 'cloud', 'upload', 'download', 'search', 'scan',
+    'profile', 'user', 'lock', 'shield', 'gift', 'chat', 'phone', 'camera', 'map', 'pin',
+    'confetti', 'wave', 'gradient', 'blob', 'circle', 'square', 'pulse', 'bounce', 'fade', 'slide',
+    'onboarding', 'empty', 'celebration', 'trophy', 'calendar', 'clock', 'settings', 'menu', 'home', 'bank'
+]
+
+# Synthetic Lottie files range from 8 KB to 500 KB, spread log-uniformly like real libraries
+MIN_LOTTIE_SIZE = 8 * 1024
+MAX_LOTTIE_SIZE = 500 * 1024
+# Distinct file bodies generated; animations beyond that hard-link to them so
+# large catalogs don't need tens of gigabytes
+POOL_SIZE = 256
+MP4_SHARE = 0.3
+
+# How each animation's metadata is laid out on disk, and how often
+METADATA_LAYOUTS = [
+    ('full', 0.6),          # lottie/<name>.json with a full sidecar in metadata/<category>/
+    ('hashtags_only', 0.15),  # lottie/<name>.json with a hashtag-only sidecar in metadata/
+    ('legacy_root', 0.15),  # <category>/<name>.json in the category root, no sidecar
+    ('bare', 0.1)           # lottie/<name>.json without any metadata
+]
+
+SCENARIOS = ['listing', 'search', 'deep_pagination', 'export_json', 'export_mp4', 'upload_save']
+
+
+# Synthetic catalogs
+def _keyframes(rng, count):
+    frames = []
+    for i in range(count):
+        frames.append({
+            't': i * 10,
+            's': [rng.uniform(-512, 512), rng.uniform(-512, 512), 0],
+            'i': {'x': [rng.random()], 'y': [rng.random()]},
+            'o': {'x': [rng.random()], 'y': [rng.random()]}
+        })
+    return frames
+
+
+def _shape_layer(rng, index):
+    return {
+        'ddd': 0, 'ind': index, 'ty': 4, 'nm': f'Shape Layer {index}', 'sr': 1,
+        'ks': {
+            'o': {'a': 0, 'k': 100},
+            'r': {'a': 1, 'k': _keyframes(rng, 4)},
+            'p': {'a': 1, 'k': _keyframes(rng, 6)},
+            'a': {'a': 0, 'k': [0, 0, 0]},
+            's': {'a': 0, 'k': [100, 100, 100]}
+        },
+        'shapes': [{
+            'ty': 'gr', 'nm': 'Group 1',
+            'it': [
+                {'ty': 'sh', 'ks': {'a': 0, 'k': {
+                    'c': True,
+                    'v': [[rng.uniform(-100, 100), rng.uniform(-100, 100)] for _ in range(8)],
+                    'i': [[rng.uniform(-20, 20), rng.uniform(-20, 20)] for _ in range(8)],
+                    'o': [[rng.uniform(-20, 20), rng.uniform(-20, 20)] for _ in range(8)]
+                }}},
+                {'ty': 'fl', 'c': {'a': 0, 'k': [rng.random(), rng.random(), rng.random(), 1]}, 'o': {'a': 0, 'k': 100}},
+                {'ty': 'tr', 'p': {'a': 0, 'k': [0, 0]}, 'a': {'a': 0, 'k': [0, 0]}, 's': {'a': 0, 'k': [100, 100]},
+                 'r': {'a': 0, 'k': 0}, 'o': {'a': 0, 'k': 100}}
+            ]
+        }],
+        'ip': 0, 'op': 90, 'st': 0, 'bm': 0
+    }
+
+
+def synthetic_lottie(rng, target_size):
+    """Lottie JSON of roughly target_size bytes, made of animated shape layers"""
+    data = {'v': '5.7.4', 'fr': 30, 'ip': 0, 'op': 90, 'w': 512, 'h': 512, 'nm': 'Synthetic', 'ddd': 0,
+            'assets': [], 'layers': []}
+    body = json.dumps(data).encode()
+    while len(body) < target_size:
+        # Add layers in batches sized from the remaining gap, to avoid re-encoding per layer
+        layer_size = len(json.dumps(_shape_layer(rng, 0)))
+        for _ in range(max(1, (target_size - len(body)) // layer_size)):
+            data['layers'].append(_shape_layer(rng, len(data['layers']) + 1))
+        body = json.dumps(data).encode()
+    return body
+
+
+def _link(source, target):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copyfile(source, target)
+
+
+def generate_catalog(directory, size, seed=0):
+    """Write a synthetic static folder with size animations into directory.
+
+    Returns the manifest (also saved as catalog.json) the benchmarks pick
+    their requests from. A directory that already holds a catalog of the same
+    size and seed is reused.
+    """
+    manifest_path = os.path.join(directory, 'catalog.json')
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest['size'] == size and manifest['seed'] == seed:
+            return manifest
+
+    shutil.rmtree(directory, ignore_errors=True)
+    rng = random.Random(seed)
+    static_dir = os.path.join(directory, 'static')
+    pool_dir = os.path.join(directory, 'pool')
+    meta_dir = os.path.join(static_dir, 'metadata')
+    for path in [pool_dir, meta_dir, os.path.join(static_dir, 'temp_uploads')]:
+        os.makedirs(path)
+    for category in CATEGORIES:
+        os.makedirs(os.path.join(meta_dir, category))
+        for folder in ['lottie', 'mp4', 'gif', 'svg']:
+            os.makedirs(os.path.join(static_dir, 'animations', category, folder))
+
+    # Pool of distinct bodies
+    lottie_pool = []
+    mp4_pool = []
+    for i in range(min(POOL_SIZE, size)):
+        target = int(math.exp(rng.uniform(math.log(MIN_LOTTIE_SIZE), math.log(MAX_LOTTIE_SIZE))))
+        path = os.path.join(pool_dir, f'{i}.json')
+        with open(path, 'wb') as f:
+            f.write(synthetic_lottie(rng, target))
+        lottie_pool.append(path)
+        if i < max(1, POOL_SIZE // 8):
+            path = os.path.join(pool_dir, f'{i}.mp4')
+            with open(path, 'wb') as f:
+                f.write(rng.randbytes(rng.randint(100 * 1024, 2 * 1024 * 1024)))
+            mp4_pool.append(path)
+
+    layouts, weights = zip(*METADATA_LAYOUTS)
+    start_date = datetime(2023, 1, 1)
+    animations = []
+    for i in range(size):
+        category = rng.choice(CATEGORIES)
+        words = rng.sample(VOCABULARY, rng.randint(1, 3))
+        name = '_'.join(word.capitalize() for word in words) + f'_{i:06d}'
+        layout = rng.choices(layouts, weights)[0]
+        hashtags = rng.sample(VOCABULARY, rng.randint(0, 4))
+        animations_dir = os.path.join(static_dir, 'animations', category)
+
+        if layout == 'legacy_root':
+            _link(lottie_pool[i % len(lottie_pool)], os.path.join(animations_dir, f'{name}.json'))
+        else:
+            _link(lottie_pool[i % len(lottie_pool)], os.path.join(animations_dir, 'lottie', f'{name}.json'))
+        if layout == 'full':
+            record = {
+                'name': name,
+                'category': category,
+                'path': f'/static/animations/{category}/lottie/{name}.json',
+                'hashtags': hashtags,
+                'date_added': (start_date + timedelta(minutes=rng.randint(0, 3 * 365 * 24 * 60))).strftime('%Y-%m-%d %H:%M:%S')
+            }
+            with open(os.path.join(meta_dir, category, f'{name}.json'), 'w') as f:
+                json.dump(record, f)
+        elif layout == 'hashtags_only':
+            with open(os.path.join(meta_dir, f'{name}.json'), 'w') as f:
+                json.dump({'hashtags': hashtags}, f)
+
+        has_mp4 = rng.random() < MP4_SHARE
+        if has_mp4:
+            _link(mp4_pool[i % len(mp4_pool)], os.path.join(animations_dir, 'mp4', f'{name}.mp4'))
+        animations.append([category, name, has_mp4])
+
+    manifest = {'size': size, 'seed': seed, 'static_folder': static_dir, 'pool': lottie_pool, 'animations': animations}
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+# Clients: the same calls in-process or over a socket
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None, headers=None):
+        response = self.client.open(path, method=method, data=body, headers=headers or {})
+        data = response.get_data()
+        response.close()
+        return response.status_code, data
+
+
+class SocketClient:
+    """One keep-alive HTTP connection to the server under test"""
+    def __init__(self, port):
+        self.port = port
+        self.connection = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+
+    def request(self, method, path, body=None, headers=None):
+        try:
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+        except (http.client.HTTPException, OSError):
+            # The server closed the connection; retry once on a fresh one
+            self.connection.close()
+            self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=60)
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+        return response.status, response.read()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_server(env, server, workers):
+    """Start app.py on a free port and wait until it answers. Returns (process, port)"""
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, 'app.py'), '--host', '127.0.0.1', '--port', str(port),
+         '--server', server, '--workers', str(workers), '--headless'],
+        cwd=REPO_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    deadline = time.time() + 600
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'Server exited: {process.stderr.read().decode(errors="replace")[-2000:]}')
+        try:
+            status, _ = SocketClient(port).request('GET', '/api/cache/stats')
+            if status == 200:
+                return process, port
+        except OSError:
+            pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError('Server did not start in time')
+
+
+# Scenarios. Each returns a function that performs one operation with a client
+def _quote(value):
+    return urllib.parse.quote(value, safe='')
+
+
+def make_scenario(scenario, manifest, rng, page_size):
+    animations = manifest['animations']
+
+    if scenario == 'listing':
+        def run(client):
+            category = rng.choice([''] + CATEGORIES)
+            return [client.request('GET', f'/api/animations?category={category}&page={rng.randint(1, 5)}&limit={page_size}')]
+    elif scenario == 'search':
+        def run(client):
+            query = ' '.join(rng.sample(VOCABULARY, rng.randint(1, 2)))
+            return [client.request('GET', f'/api/animations?q={_quote(query)}&limit={page_size}')]
+    elif scenario == 'deep_pagination':
+        # Pages from the last tenth of the whole catalog
+        last_page = max(1, len(animations) // page_size)
+
+        def run(client):
+            page = rng.randint(max(1, last_page - last_page // 10), last_page)
+            return [client.request('GET', f'/api/animations?page={page}&limit={page_size}')]
+    elif scenario == 'export_json':
+        def run(client):
+            category, name, _ = rng.choice(animations)
+            return [client.request('GET', f'/api/export/{category}/{_quote(name)}?format=json')]
+    elif scenario == 'export_mp4':
+        with_mp4 = [animation for animation in animations if animation[2]] or animations
+
+        def run(client):
+            category, name, _ = rng.choice(with_mp4)
+            return [client.request('GET', f'/api/export/{category}/{_quote(name)}?format=mp4')]
+    elif scenario == 'upload_save':
+        bodies = []
+        for path in manifest['pool'][:16]:
+            with open(path, 'rb') as f:
+                bodies.append(f.read())
+
+        def run(client):
+            # Chunked upload, then save; the animation is deleted again by cleanup()
+            body = rng.choice(bodies)
+            json_headers = {'Content-Type': 'application/json'}
+            name = f'Bench_Upload_{rng.getrandbits(48):012x}'
+            responses = [client.request('POST', '/api/uploads', json.dumps({'filename': f'{name}.json', 'size': len(body)}).encode(), json_headers)]
+            upload = json.loads(responses[-1][1])
+            if not upload.get('success'):
+                return responses
+            upload_id = upload['upload_id']
+            chunk_size = upload['chunk_size']
+            for offset in range(0, len(body), chunk_size):
+                responses.append(client.request('PUT', f'/api/uploads/{upload_id}?offset={offset}', body[offset:offset + chunk_size],
+                                                {'Content-Type': 'application/octet-stream'}))
+            responses.append(client.request('POST', f'/api/uploads/{upload_id}/complete', b'{}', json_headers))
+            temp_id = json.loads(responses[-1][1]).get('temp_id')
+            form = urllib.parse.urlencode({
+                'name': name, 'category': rng.choice(CATEGORIES), 'tags': json.dumps(rng.sample(VOCABULARY, 2)),
+                'fileCount': 1, 'fileFormat_0': 'json', 'fileId_0': temp_id
+            }).encode()
+            responses.append(client.request('POST', '/api/save-animation', form, {'Content-Type': 'application/x-www-form-urlencoded'}))
+            run.saved.append((name, form))
+            return responses
+        run.saved = []
+    else:
+        raise ValueError(f'Unknown scenario: {scenario}')
+    return run
+
+
+def cleanup(run, client):
+    """Delete what upload_save created, outside the timed requests"""
+    for name, form in getattr(run, 'saved', []):
+        category = urllib.parse.parse_qs(form.decode())['category'][0]
+        client.request('POST', '/api/delete-animation', json.dumps({'name': name, 'category': category}).encode(),
+                       {'Content-Type': 'application/json'})
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+
+def measure(run, clients, count, warmup):
+    """Run count operations spread over the clients' threads and summarize them"""
+    for _ in range(warmup):
+        run(clients[0])
+
+    latencies = []
+    errors = 0
+    sent_bytes = 0
+    lock = threading.Lock()
+    remaining = [count]
+
+    def worker(client):
+        nonlocal errors, sent_bytes
+        while True:
+            with lock:
+                if remaining[0] == 0:
+                    return
+                remaining[0] -= 1
+            start = time.perf_counter()
+            responses = run(client)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += sum(1 for status, _ in responses if status >= 400)
+                sent_bytes += sum(len(data) for _, data in responses)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'count': len(latencies),
+        'errors': errors,
+        'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'max_ms': round(latencies[-1] * 1000, 3),
+        'throughput_rps': round(len(latencies) / wall, 2),
+        'bytes_per_op': round(sent_bytes / len(latencies))
+    }
+
+
+def measure_catalog(args):
+    """Benchmark one catalog in one mode; runs in its own process and prints JSON"""
+    with open(os.path.join(args.dir, 'catalog.json')) as f:
+        manifest = json.load(f)
+
+    # A fresh instance folder each time, so startup always includes the metadata import
+    instance_dir = os.path.join(args.dir, 'instance')
+    shutil.rmtree(instance_dir, ignore_errors=True)
+    env = dict(os.environ)
+    env.update({
+        'LOOTBOX_STATIC_FOLDER': manifest['static_folder'],
+        'LOOTBOX_INSTANCE_PATH': instance_dir,
+        'LOOTBOX_WATCH': '0',
+        'LOOTBOX_BACKFILL': '0'
+    })
+    if args.cold_cache:
+        env['LOOTBOX_RESPONSE_CACHE_SIZE'] = '0'
+
+    process = None
+    started = time.perf_counter()
+    if args.mode == 'inprocess':
+        os.environ.update(env)
+        sys.path.insert(0, REPO_DIR)
+        import app as lootbox
+        startup = time.perf_counter() - started
+        clients = [InProcessClient(lootbox.app) for _ in range(args.concurrency)]
+    else:
+        process, port = start_server(env, args.server, args.workers)
+        startup = time.perf_counter() - started
+        clients = [SocketClient(port) for _ in range(args.concurrency)]
+
+    results = {'size': manifest['size'], 'mode': args.mode, 'startup_seconds': round(startup, 3), 'scenarios': {}}
+    try:
+        for scenario in args.scenarios:
+            rng = random.Random(f'{args.seed}-{scenario}')
+            run = make_scenario(scenario, manifest, rng, args.page_size)
+            count = args.upload_requests if scenario == 'upload_save' else args.requests
+            results['scenarios'][scenario] = measure(run, clients, count, args.warmup)
+            cleanup(run, clients[0])
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    json.dump(results, sys.stdout)
+
+
+# Reports
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _change(current, baseline, lower_is_better=True):
+    if not baseline:
+        return ''
+    change = (current - baseline) / baseline * 100
+    if abs(change) < 5:
+        return f' ({change:+.1f}%)'
+    better = change < 0 if lower_is_better else change > 0
+    return f' ({change:+.1f}% {"better" if better else "worse"})'
+
+
+def print_report(results, baseline=None):
+    baseline_runs = {}
+    if baseline:
+        baseline_runs = {(run['size'], run['mode']): run for run in baseline['runs']}
+    for run in results['runs']:
+        previous = baseline_runs.get((run['size'], run['mode']), {})
+        print(f"\n{run['size']} animations, {run['mode']} (startup {run['startup_seconds']:.2f}s"
+              f"{_change(run['startup_seconds'], previous.get('startup_seconds'))})")
+        print(f"  {'scenario':<16} {'p50 ms':>24} {'p95 ms':>24} {'p99 ms':>24} {'req/s':>24} {'errors':>7}")
+        for scenario, stats in run['scenarios'].items():
+            before = previous.get('scenarios', {}).get(scenario, {})
+            cells = [f"{stats[key]:.2f}{_change(stats[key], before.get(key))}" for key in ['p50_ms', 'p95_ms', 'p99_ms']]
+            cells.append(f"{stats['throughput_rps']:.1f}{_change(stats['throughput_rps'], before.get('throughput_rps'), False)}")
+            print(f"  {scenario:<16} {cells[0]:>24} {cells[1]:>24} {cells[2]:>24} {cells[3]:>24} {stats['errors']:>7}")
+
+
+def run_benchmarks(args):
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'settings': {key: value for key, value in vars(args).items() if key not in ('command', 'baseline', 'output', 'func')},
+        'runs': []
+    }
+    for size in args.sizes:
+        directory = os.path.join(args.workdir, f'catalog-{size}-{args.seed}')
+        print(f'Preparing a catalog of {size} animations in {directory}...', file=sys.stderr)
+        generate_catalog(directory, size, args.seed)
+        for mode in args.modes:
+            print(f'Measuring {size} animations {mode}...', file=sys.stderr)
+            command = [sys.executable, os.path.abspath(__file__), 'measure', '--dir', directory, '--mode', mode,
+                       '--requests', str(args.requests), '--upload-requests', str(args.upload_requests),
+                       '--warmup', str(args.warmup), '--concurrency', str(args.concurrency),
+                       '--page-size', str(args.page_size), '--seed', str(args.seed),
+                       '--server', args.server, '--workers', str(args.workers), '--scenarios', *args.scenarios]
+            if args.cold_cache:
+                command.append('--cold-cache')
+            output = subprocess.run(command, capture_output=True, text=True)
+            if output.returncode != 0:
+                raise RuntimeError(f'Benchmark of {size} animations ({mode}) failed:\n{output.stderr[-4000:]}')
+            # The last line is the result; anything before it is output from the app
+            results['runs'].append(json.loads(output.stdout.strip().splitlines()[-1]))
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nSaved results to {args.output}')
+
+
+def _add_measure_options(parser):
+    parser.add_argument('--requests', type=int, default=200, help='Timed operations per scenario')
+    parser.add_argument('--upload-requests', type=int, default=30, help='Timed upload and save flows')
+    parser.add_argument('--warmup', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=1, help='Client threads sending requests at once')
+    parser.add_argument('--page-size', type=int, default=12)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument('--server', default='auto', help='Server app.py runs in socket mode (see app.py --server)')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--cold-cache', action='store_true', help='Disable the /api/animations response cache')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the Lottie Library against synthetic catalogs')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='Generate catalogs, benchmark them and report')
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000])
+    run_parser.add_argument('--modes', nargs='+', choices=['inprocess', 'socket'], default=['inprocess', 'socket'])
+    run_parser.add_argument('--workdir', default=os.path.join(tempfile.gettempdir(), 'lootbox-benchmark'),
+                            help='Where generated catalogs are kept between runs')
+    run_parser.add_argument('--output', default='benchmark-results.json')
+    run_parser.add_argument('--baseline', help='Earlier results file to compare against')
+    _add_measure_options(run_parser)
+
+    generate_parser = commands.add_parser('generate', help='Only generate a synthetic catalog')
+    generate_parser.add_argument('--size', type=int, required=True)
+    generate_parser.add_argument('--dir', required=True)
+    generate_parser.add_argument('--seed', type=int, default=0)
+
+    measure_parser = commands.add_parser('measure', help='Benchmark one generated catalog and print JSON')
+    measure_parser.add_argument('--dir', required=True)
+    measure_parser.add_argument('--mode', choices=['inprocess', 'socket'], default='inprocess')
+    _add_measure_options(measure_parser)
+
+    args = parser.parse_args()
+    if args.command == 'run':
+        run_benchmarks(args)
+    elif args.command == 'generate':
+        manifest = generate_catalog(os.path.abspath(args.dir), args.size, args.seed)
+        print(f"Generated {len(manifest['animations'])} animations in {manifest['static_folder']}")
+    else:
+        measure_catalog(args)
@@ -0,0 +1,2336 @@
+// Make lottie available globally for our SVG export feature
+window.lottie = window.bodymovin || window.lottie;
+
+// Listing state from the server: the category or search being shown and,
+// for those, the first page it already rendered into the grid
+const pageState = JSON.parse(document.getElementById('pageState').textContent);
+
+let currentAnimation = null;
+let currentPage = 1;
+let loading = false;
+let currentCategory = pageState.current_category;
+let lastScrollPosition = 0;
+let searchQuery = pageState.search_query;
+
+// Category mapping for display names
+const CATEGORIES = pageState.categories;
+
+document.addEventListener('DOMContentLoaded', function() {
+
+    // Interactive cube logo
+    const cube = document.getElementById('logoCube');
+    let rotX = 0, rotY = 0;
+    let targetRotX = 0, targetRotY = 0;
+
+    document.addEventListener('mousemove', function(e) {
+        // Calculate rotation based on mouse position relative to window center
+        const mouseX = e.clientX;
+        const mouseY = e.clientY;
+        const centerX = window.innerWidth / 2;
+        const centerY = window.innerHeight / 2;
+
+        // Set target rotation with dampening
+        targetRotX = (mouseY - centerY) / 20;
+        targetRotY = (mouseX - centerX) / 20;
+    });
+
+    // Smooth animation loop for the cube
+    function animateCube() {
+        // Smoothly interpolate current rotation toward target
+        rotX += (targetRotX - rotX) * 0.05;
+        rotY += (targetRotY - rotY) * 0.05;
+
+        // Apply the rotation
+        cube.style.transform = `rotateX(${rotX}deg) rotateY(${rotY}deg)`;
+
+        requestAnimationFrame(animateCube);
+    }
+
+    // Start the animation loop
+    animateCube();
+
+    // Add event listeners to hide cube when interacting with page
+    // Scroll event
+    window.addEventListener('scroll', hideCube);
+
+    // Search input interaction
+    document.querySelector('.search-input').addEventListener('focus', hideCube);
+    document.querySelector('.search-input').addEventListener('input', hideCube);
+
+    // Button clicks
+    document.querySelectorAll('button').forEach(button => {
+        button.addEventListener('click', hideCube);
+    });
+
+    // Links clicks
+    document.querySelectorAll('a').forEach(link => {
+        link.addEventListener('click', hideCube);
+    });
+
+    // Add mutation observer to detect container class changes
+    const containerObserver = new MutationObserver((mutations) => {
+        mutations.forEach((mutation) => {
+            if (mutation.attributeName === 'class') {
+                const container = document.querySelector('.container');
+                if (container.classList.contains('active')) {
+                    // Hide cube when not on home page
+                    document.querySelector('.cube-container').classList.add('hidden');
+                    clearTimeout(window.cubeReappearTimer);
+                }
+            }
+        });
+    });
+
+    // Start observing container class changes
+    containerObserver.observe(document.querySelector('.container'), { attributes: true });
+
+    // Set a timer to show the cube again after interaction
+    function hideCube() {
+        document.querySelector('.cube-container').classList.add('hidden');
+
+        // Show cube again after 5 seconds of no interaction, but only if we're on the home screen with no popups
+        clearTimeout(window.cubeReappearTimer);
+        window.cubeReappearTimer = setTimeout(() => {
+            // Check if any popup is active or if we're not on the home screen
+            const popupActive = document.querySelector('.sidebar-overlay.active') || 
+                              document.querySelector('.upload-popup.active');
+            const notOnHomeScreen = document.querySelector('.container.active') ||
+                                  document.getElementById('animationGrid').style.display !== 'none';
+
+            if (!popupActive && !notOnHomeScreen) {
+                document.querySelector('.cube-container').classList.remove('hidden');
+            }
+        }, 5000);
+    }
+    // No need for complex header setup, position:sticky works reliably
+    const homeButton = document.getElementById('homeButton');
+
+    // Setup size controls
+    const sizeSmall = document.getElementById('sizeSmall');
+    const sizeMedium = document.getElementById('sizeMedium');
+    const sizeLarge = document.getElementById('sizeLarge');
+    const grid = document.getElementById('animationGrid');
+
+    if (pageState.listing) {
+        // The server rendered the first page; wire it up and continue from its cursor
+        const bundled = [];
+        grid.querySelectorAll('.animation-card').forEach((card, index) => {
+            const animation = pageState.animations[index];
+            formatManifests[`${animation.category}/${animation.name}`] = animation.format_manifest || {};
+            hydrateAnimationCard(card, animation);
+            const preview = registerGridPreview(card, animation);
+            if (preview) bundled.push(preview);
+        });
+        loadBundle(bundled);
+        new Set(pageState.animations.map(animation => animation.category)).forEach(syncManifest);
+        nextCursor = pageState.next_cursor;
+        currentPage = 2;
+    } else {
+        // Reset to homepage state
+        document.querySelector('.container').classList.remove('active');
+        grid.style.display = 'none';
+        document.querySelectorAll('.category-btn').forEach(btn => {
+            btn.classList.remove('active');
+        });
+        currentCategory = '';
+    }
+
+    // Keep files seen before available locally, and drop the ones that changed
+    if ('serviceWorker' in navigator) {
+        navigator.serviceWorker.register('/sw.js')
+            .catch(error => console.error('Service worker registration failed:', error));
+    }
+    // Left by pages that synced the whole manifest at once
+    localStorage.removeItem('manifestVersion');
+
+    // Check URL parameters for direct linking
+    const urlParams = new URLSearchParams(window.location.search);
+    const animationParam = urlParams.get('animation');
+    const categoryParam = urlParams.get('category');
+
+    if (animationParam && categoryParam) {
+        // This is a shared link, open the animation directly
+        handleSharedAnimation(categoryParam, animationParam);
+    } else if (!pageState.listing) {
+        // Regular page load, clear URL without refreshing
+        window.history.replaceState({}, '', '/');
+    }
+
+    // Setup event handlers
+    setupInfiniteScroll();
+    setupCategoryButtons();
+    setupSearch();
+    setupHashtagInput();
+    setupSizeControls();
+    setupAdminFunctionality();
+    setupDeleteConfirmation();
+});
+
+// Local copies of animation files. Lottie JSON is kept parsed in IndexedDB by
+// its content version (the ?v= of its URL) and the service worker (/sw.js)
+// keeps every other versioned file in Cache Storage, so files seen before
+// cost no network. The parsed JSON is capped at LOTTIE_STORE_MAX_BYTES, the
+// least recently used going first. /api/manifest?category= lists the current
+// URLs of a category's animations; the manifest of each category shown is
+// synced once per visit, fetching what changed since the last one and
+// dropping the copies of files that were replaced or removed.
+const LOCAL_DB_NAME = 'lootbox';
+const ASSET_CACHE = 'lootbox-assets-v1'; // same as in sw.js
+const MANIFEST_VERSION_KEY = 'manifestVersion:';
+const LOTTIE_STORE_MAX_BYTES = 64 * 1024 * 1024;
+const LOTTIE_UPKEEP_DELAY = 2000;
+let localDbPromise = null;
+const manifestSyncs = new Map();
+const lottieUsageUpdates = new Map();
+let lottieUpkeepTimeout = null;
+
+function openLocalDb() {
+    if (!localDbPromise) {
+        localDbPromise = new Promise((resolve, reject) => {
+            if (!window.indexedDB) throw new Error('IndexedDB is not available');
+            const request = indexedDB.open(LOCAL_DB_NAME, 2);
+            request.onupgradeneeded = event => {
+                // Parsed Lottie data by content version, its size and last use by
+                // the same key, and manifest entries by 'category/name'
+                const db = request.result;
+                if (event.oldVersion < 1) {
+                    db.createObjectStore('lottie');
+                    db.createObjectStore('manifest');
+                } else {
+                    // Version 1 kept no usage, so its copies could never be evicted
+                    request.transaction.objectStore('lottie').clear();
+                }
+                db.createObjectStore('lottieUsage').createIndex('lastUsed', 'lastUsed');
+            };
+            request.onsuccess = () => {
+                // Let a newer version of the page in another tab upgrade the database
+                request.result.onversionchange = () => {
+                    request.result.close();
+                    localDbPromise = null;
+                };
+                resolve(request.result);
+            };
+            request.onerror = () => reject(request.error);
+        });
+    }
+    return localDbPromise;
+}
+
+// Run one request against an object store and resolve with its result
+function localDbRequest(storeName, mode, operation) {
+    return openLocalDb().then(db => new Promise((resolve, reject) => {
+        const request = operation(db.transaction(storeName, mode).objectStore(storeName));
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    }));
+}
+
+function contentVersion(url) {
+    return new URL(url, window.location.href).searchParams.get('v');
+}
+
+// Parsed Lottie data stored for a versioned URL, or undefined
+async function getStoredLottieData(url) {
+    const version = contentVersion(url);
+    if (!version) return undefined;
+    try {
+        const data = await localDbRequest('lottie', 'readonly', store => store.get(version));
+        if (data) noteLottieUse(version);
+        return data;
+    } catch (error) {
+        console.error('Error reading stored animation:', error);
+        return undefined;
+    }
+}
+
+// size is the length of the JSON text, which is what the copy costs
+function storeLottieData(url, data, size) {
+    const version = contentVersion(url);
+    if (!version || size > LOTTIE_STORE_MAX_BYTES) return;
+    localDbRequest('lottie', 'readwrite', store => store.put(data, version))
+        .then(() => noteLottieUse(version, size))
+        .catch(error => console.error('Error storing animation:', error));
+}
+
+// Uses are written in batches, and the store trimmed after each batch
+function noteLottieUse(version, size) {
+    const update = lottieUsageUpdates.get(version) || {};
+    lottieUsageUpdates.set(version, { size: size !== undefined ? size : update.size, lastUsed: Date.now() });
+    if (!lottieUpkeepTimeout) lottieUpkeepTimeout = setTimeout(lottieStoreUpkeep, LOTTIE_UPKEEP_DELAY);
+}
+
+async function lottieStoreUpkeep() {
+    lottieUpkeepTimeout = null;
+    const updates = [...lottieUsageUpdates];
+    lottieUsageUpdates.clear();
+    try {
+        const db = await openLocalDb();
+        const transaction = db.transaction(['lottie', 'lottieUsage'], 'readwrite');
+        const usage = transaction.objectStore('lottieUsage');
+        updates.forEach(([version, update]) => {
+            if (update.size !== undefined) {
+                usage.put(update, version);
+                return;
+            }
+            // A read only moves the copy up, unless it was removed meanwhile
+            const request = usage.get(version);
+            request.onsuccess = () => {
+                if (request.result) usage.put({ size: request.result.size, lastUsed: update.lastUsed }, version);
+            };
+        });
+        await new Promise((resolve, reject) => {
+            transaction.oncomplete = resolve;
+            transaction.onerror = () => reject(transaction.error);
+        });
+
+        // Walk from the most recently used and drop whatever is past the cap
+        const trim = db.transaction(['lottie', 'lottieUsage'], 'readwrite');
+        let total = 0;
+        const request = trim.objectStore('lottieUsage').index('lastUsed').openCursor(null, 'prev');
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (!cursor) return;
+            total += cursor.value.size;
+            if (total > LOTTIE_STORE_MAX_BYTES) {
+                trim.objectStore('lottie').delete(cursor.primaryKey);
+                cursor.delete();
+            }
+            cursor.continue();
+        };
+    } catch (error) {
+        console.error('Error trimming stored animations:', error);
+    }
+}
+
+// Parsed Lottie data for a file URL, from the local copy when there is one
+async function getLottieData(url) {
+    const stored = await getStoredLottieData(url);
+    if (stored) return stored;
+    const response = await fetch(url);
+    if (!response.ok) throw new Error(`Could not load ${url} (${response.status})`);
+    const text = await response.text();
+    const data = JSON.parse(text);
+    storeLottieData(url, data, text.length);
+    return data;
+}
+
+// Manifest entry ({ path, formats }) of an animation, once its category has been synced
+async function getManifestEntry(category, name) {
+    await syncManifest(category);
+    try {
+        return await localDbRequest('manifest', 'readonly', store => store.get(`${category}/${name}`));
+    } catch (error) {
+        return undefined;
+    }
+}
+
+function manifestUrls(entry) {
+    return entry ? [entry.path, ...Object.values(entry.formats)] : [];
+}
+
+// Sync the manifest of a category the first time it is shown on this visit
+function syncManifest(category) {
+    if (!manifestSyncs.has(category)) {
+        manifestSyncs.set(category, syncCategoryManifest(category)
+            .catch(error => console.error(`Error syncing the ${category} manifest:`, error)));
+    }
+    return manifestSyncs.get(category);
+}
+
+async function syncCategoryManifest(category) {
+    const versionKey = MANIFEST_VERSION_KEY + category;
+    const since = localStorage.getItem(versionKey);
+    const query = `category=${encodeURIComponent(category)}` + (since === null ? '' : `&since=${since}`);
+    const response = await fetch(`/api/manifest?${query}`);
+    if (!response.ok) throw new Error(`Manifest request failed with status: ${response.status}`);
+    const manifest = await response.json();
+
+    const db = await openLocalDb();
+    const transaction = db.transaction('manifest', 'readwrite');
+    const entries = transaction.objectStore('manifest');
+    const staleUrls = [];
+    const replace = (key, previous) => {
+        const entry = manifest.animations[key] || null;
+        const current = new Set(manifestUrls(entry));
+        manifestUrls(previous).filter(url => !current.has(url)).forEach(url => staleUrls.push(url));
+        if (entry) entries.put(entry, key);
+        else entries.delete(key);
+    };
+
+    if (manifest.full) {
+        // Compare against everything stored for the category, so removed animations are dropped too
+        const request = entries.openCursor(IDBKeyRange.bound(`${category}/`, `${category}/\uffff`));
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (cursor) {
+                if (!(cursor.key in manifest.animations)) replace(cursor.key, cursor.value);
+                cursor.continue();
+            }
+        };
+    }
+    Object.keys(manifest.animations).forEach(key => {
+        const request = entries.get(key);
+        request.onsuccess = () => replace(key, request.result);
+    });
+    await new Promise((resolve, reject) => {
+        transaction.oncomplete = resolve;
+        transaction.onerror = () => reject(transaction.error);
+    });
+
+    // Parsed JSON and cached files of replaced versions are no longer needed
+    const staleVersions = staleUrls.map(contentVersion).filter(Boolean);
+    if (staleVersions.length > 0) {
+        const cleanup = db.transaction(['lottie', 'lottieUsage'], 'readwrite');
+        staleVersions.forEach(version => {
+            cleanup.objectStore('lottie').delete(version);
+            cleanup.objectStore('lottieUsage').delete(version);
+        });
+    }
+    if (window.caches && staleUrls.length > 0) {
+        const cache = await caches.open(ASSET_CACHE);
+        await Promise.all(staleUrls.map(url => cache.delete(url)));
+    }
+    localStorage.setItem(versionKey, manifest.version);
+}
+
+// Grid player virtualization. A card without a poster only has a live player
+// while it is near the viewport: once it is scrolled more than
+// PLAYER_KEEP_MARGIN away the player is destroyed, leaving the empty slot,
+// and a new one is made when the card comes back. Of the players on screen
+// only the lightest pageState.playback_budget play (by complexity cost, so
+// the heaviest are the first left still); a hovered card always plays.
+const PLAYER_KEEP_MARGIN = '150% 0px';
+// Lottie data kept for remounting players, least recently used first
+const PLAYER_DATA_CACHE_SIZE = 48;
+const gridPreviews = new Map();
+const playerDataCache = new Map();
+let hoveredPreview = null;
+let playbackUpdateScheduled = false;
+
+const nearObserver = new IntersectionObserver(entries => {
+    entries.forEach(entry => {
+        if (entry.isIntersecting) mountGridPlayer(entry.target);
+        else unmountGridPlayer(entry.target);
+    });
+    schedulePlaybackUpdate();
+}, { rootMargin: PLAYER_KEEP_MARGIN });
+
+const visibleObserver = new IntersectionObserver(entries => {
+    entries.forEach(entry => {
+        const preview = gridPreviews.get(entry.target);
+        if (preview) preview.visible = entry.isIntersecting;
+    });
+    schedulePlaybackUpdate();
+});
+
+// Start tracking a card's live preview; returns null for cards showing a poster
+function registerGridPreview(card, animation) {
+    const slot = card.querySelector('.player-slot');
+    if (!slot) return null;
+    const preview = {
+        animation,
+        key: `${animation.category}/${animation.name}`,
+        slot,
+        player: null,
+        ready: false,
+        playing: false,
+        visible: false,
+        bundling: false
+    };
+    gridPreviews.set(card, preview);
+
+    slot.addEventListener('mouseenter', () => {
+        hoveredPreview = preview;
+        schedulePlaybackUpdate();
+    });
+    slot.addEventListener('mouseleave', () => {
+        if (hoveredPreview === preview) hoveredPreview = null;
+        schedulePlaybackUpdate();
+    });
+    nearObserver.observe(card);
+    visibleObserver.observe(card);
+    return preview;
+}
+
+// Stop tracking a card that is being removed from the grid
+function releaseGridPreview(card) {
+    nearObserver.unobserve(card);
+    visibleObserver.unobserve(card);
+    unmountGridPlayer(card);
+    if (hoveredPreview === gridPreviews.get(card)) hoveredPreview = null;
+    gridPreviews.delete(card);
+}
+
+// Forget every card, before the grid is emptied for another listing
+function releaseGridPreviews() {
+    [...gridPreviews.keys()].forEach(releaseGridPreview);
+}
+
+function mountGridPlayer(card) {
+    const preview = gridPreviews.get(card);
+    if (!preview || preview.player) return;
+    const player = document.createElement('lottie-player');
+    player.setAttribute('background', 'transparent');
+    player.setAttribute('speed', '1');
+    player.setAttribute('loop', '');
+    preview.player = player;
+    preview.slot.appendChild(player);
+
+    // While a bundle request still carries its data, that request loads it
+    const data = cachedPlayerData(preview.key);
+    if (data) loadGridPlayer(preview, data);
+    else if (!preview.bundling) loadGridPlayerFromFile(preview);
+}
+
+function unmountGridPlayer(card) {
+    const preview = gridPreviews.get(card);
+    if (!preview || !preview.player) return;
+    // lottie-player destroys its animation when it leaves the document
+    preview.player.remove();
+    preview.player = null;
+    preview.ready = false;
+    preview.playing = false;
+}
+
+function loadGridPlayer(preview, data) {
+    const player = preview.player;
+    player.load(data).then(() => {
+        // The card may have scrolled away (or been remounted) meanwhile
+        if (preview.player !== player) return;
+        player.seek('0%');
+        player.stop();
+        preview.ready = true;
+        schedulePlaybackUpdate();
+    });
+}
+
+// Load a player from its file (or the local copy of it) rather than a bundle
+function loadGridPlayerFromFile(preview) {
+    getLottieData(preview.animation.path).then(data => {
+        cachePlayerData(preview.key, data);
+        if (preview.player && !preview.ready) loadGridPlayer(preview, data);
+    }).catch(error => console.error(`Error loading ${preview.key}:`, error));
+}
+
+function cachePlayerData(key, data) {
+    playerDataCache.delete(key);
+    playerDataCache.set(key, data);
+    while (playerDataCache.size > PLAYER_DATA_CACHE_SIZE) {
+        playerDataCache.delete(playerDataCache.keys().next().value);
+    }
+}
+
+function cachedPlayerData(key) {
+    const data = playerDataCache.get(key);
+    if (data) cachePlayerData(key, data);
+    return data;
+}
+
+function schedulePlaybackUpdate() {
+    if (playbackUpdateScheduled) return;
+    playbackUpdateScheduled = true;
+    requestAnimationFrame(updateGridPlayback);
+}
+
+// Play the hovered card and the lightest visible ones up to the budget, stop the rest
+function updateGridPlayback() {
+    playbackUpdateScheduled = false;
+    const cost = preview => preview.animation.complexity ? preview.animation.complexity.cost : Infinity;
+    const hovered = hoveredPreview && hoveredPreview.ready ? hoveredPreview : null;
+    const candidates = [...gridPreviews.values()]
+        .filter(preview => preview.ready && preview.visible && preview !== hovered)
+        .sort((a, b) => cost(a) - cost(b));
+    if (hovered) candidates.unshift(hovered);
+    const budget = Math.max(pageState.playback_budget, hovered ? 1 : 0);
+    const playing = new Set(candidates.slice(0, budget));
+
+    gridPreviews.forEach(preview => {
+        if (!preview.ready) return;
+        if (playing.has(preview) && !preview.playing) {
+            preview.player.play();
+            preview.playing = true;
+        } else if (!playing.has(preview) && preview.playing) {
+            preview.player.stop();
+            preview.playing = false;
+        }
+    });
+}
+
+function setupInfiniteScroll() {
+    window.addEventListener('scroll', debounce(() => {
+        if (loading) return;
+
+        // Header is now always visible by default, no need to toggle based on scroll
+
+        const scrollPosition = window.scrollY + window.innerHeight;
+        const documentHeight = document.documentElement.scrollHeight;
+
+        if (scrollPosition >= documentHeight - 1000) {
+            loadMoreAnimations();
+        }
+    }, 200));
+
+    // Add home button functionality
+    document.getElementById('homeButton').addEventListener('click', function() {
+        // Reset to home state
+        document.querySelector('.container').classList.remove('active');
+        document.getElementById('animationGrid').style.display = 'none';
+        document.getElementById('animationGrid').classList.remove('active');
+        window.scrollTo({ top: 0, behavior: 'smooth' });
+
+        // Make cube reappear with a slight delay when returning to home page
+        setTimeout(() => {
+            document.querySelector('.cube-container').classList.remove('hidden');
+        }, 800); // 800ms delay for a more natural reappearance
+    });
+}
+
+function setupCategoryButtons() {
+    document.querySelectorAll('.category-btn').forEach(button => {
+        button.addEventListener('click', () => {
+            // Update active state
+            document.querySelectorAll('.category-btn').forEach(btn => btn.classList.remove('active'));
+            button.classList.add('active');
+
+            // Add active state to container
+            document.querySelector('.container').classList.add('active');
+
+            // Reset and prepare grid
+            currentCategory = button.dataset.category;
+            currentPage = 1;
+            const grid = document.getElementById('animationGrid');
+            releaseGridPreviews();
+            grid.innerHTML = '';
+            grid.style.display = 'grid';
+            grid.classList.remove('active');
+
+            // Update URL without refreshing
+            window.history.pushState({}, '', `/${currentCategory}`);
+
+            // Delay loading animations
+            setTimeout(() => {
+                loadMoreAnimations();
+                grid.classList.add('active');
+            }, 400);
+        });
+    });
+}
+
+function setupSearch() {
+    const form = document.getElementById('searchForm');
+    const input = form.querySelector('input');
+
+    let debounceTimeout;
+    input.addEventListener('input', () => {
+        clearTimeout(debounceTimeout);
+        debounceTimeout = setTimeout(() => {
+            searchQuery = input.value.trim();
+            currentPage = 1;
+
+            // Show grid and move search bar up if there's a search query
+            const container = document.querySelector('.container');
+            const grid = document.getElementById('animationGrid');
+
+            if (searchQuery) {
+                container.classList.add('active');
+                grid.style.display = 'grid';
+                releaseGridPreviews();
+                grid.innerHTML = '';
+                currentCategory = ''; // Clear category filter
+                document.querySelectorAll('.category-btn').forEach(btn => btn.classList.remove('active'));
+                grid.classList.add('active'); // Ensure grid is visible
+                loadMoreAnimations();
+            } else {
+                container.classList.remove('active');
+                grid.style.display = 'none';
+                releaseGridPreviews();
+                grid.innerHTML = '';
+                grid.classList.remove('active');
+            }
+        }, 300);
+    });
+
+    form.addEventListener('submit', (e) => {
+        e.preventDefault();
+        // Handle explicit form submission
+        const searchInput = form.querySelector('input');
+        searchQuery = searchInput.value.trim();
+        if (searchQuery) {
+            currentPage = 1;
+            const container = document.querySelector('.container');
+            const grid = document.getElementById('animationGrid');
+
+            container.classList.add('active');
+            grid.style.display = 'grid';
+            releaseGridPreviews();
+            grid.innerHTML = '';
+            currentCategory = '';
+            document.querySelectorAll('.category-btn').forEach(btn => btn.classList.remove('active'));
+            grid.classList.add('active');
+            loadMoreAnimations();
+        }
+    });
+}
+
+function setupHashtagInput() {
+    const hashtagInput = document.getElementById('hashtagInput');
+    hashtagInput.addEventListener('keypress', function(e) {
+        if (e.key === 'Enter' && this.value.trim()) {
+            addHashtag(this.value.trim());
+            this.value = '';
+        }
+    });
+}
+
+function openPopup(name, path, hashtags) {
+    // Extract category from the path
+    const pathParts = path.split('/');
+    const category = pathParts[3]; // Format: /static/animations/[category]/[file]
+
+    currentAnimation = { 
+        name, 
+        path, 
+        hashtags,
+        category: category
+    };
+
+    // Prevent background scrolling and ensure cube stays hidden
+    document.body.classList.add('no-scroll');
+    document.querySelector('.cube-container').classList.add('hidden');
+    // Cancel any pending cube reappear timers
+    clearTimeout(window.cubeReappearTimer);
+
+    // Hide header when side menu is active
+    document.getElementById('header-wrapper').classList.add('hidden');
+
+    // Update popup content
+    document.getElementById('popupTitle').textContent = name;
+    const player = document.getElementById('popupPlayer');
+    getLottieData(path)
+        .then(data => {
+            // Another animation may have been opened meanwhile
+            if (currentAnimation.path === path) player.load(data);
+        })
+        .catch(() => player.load(path));
+
+    // Update download links for MP4 and GIF
+    updateDownloadLinks(category, name);
+
+    // Setup share button functionality
+    setupShareButton();
+
+    // Display hashtags
+    const hashtagsList = document.getElementById('hashtagsList');
+    hashtagsList.innerHTML = '';
+    hashtags.forEach(tag => {
+        const tagElement = createHashtagElement(tag);
+        hashtagsList.appendChild(tagElement);
+    });
+
+    // Show sidebar and overlay
+    document.getElementById('animationPopup').classList.add('active');
+    document.getElementById('sidebarOverlay').classList.add('active');
+}
+
+function closePopup() {
+    document.getElementById('animationPopup').classList.remove('active');
+    document.getElementById('sidebarOverlay').classList.remove('active');
+
+    // Re-enable background scrolling
+    document.body.classList.remove('no-scroll');
+
+    // Show header again
+    document.getElementById('header-wrapper').classList.remove('hidden');
+
+    // Don't show cube immediately after closing popup, wait for timer
+    // And only show if we're actually on the home screen
+    clearTimeout(window.cubeReappearTimer);
+    window.cubeReappearTimer = setTimeout(() => {
+        const notOnHomeScreen = document.querySelector('.container.active') ||
+                               document.getElementById('animationGrid').style.display !== 'none';
+
+        if (!notOnHomeScreen) {
+            document.querySelector('.cube-container').classList.remove('hidden');
+        }
+    }, 800);
+    document.getElementById('popupPlayer').stop();
+    currentAnimation = null;
+}
+
+function setupSizeControls() {
+    // Size control buttons
+    const sizeSmall = document.getElementById('sizeSmall');
+    const sizeMedium = document.getElementById('sizeMedium');
+    const sizeLarge = document.getElementById('sizeLarge');
+    const grid = document.getElementById('animationGrid');
+
+    // Size control functionality
+    sizeSmall.addEventListener('click', function() {
+        setThumbnailSize('small');
+    });
+
+    sizeMedium.addEventListener('click', function() {
+        setThumbnailSize('medium');
+    });
+
+    sizeLarge.addEventListener('click', function() {
+        setThumbnailSize('large');
+    });
+
+    // Set default size or load from localStorage
+    const savedSize = localStorage.getItem('thumbnailSize') || 'medium';
+    setThumbnailSize(savedSize);
+
+    function setThumbnailSize(size) {
+        // Remove all size classes
+        grid.classList.remove('size-small', 'size-medium', 'size-large');
+        // Add the selected size class
+        grid.classList.add('size-' + size);
+        // Update active button
+        document.querySelectorAll('.size-btn').forEach(btn => btn.classList.remove('active'));
+        document.getElementById('size' + size.charAt(0).toUpperCase() + size.slice(1)).classList.add('active');
+        // Save preference
+        localStorage.setItem('thumbnailSize', size);
+    }
+}
+
+// Admin functionality
+function setupAdminFunctionality() {
+    const adminButton = document.getElementById('adminButton');
+    const loginModal = document.getElementById('loginModal');
+    const loginForm = document.getElementById('loginForm');
+    const uploadTab = document.getElementById('uploadTab');
+    const uploadPopup = document.getElementById('uploadPopup');
+    const uploadForm = document.getElementById('uploadForm');
+
+    // Admin state
+    let isAdmin = localStorage.getItem('isAdmin') === 'true';
+
+    // Update UI based on admin state
+    function updateAdminUI() {
+        if (isAdmin) {
+            adminButton.classList.add('active');
+            uploadTab.style.display = 'block';
+        } else {
+            adminButton.classList.remove('active');
+            uploadTab.style.display = 'none';
+            uploadPopup.classList.remove('active');
+        }
+    }
+
+    // Initialize admin UI
+    updateAdminUI();
+
+    // Admin button click
+    adminButton.addEventListener('click', function() {
+        console.log('Admin button clicked, current state:', isAdmin);
+        if (isAdmin) {
+            // Log out
+            isAdmin = false;
+            localStorage.removeItem('isAdmin');
+            updateAdminUI();
+            alert('Logged out of admin mode');
+        } else {
+            // Show login modal and prevent background scrolling
+            loginModal.classList.add('active');
+            document.body.classList.add('no-scroll');
+        }
+    });
+
+    // Close login modal
+    window.closeLoginModal = function() {
+        loginModal.classList.remove('active');
+        document.body.classList.remove('no-scroll');
+    };
+
+    // Handle login form submission
+    loginForm.addEventListener('submit', function(e) {
+        e.preventDefault();
+        const username = document.getElementById('username').value;
+        const password = document.getElementById('password').value;
+
+        // Simple authentication (should be replaced with proper auth in production)
+        if (username === 'admin' && password === 'admin') {
+            isAdmin = true;
+            localStorage.setItem('isAdmin', 'true');
+            updateAdminUI();
+            closeLoginModal();
+        } else {
+            alert('Invalid credentials');
+        }
+    });
+
+    // Upload tab click
+    uploadTab.addEventListener('click', function() {
+        // Show upload popup
+        uploadPopup.classList.add('active');
+        // Prevent background scrolling and ensure cube stays hidden
+        document.body.classList.add('no-scroll');
+        document.querySelector('.cube-container').classList.add('hidden');
+        // Cancel any pending cube reappear timers
+        clearTimeout(window.cubeReappearTimer);
+        // Hide header when upload popup is active
+        document.getElementById('header-wrapper').classList.add('hidden');
+
+        // Update active state
+        document.querySelectorAll('.category-btn').forEach(btn => btn.classList.remove('active'));
+        uploadTab.classList.add('active');
+    });
+
+    // Close upload popup
+    window.closeUploadPopup = function() {
+        uploadPopup.classList.remove('active');
+        // Re-enable background scrolling
+        document.body.classList.remove('no-scroll');
+        // Show header again
+        document.getElementById('header-wrapper').classList.remove('hidden');
+        uploadTab.classList.remove('active');
+    };
+
+    // File upload tracking
+    let uploadedFiles = [];
+    const fileContainer = document.getElementById('uploadFilesContainer');
+    const fileTemplate = document.getElementById('file-item-template');
+    const animationNameInput = document.getElementById('animationName');
+    const previewContainer = document.getElementById('previewContainer');
+    const previewPlaceholder = previewContainer.querySelector('.preview-placeholder');
+    const previewAnimation = previewContainer.querySelector('.preview-animation');
+    const uploadPreview = document.getElementById('uploadPreview');
+
+    // Handle file selection or drop
+    document.getElementById('animationFiles').addEventListener('change', handleFileSelection);
+
+    // Function to reset file input state
+    function resetFileInput() {
+        // Show dropzone again and hide preview
+        dropzone.style.display = 'block';
+        previewContainer.style.display = 'none';
+        uploadPreview.style.display = 'none';
+
+        // Reset the file input to allow selecting the same files again
+        document.getElementById('animationFiles').value = '';
+    }
+
+    // Drag and drop functionality
+    const dropzone = document.getElementById('dropzone');
+    ['dragenter', 'dragover', 'dragleave', 'drop'].forEach(eventName => {
+        dropzone.addEventListener(eventName, preventDefaults);
+    });
+
+    function preventDefaults(e) {
+        e.preventDefault();
+        e.stopPropagation();
+    }
+
+    ['dragenter', 'dragover'].forEach(eventName => {
+        dropzone.addEventListener(eventName, () => {
+            dropzone.classList.add('highlight');
+        });
+    });
+
+    ['dragleave', 'drop'].forEach(eventName => {
+        dropzone.addEventListener(eventName, () => {
+            dropzone.classList.remove('highlight');
+        });
+    });
+
+    dropzone.addEventListener('drop', (e) => {
+        const dt = e.dataTransfer;
+        const files = dt.files;
+        handleFiles(files);
+    });
+
+    function handleFileSelection(e) {
+        const files = e.target.files;
+        handleFiles(files);
+    }
+
+    function handleFiles(files) {
+        // Group files by base name (without extension)
+        const filesByName = {};
+        Array.from(files).forEach(file => {
+            const nameParts = file.name.split('.');
+            const extension = nameParts.pop().toLowerCase();
+            const baseName = nameParts.join('.');
+
+            if (!filesByName[baseName]) {
+                filesByName[baseName] = [];
+            }
+            filesByName[baseName].push({
+                file,
+                format: extension
+            });
+        });
+
+        // Auto-set animation name from first file
+        if (Object.keys(filesByName).length > 0 && !animationNameInput.value) {
+            animationNameInput.value = Object.keys(filesByName)[0];
+        }
+
+        // Add each file to the UI and start upload
+        Object.entries(filesByName).forEach(([baseName, fileList]) => {
+            fileList.forEach(fileInfo => {
+                addFileToUI(fileInfo.file, fileInfo.format);
+            });
+        });
+    }
+
+    function addFileToUI(file, format) {
+        // Clone the template
+        const newFileItem = document.importNode(fileTemplate.content, true).querySelector('.file-item');
+
+        // Set file info
+        const fileFormatBadge = newFileItem.querySelector('.file-format-badge');
+        fileFormatBadge.textContent = format.toUpperCase();
+        fileFormatBadge.classList.add(`format-${format}`);
+
+        newFileItem.querySelector('.file-name').textContent = file.name;
+
+        // Set icon based on format
+        const typeIcon = newFileItem.querySelector('.file-type-icon');
+        if (format === 'json') {
+            typeIcon.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><circle cx="12" cy="12" r="10"></circle><circle cx="12" cy="12" r="4"></circle></svg>';
+        } else if (format === 'mp4') {
+            typeIcon.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polygon points="5 3 19 12 5 21 5 3"></polygon></svg>';
+        } else if (format === 'gif') {
+            typeIcon.innerHTML = '<svg xmlns="http://www.w3.org/2000/svg" width="18" height="18" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><rect x="3" y="3" width="18" height="18" rx="2" ry="2"></rect><circle cx="8.5" cy="8.5" r="1.5"></circle><polyline points="21 15 16 10 5 21"></polyline></svg>';
+        }
+
+        // Add remove button functionality
+        newFileItem.querySelector('.remove-file').addEventListener('click', () => {
+            removeFile(newFileItem, file);
+
+            // Check if no files are left, reset to file input state
+            if (fileContainer.children.length === 0) {
+                resetFileInput();
+            }
+        });
+
+        // Add to container
+        fileContainer.appendChild(newFileItem);
+
+        // Start upload immediately
+        uploadFile(file, newFileItem);
+
+        // Track the file
+        uploadedFiles.push({
+            file,
+            format,
+            element: newFileItem
+        });
+
+        // If it's a JSON file, set up the preview
+        if (format === 'json') {
+            setupJsonPreview(file);
+        }
+    }
+
+    function removeFile(element, file) {
+        // Remove from UI
+        element.remove();
+
+        // Remove from tracking array
+        uploadedFiles = uploadedFiles.filter(f => f.file !== file);
+
+        // If we just removed the JSON file, hide the preview
+        if (file.name.toLowerCase().endsWith('.json')) {
+            // Check if there's another JSON file
+            const hasAnotherJson = uploadedFiles.some(f => f.file.name.toLowerCase().endsWith('.json'));
+            if (!hasAnotherJson) {
+                resetFileInput();
+            }
+        }
+    }
+
+    function setupJsonPreview(jsonFile) {
+        // Read the JSON file for preview
+        const reader = new FileReader();
+        reader.onload = function(e) {
+            try {
+                const jsonData = JSON.parse(e.target.result);
+
+                // Hide dropzone and show preview
+                dropzone.style.display = 'none';
+                previewContainer.style.display = 'flex';
+
+                // Show, load and play the lottie animation
+                uploadPreview.style.display = 'block';
+                uploadPreview.load(jsonData);
+                uploadPreview.play();
+            } catch (error) {
+                console.error('Error parsing JSON for preview:', error);
+                showMessage('Unable to preview animation. Invalid JSON format.', 'error');
+            }
+        };
+        reader.onerror = function() {
+            showMessage('Failed to read the JSON file for preview', 'error');
+        };
+        reader.readAsText(jsonFile);
+    }
+
+    function uploadFile(file, element) {
+        // Set up progress tracking
+        const progressBar = element.querySelector('.progress-bar');
+        const progressContainer = element.querySelector('.progress-container');
+
+        uploadInChunks(file, (fraction) => {
+            progressBar.style.width = (fraction * 100) + '%';
+        })
+            .then(response => {
+                progressContainer.classList.add('upload-complete');
+                element.classList.add('success');
+
+                // Update the file object with the server-side data
+                const fileIndex = uploadedFiles.findIndex(f => f.file === file);
+                if (fileIndex !== -1) {
+                    uploadedFiles[fileIndex].tempId = response.temp_id;
+                    uploadedFiles[fileIndex].serverId = response.id;
+                }
+            })
+            .catch(error => {
+                progressContainer.classList.add('upload-error');
+                element.classList.add('error');
+                showMessage('Upload error: ' + (error.message || 'Upload failed'), 'error');
+            });
+    }
+
+    // Handle form submission (saving the animation metadata)
+    uploadForm.addEventListener('submit', function(e) {
+        e.preventDefault();
+
+        // If no files were uploaded, show an error
+        if (uploadedFiles.length === 0) {
+            showMessage('Please upload at least one file', 'error');
+            return;
+        }
+
+        const name = document.getElementById('animationName').value;
+        const category = document.getElementById('animationCategory').value;
+        const tags = document.getElementById('animationTags').value.split(',').map(tag => tag.trim()).filter(tag => tag !== '');
+
+        // Create form data with metadata and file references
+        const formData = new FormData();
+        formData.append('name', name);
+        formData.append('category', category);
+        formData.append('tags', JSON.stringify(tags));
+        formData.append('fileCount', uploadedFiles.length);
+
+        // Add each uploaded file's information
+        uploadedFiles.forEach((fileInfo, index) => {
+            formData.append(`fileFormat_${index}`, fileInfo.format);
+            formData.append(`fileId_${index}`, fileInfo.tempId || '');
+            formData.append(`fileName_${index}`, fileInfo.file.name);
+        });
+
+        // Send to server
+        fetch('/api/save-animation', {
+            method: 'POST',
+            body: formData
+        })
+        .then(response => response.json())
+        .then(data => {
+            if (data.success) {
+                showMessage('Animation saved successfully!', 'success');
+                // Reset everything
+                uploadForm.reset();
+                fileContainer.innerHTML = '';
+                uploadedFiles = [];
+
+                // Reset all UI components
+                dropzone.style.display = 'block';
+                previewContainer.style.display = 'none';
+                uploadPreview.style.display = 'none';
+                uploadPreview.stop();
+                uploadPreview.load(null);
+                document.getElementById('animationFiles').value = '';
+
+                // Close popup
+                closeUploadPopup();
+
+                // Refresh the page after a slight delay to show new animation
+                setTimeout(() => {
+                    window.location.reload();
+                }, 1000);
+            } else {
+                showMessage('Error: ' + data.error, 'error');
+            }
+        })
+        .catch(error => {
+            console.error('Error:', error);
+            showMessage('Failed to save animation. Please try again.', 'error');
+        });
+    });
+}
+
+function createHashtagElement(tag) {
+    const div = document.createElement('div');
+    div.className = 'hashtag';
+    div.innerHTML = `
+        #${tag}
+        <button onclick="removeHashtag('${tag}')">×</button>
+    `;
+    return div;
+}
+
+async function addHashtag(tag) {
+    if (!currentAnimation) return;
+
+    const hashtags = new Set([...currentAnimation.hashtags]);
+    hashtags.add(tag);
+    await updateHashtags(Array.from(hashtags));
+}
+
+async function removeHashtag(tag) {
+    if (!currentAnimation) return;
+
+    const hashtags = new Set([...currentAnimation.hashtags]);
+    hashtags.delete(tag);
+    await updateHashtags(Array.from(hashtags));
+}
+
+async function updateHashtags(hashtags) {
+    try {
+        const response = await fetch(`/api/hashtags/${currentAnimation.name}`, {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ hashtags })
+        });
+
+        if (response.ok) {
+            currentAnimation.hashtags = hashtags;
+            const hashtagsList = document.getElementById('hashtagsList');
+            hashtagsList.innerHTML = '';
+            hashtags.forEach(tag => {
+                const tagElement = createHashtagElement(tag);
+                hashtagsList.appendChild(tagElement);
+            });
+        }
+    } catch (error) {
+        console.error('Failed to update hashtags:', error);
+    }
+}
+
+async function exportAnimation(format) {
+    if (!currentAnimation) {
+        alert('Please select an animation first');
+        return;
+    }
+
+    // Special case for SVG - open frame extraction modal instead of downloading directly
+    if (format === 'svg') {
+        openSvgExportModal();
+        return;
+    }
+
+    // Show loading indicator
+    const exportBtns = document.querySelectorAll('.export-btn');
+    const clickedBtn = [...exportBtns].find(btn => btn.getAttribute('data-format') === format);
+    const originalText = clickedBtn ? clickedBtn.textContent : format.toUpperCase();
+
+    if (clickedBtn) {
+        clickedBtn.textContent = 'Downloading...';
+        clickedBtn.disabled = true;
+    }
+
+    try {
+        // For JSON format, we can handle it directly in the client
+        if (format === 'json') {
+            // The optimized variant, with any shared images inlined so the file stands alone
+            const response = await fetch(`/api/export/${encodeURIComponent(currentAnimation.category)}/${encodeURIComponent(currentAnimation.name)}?format=json&inline=1`);
+            if (!response.ok) throw new Error('Failed to load animation');
+
+            const data = await response.json();
+            const blob = new Blob([JSON.stringify(data, null, 2)], { type: 'application/json' });
+            const url = window.URL.createObjectURL(blob);
+
+            const a = document.createElement('a');
+            a.href = url;
+            a.download = `${currentAnimation.name}.json`;
+            a.click();
+
+            window.URL.revokeObjectURL(url);
+        } else {
+            // For MP4 and GIF, use direct file download with iframe
+            try {
+                // The format manifest says whether the file exists, so there is nothing to probe
+                const manifest = await getFormatManifest(currentAnimation.category, currentAnimation.name);
+                const info = manifest[format];
+                if (!info) {
+                    throw new Error(`${format.toUpperCase()} version not available for this animation`);
+                }
+                const fileUrl = info.url;
+
+                // Create a hidden iframe for download
+                const iframe = document.createElement('iframe');
+                iframe.style.display = 'none';
+                iframe.src = fileUrl;
+                document.body.appendChild(iframe);
+
+                // Remove iframe after load
+                setTimeout(() => {
+                    document.body.removeChild(iframe);
+                }, 2000);
+            } catch (error) {
+                throw new Error(error.message || `Failed to download ${format.toUpperCase()} version`);
+            }
+        }
+    } catch (error) {
+        alert(error.message || `Failed to download ${format.toUpperCase()} version`);
+        console.error('Download error:', error);
+    } finally {
+        // Reset button state
+        if (clickedBtn) {
+            clickedBtn.textContent = originalText;
+            clickedBtn.disabled = false;
+        }
+    }
+}
+
+// Keep track of retry attempts and loading state
+let retryCount = 0;
+const MAX_RETRIES = 3;
+let animationLoadingTimeout = null;
+// Cursor returned with the last page; pages after the first resume from it
+let nextCursor = null;
+// Format manifests ({ json, mp4, gif, svg } with url, size and sha256) by 'category/name'
+const formatManifests = {};
+
+async function loadMoreAnimations(isRetry = false) {
+    // Don't allow multiple concurrent loading requests unless it's a retry
+    if (loading && !isRetry) return;
+
+    // Nothing left to load once the server stops returning a cursor
+    if (currentPage > 1 && !nextCursor) return;
+
+    // Only show loading indicator on first attempt, not retries
+    if (!isRetry) {
+        loading = true;
+        document.getElementById('loadingIndicator').style.display = 'block';
+    }
+
+    try {
+        // Clear any pending retry timeouts to prevent race conditions
+        if (animationLoadingTimeout) {
+            clearTimeout(animationLoadingTimeout);
+            animationLoadingTimeout = null;
+        }
+
+        const encodedQuery = encodeURIComponent(searchQuery || '');
+        console.log(`Loading animations: category=${currentCategory}, query=${encodedQuery}, page=${currentPage}${isRetry ? ` (retry ${retryCount}/${MAX_RETRIES})` : ''}`);
+
+        // Add a small delay for retry attempts to avoid overwhelming the server
+        if (isRetry) {
+            await new Promise(resolve => setTimeout(resolve, 800));
+        }
+
+        const cursorParam = currentPage > 1 ? `&cursor=${encodeURIComponent(nextCursor)}` : '';
+        const response = await fetch(`/api/animations?category=${currentCategory}&q=${encodedQuery}${cursorParam}`, {
+            // Adding a cache control header to avoid cached responses
+            headers: { 'Cache-Control': 'no-cache' }
+        });
+
+        if (!response.ok) {
+            throw new Error(`Server responded with status: ${response.status}`);
+        }
+
+        const data = await response.json();
+        console.log('Received data:', data);
+
+        // Reset retry counter on success
+        retryCount = 0;
+        nextCursor = data.next_cursor || null;
+
+        if (data.animations && data.animations.length > 0) {
+            const grid = document.getElementById('animationGrid');
+            // Make sure grid is visible and active
+            grid.style.display = 'grid';
+            document.querySelector('.container').classList.add('active');
+
+            // Add new animations with a slight delay to prevent layout thrashing
+            setTimeout(() => {
+                const bundled = [];
+                data.animations.forEach(animation => {
+                    formatManifests[`${animation.category}/${animation.name}`] = animation.format_manifest || {};
+                    const card = createAnimationCard(animation);
+                    grid.appendChild(card);
+                    card.classList.add('initialized');
+
+                    // Cards without a poster get their Lottie data from one bundle request
+                    const preview = registerGridPreview(card, animation);
+                    if (preview) bundled.push(preview);
+                });
+                loadBundle(bundled);
+                new Set(data.animations.map(animation => animation.category)).forEach(syncManifest);
+
+                currentPage++;
+
+                // Add active class with a slight delay to ensure transition works
+                setTimeout(() => {
+                    grid.classList.add('active');
+                }, 50);
+            }, 10);
+        } else {
+            // No results - show a more subtle message
+            const message = document.getElementById('message');
+            message.textContent = searchQuery ? `No results found for "${searchQuery}"` : 'No animations found';
+            message.className = 'info';
+            message.style.display = 'block';
+            message.style.opacity = '1';
+            message.style.transition = 'opacity 0.3s ease';
+
+            // Fade out after delay
+            setTimeout(() => {
+                message.style.opacity = '0';
+                setTimeout(() => {
+                    message.style.display = 'none';
+                }, 300);
+            }, 3000);
+        }
+    } catch (error) {
+        console.error(`Error loading animations (attempt ${retryCount + 1}):`, error);
+
+        // Attempt to retry loading animations if under max retries
+        if (retryCount < MAX_RETRIES) {
+            retryCount++;
+            console.log(`Retrying animation load (${retryCount}/${MAX_RETRIES})...`);
+
+            // Use exponential backoff for retries (800ms, 1600ms, 3200ms)
+            const retryDelay = 800 * Math.pow(2, retryCount - 1);
+
+            // Only show a subtle retry message if we've had multiple failures
+            if (retryCount > 1) {
+                const message = document.getElementById('message');
+                message.textContent = `Reconnecting... (${retryCount}/${MAX_RETRIES})`;
+                message.className = 'info';
+                message.style.display = 'block';
+                message.style.opacity = '0.7';
+            }
+
+            // Schedule retry with backoff
+            animationLoadingTimeout = setTimeout(() => {
+                loadMoreAnimations(true); // true indicates this is a retry
+            }, retryDelay);
+
+            return; // Exit early without clearing loading state
+        } else {
+            // After maximum retries, show a more detailed but less intrusive error message
+            const message = document.getElementById('message');
+            message.innerHTML = `<div>Unable to load content. Please check your connection.</div>`;
+            message.className = 'info';
+            message.style.display = 'block';
+
+            // Add a refresh button inline
+            const refreshButton = document.createElement('button');
+            refreshButton.textContent = 'Try Again';
+            refreshButton.style.margin = '8px auto 0';
+            refreshButton.style.padding = '4px 12px';
+            refreshButton.style.background = '#fff';
+            refreshButton.style.color = '#333';
+            refreshButton.style.border = 'none';
+            refreshButton.style.borderRadius = '4px';
+            refreshButton.style.cursor = 'pointer';
+            refreshButton.style.display = 'block';
+            refreshButton.onclick = () => {
+                message.style.display = 'none';
+                retryCount = 0;
+                loadMoreAnimations();
+            };
+            message.appendChild(refreshButton);
+
+            // Clear loading state
+            document.getElementById('loadingIndicator').style.display = 'none';
+        }
+    } finally {
+        // Only clear loading states if we're done with all retries or succeeded
+        if (!animationLoadingTimeout) {
+            loading = false;
+            document.getElementById('loadingIndicator').style.display = 'none';
+        }
+    }
+}
+
+// Function to update download links based on animation
+async function getFormatManifest(category, name) {
+    const key = `${category}/${name}`;
+    if (!(key in formatManifests)) {
+        try {
+            const response = await fetch('/api/formats', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ animations: [{ category, name }] })
+            });
+            const result = await response.json();
+            formatManifests[key] = (result.formats && result.formats[key]) || {};
+        } catch (error) {
+            return {};
+        }
+    }
+    return formatManifests[key] || {};
+}
+
+function setMediaLink(link, category, name, format, info) {
+    const label = format.toUpperCase();
+    link.download = `${name}.${format}`;
+    link.classList.remove('disabled', 'admin-upload');
+
+    if (info) {
+        link.href = info.url;
+        link.title = `Download ${label}`;
+        link.innerHTML = label;
+        link.onclick = null;
+    } else if (localStorage.getItem('isAdmin') === 'true') {
+        // Admin mode - transform to upload button
+        link.classList.add('admin-upload');
+        link.title = `Upload ${label} file`;
+        link.innerHTML = `${label} <span class="upload-icon">+</span>`;
+        link.onclick = (e) => {
+            e.preventDefault();
+            openMediaUpload(category, name, format);
+        };
+    } else {
+        // Normal user mode - disabled button
+        link.classList.add('disabled');
+        link.title = `${label} not available`;
+        link.innerHTML = label;
+        link.onclick = e => e.preventDefault();
+    }
+}
+
+async function updateDownloadLinks(category, name) {
+    const manifest = await getFormatManifest(category, name);
+    // Ignore the answer if another animation was opened in the meantime
+    if (currentAnimation && currentAnimation.name !== name) return;
+
+    setMediaLink(document.getElementById('mp4Link'), category, name, 'mp4', manifest.mp4);
+    setMediaLink(document.getElementById('gifLink'), category, name, 'gif', manifest.gif);
+}
+
+// Function to open media upload dialog
+function openMediaUpload(category, name, format) {
+    // Create file input
+    const fileInput = document.createElement('input');
+    fileInput.type = 'file';
+    fileInput.accept = format === 'mp4' ? 'video/mp4' : 'image/gif';
+    fileInput.style.display = 'none';
+    document.body.appendChild(fileInput);
+
+    // Handle file selection
+    fileInput.onchange = async (e) => {
+        if (!e.target.files.length) {
+            document.body.removeChild(fileInput);
+            return;
+        }
+
+        const file = e.target.files[0];
+        uploadMediaFile(category, name, format, file);
+        document.body.removeChild(fileInput);
+    };
+
+    // Open file selector
+    fileInput.click();
+}
+
+// Identifies this page's uploads so the server can account for the ones left unsaved
+const uploadSessionId = Date.now().toString(36) + Math.random().toString(36).slice(2);
+
+// Upload a file in chunks, resuming from the server's offset after a network error.
+// Resolves with the same temp file details as /api/upload-temp.
+async function uploadInChunks(file, onProgress) {
+    const startResponse = await fetch('/api/uploads', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json', 'X-Upload-Session': uploadSessionId },
+        body: JSON.stringify({ filename: file.name, size: file.size })
+    });
+    const session = await startResponse.json();
+    if (!session.success) throw new Error(session.error || 'Upload failed');
+
+    let offset = 0;
+    let failures = 0;
+    while (offset < file.size) {
+        let response;
+        try {
+            response = await fetch(`/api/uploads/${session.upload_id}?offset=${offset}`, {
+                method: 'PUT',
+                body: file.slice(offset, offset + session.chunk_size)
+            });
+        } catch (error) {
+            // Connection dropped: wait, then ask the server how much it kept
+            if (++failures > 5) throw error;
+            await new Promise(resolve => setTimeout(resolve, 1000 * failures));
+            try {
+                const status = await (await fetch(`/api/uploads/${session.upload_id}`)).json();
+                if (status.success) offset = status.offset;
+            } catch (statusError) {}
+            continue;
+        }
+
+        const result = await response.json();
+        if (response.ok || response.status === 409) {
+            offset = result.offset;
+            failures = 0;
+        } else {
+            throw new Error(result.error || 'Upload failed');
+        }
+        if (onProgress) onProgress(file.size ? offset / file.size : 1);
+    }
+
+    const completeResponse = await fetch(`/api/uploads/${session.upload_id}/complete`, { method: 'POST' });
+    const completed = await completeResponse.json();
+    if (!completed.success) throw new Error(completed.error || 'Upload failed');
+    if (onProgress) onProgress(1);
+    return completed;
+}
+
+// Function to upload media file
+async function uploadMediaFile(category, name, format, file) {
+    // Show loading state
+    const mediaLink = format === 'mp4' ? document.getElementById('mp4Link') : document.getElementById('gifLink');
+    const originalContent = mediaLink.innerHTML;
+    mediaLink.innerHTML = `<span class="spinner"></span> Uploading...`;
+    mediaLink.onclick = e => e.preventDefault();
+
+    try {
+        // Send the file in resumable chunks, then attach it to the animation
+        const upload = await uploadInChunks(file);
+
+        // Create form data
+        const formData = new FormData();
+        formData.append('temp_id', upload.temp_id);
+        formData.append('name', name);
+        formData.append('category', category);
+        formData.append('format', format);
+
+        // Send to server
+        const response = await fetch('/api/upload-media', {
+            method: 'POST',
+            body: formData
+        });
+
+        const result = await response.json();
+
+        if (result.success) {
+            // Update button to show success
+            mediaLink.classList.remove('admin-upload', 'disabled');
+            mediaLink.innerHTML = format.toUpperCase();
+            mediaLink.title = `Download ${format.toUpperCase()}`;
+            mediaLink.href = (result.formats && result.formats[format]) ? result.formats[format].url : result.url;
+            mediaLink.onclick = null;
+            formatManifests[`${category}/${name}`] = result.formats || {};
+
+            // Show success message
+            showMessage(`${format.toUpperCase()} file uploaded successfully!`, 'success');
+        } else {
+            throw new Error(result.error || 'Upload failed');
+        }
+    } catch (error) {
+        // Restore button and show error
+        mediaLink.innerHTML = originalContent;
+        mediaLink.classList.add('admin-upload');
+        mediaLink.onclick = (e) => {
+            e.preventDefault();
+            openMediaUpload(category, name, format);
+        };
+
+        showMessage(error.message || 'Upload failed', 'error');
+    }
+}
+
+// Function to show messages
+function showMessage(text, type = 'info') {
+    const message = document.getElementById('message');
+    message.textContent = text;
+    message.className = '';
+    message.classList.add(type);
+    message.style.display = 'block';
+
+    // Auto hide after 3 seconds
+    setTimeout(() => {
+        message.style.display = 'none';
+    }, 3000);
+}
+
+// Update the counts on the category buttons from /api/facets
+async function refreshCategoryCounts() {
+    try {
+        const response = await fetch('/api/facets?top=1');
+        if (!response.ok) return;
+        const facets = await response.json();
+        document.querySelectorAll('.category-btn[data-category]').forEach(button => {
+            const count = button.querySelector('.category-count');
+            const category = facets.categories[button.dataset.category];
+            if (count && category) count.textContent = category.total;
+        });
+    } catch (error) {
+        // The counts shown stay as they were
+    }
+}
+
+// Load the Lottie data for many grid cards at once from /api/bundle, which
+// streams one animation per line so each card starts as soon as its line arrives.
+// previews are the registered grid previews waiting for their animation.
+async function loadBundle(previews) {
+    if (previews.length === 0) return;
+    const pending = new Map(previews.map(preview => [preview.key, preview]));
+    pending.forEach(preview => preview.bundling = true);
+
+    // Animations stored locally from an earlier visit are left out of the request
+    await Promise.all(previews.map(async preview => {
+        const data = await getStoredLottieData(preview.animation.path);
+        if (!data) return;
+        pending.delete(preview.key);
+        preview.bundling = false;
+        cachePlayerData(preview.key, data);
+        if (preview.player && !preview.ready) loadGridPlayer(preview, data);
+    }));
+    if (pending.size === 0) return;
+
+    try {
+        const response = await fetch('/api/bundle', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({
+                animations: [...pending.values()].map(preview => ({
+                    category: preview.animation.category,
+                    name: preview.animation.name
+                }))
+            })
+        });
+        if (!response.ok || !response.body) throw new Error('Bundle request failed');
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            let newline;
+            while ((newline = buffer.indexOf('\n')) >= 0) {
+                const line = buffer.slice(0, newline);
+                buffer = buffer.slice(newline + 1);
+                if (!line) continue;
+                const item = JSON.parse(line);
+                const key = `${item.category}/${item.name}`;
+                const preview = pending.get(key);
+                if (preview && item.type === 'animation') {
+                    pending.delete(key);
+                    preview.bundling = false;
+                    cachePlayerData(key, item.data);
+                    storeLottieData(item.path, item.data, line.length);
+                    if (preview.player && !preview.ready) loadGridPlayer(preview, item.data);
+                }
+            }
+        }
+    } catch (error) {
+        console.error('Error loading animation bundle:', error);
+    }
+    // Anything the bundle did not deliver is loaded on its own
+    pending.forEach(preview => {
+        preview.bundling = false;
+        if (preview.player && !preview.ready) loadGridPlayerFromFile(preview);
+    });
+}
+
+function createAnimationCard(animation) {
+    const div = document.createElement('div');
+    div.className = 'animation-card';
+
+    // Show category tag if we're in global search mode
+    const categoryTag = !currentCategory ? 
+        `<div class="category-tag">${CATEGORIES[animation.category]}</div>` : '';
+
+    // Use the server-rendered poster when there is one, and only fall back
+    // to a live player (which downloads the full Lottie JSON) when there isn't
+    const preview = animation.poster ?
+        `<img class="animation-poster" src="${animation.poster}" alt="${animation.name}" loading="lazy">` :
+        `<div class="player-slot"></div>`;
+
+    div.innerHTML = `
+        ${categoryTag}
+        <div class="preview-container">
+            ${preview}
+        </div>
+        <div class="animation-info">
+            <h3 class="animation-name" title="${animation.name}">${animation.name}</h3>
+        </div>
+    `;
+
+    hydrateAnimationCard(div, animation);
+    return div;
+}
+
+// Attach the behaviour of a card, for cards built above and for the ones
+// the server rendered into the first page (same markup)
+function hydrateAnimationCard(div, animation) {
+    // Only attach click handler to the main part, not any admin controls
+    const openPopupHandler = () => openPopup(animation.name, animation.path, animation.hashtags);
+
+    // Add delete button if in admin mode
+    const isAdmin = localStorage.getItem('isAdmin') === 'true';
+    if (isAdmin) {
+        div.insertAdjacentHTML('afterbegin', `<div class="admin-controls">
+            <button class="delete-animation-btn" title="Delete animation">
+                <svg xmlns="http://www.w3.org/2000/svg" width="16" height="16" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round">
+                    <polyline points="3 6 5 6 21 6"></polyline>
+                    <path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path>
+                    <line x1="10" y1="11" x2="10" y2="17"></line>
+                    <line x1="14" y1="11" x2="14" y2="17"></line>
+                </svg>
+            </button>
+        </div>`);
+    }
+
+    // Swap the poster for the animated preview while hovering
+    const poster = div.querySelector('.animation-poster');
+    if (poster) {
+        const previewContainer = div.querySelector('.preview-container');
+        previewContainer.addEventListener('mouseenter', () => {
+            if (animation.preview) poster.src = animation.preview;
+        });
+        previewContainer.addEventListener('mouseleave', () => {
+            poster.src = animation.poster;
+        });
+    }
+
+    // Add click event to the preview container and animation info
+    div.querySelector('.preview-container').addEventListener('click', openPopupHandler);
+    div.querySelector('.animation-info').addEventListener('click', openPopupHandler);
+
+    // Add click event for delete button if in admin mode
+    if (isAdmin) {
+        const deleteBtn = div.querySelector('.delete-animation-btn');
+        deleteBtn.addEventListener('click', (e) => {
+            e.stopPropagation(); // Prevent opening the popup
+            confirmDeleteAnimation(animation);
+        });
+    }
+}
+
+function debounce(func, wait) {
+    let timeout;
+    return function executedFunction(...args) {
+        const later = () => {
+            clearTimeout(timeout);
+            func(...args);
+        };
+        clearTimeout(timeout);
+        timeout = setTimeout(later, wait);
+    };
+}
+
+// Function to generate a shareable link for an animation
+function generateShareableLink(animation) {
+    if (!animation || !animation.category || !animation.name) {
+        return window.location.origin;
+    }
+
+    // Create URL with proper encoding to handle spaces and special characters
+    const baseUrl = window.location.origin;
+    const category = encodeURIComponent(animation.category);
+    const name = encodeURIComponent(animation.name);
+
+    return `${baseUrl}/?category=${category}&animation=${name}`;
+}
+
+// SVG export functionality
+let svgExportPlayer = null;
+let svgTotalFrames = 0;
+let svgFirstFrame = 0;
+let currentFrame = 0;
+
+function openSvgExportModal() {
+    if (!currentAnimation) {
+        alert('Please select an animation first');
+        return;
+    }
+
+    // Show the modal and prevent background scrolling
+    document.getElementById('svgExportModal').classList.add('active');
+    document.body.classList.add('no-scroll');
+
+    // Create a new lottie player for frame export
+    const svgPreviewContainer = document.getElementById('svgFramePreview');
+    svgPreviewContainer.innerHTML = '';
+
+    // Create a new container for our SVG rendering
+    const renderContainer = document.createElement('div');
+    renderContainer.id = 'renderContainer';
+    renderContainer.style.width = '100%';
+    renderContainer.style.height = '100%';
+    svgPreviewContainer.appendChild(renderContainer);
+
+    // Load the animation directly using lottie-web
+    getLottieData(currentAnimation.path)
+        .then(animationData => {
+            // Initialize lottie with SVG renderer
+            svgExportPlayer = lottie.loadAnimation({
+                container: renderContainer,
+                renderer: 'svg',
+                loop: false,
+                autoplay: false,
+                animationData: animationData
+            });
+
+            // Store animation data for direct frame rendering
+            const animation = svgExportPlayer;
+
+            // Get total frames; the slider counts from the animation's in point
+            svgTotalFrames = Math.floor(animation.totalFrames);
+            svgFirstFrame = Math.round(animationData.ip || 0);
+            document.getElementById('frameRangeStart').value = 0;
+            document.getElementById('frameRangeEnd').value = svgTotalFrames - 1;
+            document.getElementById('frameRangeStride').value = 1;
+
+            // Update slider max value
+            const frameSlider = document.getElementById('frameSlider');
+            frameSlider.max = svgTotalFrames - 1;
+            frameSlider.value = 0;
+            document.getElementById('frameValue').textContent = '0';
+
+            // Go to first frame
+            animation.goToAndStop(0, true);
+            currentFrame = 0;
+
+            // Add event listener to slider
+            frameSlider.addEventListener('input', function() {
+                currentFrame = parseInt(this.value);
+                document.getElementById('frameValue').textContent = currentFrame;
+                animation.goToAndStop(currentFrame, true);
+            });
+        })
+        .catch(error => {
+            console.error('Error loading animation:', error);
+            alert('Error loading animation. Please try again.');
+            closeSvgExportModal();
+        });
+}
+
+function closeSvgExportModal() {
+    document.getElementById('svgExportModal').classList.remove('active');
+    document.body.classList.remove('no-scroll');
+
+    // Reset reference
+    svgExportPlayer = null;
+
+    // Clear the container
+    const svgPreviewContainer = document.getElementById('svgFramePreview');
+    if (svgPreviewContainer) {
+        svgPreviewContainer.innerHTML = '';
+    }
+}
+
+// Helper function to get the prepared SVG string
+function getPrepareSvgString() {
+    if (!svgExportPlayer) {
+        alert('No preview available');
+        return null;
+    }
+
+    try {
+        // Get the SVG element directly from the render container
+        const svgElement = document.getElementById('renderContainer').querySelector('svg');
+        if (!svgElement) {
+            alert('No SVG element found. Please try again.');
+            return null;
+        }
+
+        // Clone the SVG to avoid modifying the original
+        const svgClone = svgElement.cloneNode(true);
+
+        // Add the xmlns attribute required for standalone SVGs
+        svgClone.setAttribute('xmlns', 'http://www.w3.org/2000/svg');
+        svgClone.setAttribute('width', '100%');
+        svgClone.setAttribute('height', '100%');
+        svgClone.setAttribute('viewBox', svgElement.getAttribute('viewBox') || '0 0 512 512');
+
+        // Clean up any script tags
+        const scripts = svgClone.querySelectorAll('script');
+        scripts.forEach(script => script.remove());
+
+        // Convert to string
+        return new XMLSerializer().serializeToString(svgClone);
+    } catch (error) {
+        console.error('Error preparing SVG:', error);
+        alert('Error preparing SVG: ' + error.message);
+        return null;
+    }
+}
+
+function copySvgToClipboard() {
+    const svgString = getPrepareSvgString();
+    if (!svgString) return;
+
+    try {
+        // First attempt: Modern clipboard API
+        if (navigator.clipboard && navigator.clipboard.writeText) {
+            navigator.clipboard.writeText(svgString)
+                .then(() => showSvgSuccess('copied to clipboard'))
+                .catch(err => {
+                    console.warn('Clipboard API failed, trying fallback:', err);
+                    // Fallback for public URLs: Create a temporary textarea
+                    copyWithFallback(svgString);
+                });
+        } else {
+            // Fallback for browsers without clipboard API
+            copyWithFallback(svgString);
+        }
+    } catch (error) {
+        console.error('Error copying SVG:', error);
+
+        // Show error with alternative option
+        const message = document.getElementById('message');
+        message.innerHTML = `<div>Unable to copy SVG directly. <button id="svgDownloadBtn" class="inline-btn">Download instead</button></div>`;
+        message.className = 'warning';
+        message.style.display = 'block';
+
+        // Add event listener to the download button
+        document.getElementById('svgDownloadBtn').addEventListener('click', () => exportSvgFrame());
+
+        setTimeout(() => message.style.display = 'none', 5000);
+    }
+}
+
+function copyWithFallback(text) {
+    // Create temporary textarea element
+    const textarea = document.createElement('textarea');
+    textarea.value = text;
+    textarea.style.position = 'fixed';  // Prevent scrolling to bottom
+    document.body.appendChild(textarea);
+    textarea.focus();
+    textarea.select();
+
+    try {
+        // Execute copy command
+        const successful = document.execCommand('copy');
+        if (successful) {
+            showSvgSuccess('copied to clipboard');
+        } else {
+            throw new Error('Copy command failed');
+        }
+    } catch (err) {
+        console.error('Fallback copy failed:', err);
+        // Offer download as alternative
+        const message = document.getElementById('message');
+        message.innerHTML = `<div>Clipboard access denied. <button id="svgDownloadBtn" class="inline-btn">Download instead</button></div>`;
+        message.className = 'warning';
+        message.style.display = 'block';
+
+        // Add event listener to the download button
+        document.getElementById('svgDownloadBtn').addEventListener('click', () => exportSvgFrame());
+    } finally {
+        // Clean up
+        document.body.removeChild(textarea);
+    }
+}
+
+function showSvgSuccess(action) {
+    // Show success message
+    const message = document.getElementById('message');
+    message.textContent = `SVG ${action}: Frame ${currentFrame}`;
+    message.className = 'success';
+    message.style.display = 'block';
+    setTimeout(() => message.style.display = 'none', 3000);
+}
+
+// Server-side SVG export: start a job, poll it while it renders, then download the result.
+// Resolves to false when the server can't render SVGs, so callers can fall back.
+async function runServerSvgExport(options, button) {
+    const originalText = button ? button.textContent : '';
+    if (button) button.disabled = true;
+    try {
+        const response = await fetch('/api/export-jobs', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            body: JSON.stringify({ category: currentAnimation.category, name: currentAnimation.name, ...options })
+        });
+        if (response.status === 501) return false;
+        let job = await response.json();
+        while (job.success && (job.status === 'queued' || job.status === 'running')) {
+            if (button) button.textContent = job.frames > 1 ? `Rendering ${job.frames_done}/${job.frames}...` : 'Rendering...';
+            await new Promise(resolve => setTimeout(resolve, 500));
+            job = await (await fetch(job.status_url)).json();
+        }
+        if (!job.success || job.status !== 'done') {
+            throw new Error(job.error || 'Export failed');
+        }
+
+        const a = document.createElement('a');
+        a.href = job.download_url;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        return true;
+    } finally {
+        if (button) {
+            button.textContent = originalText;
+            button.disabled = false;
+        }
+    }
+}
+
+async function exportSvgFrame(button) {
+    try {
+        const frame = svgFirstFrame + currentFrame;
+        if (await runServerSvgExport({ start: frame, end: frame }, button)) {
+            showSvgSuccess('exported');
+            closeSvgExportModal();
+            return;
+        }
+    } catch (error) {
+        console.error('Error exporting SVG:', error);
+        alert('Error exporting SVG: ' + error.message);
+        return;
+    }
+    // The server has no SVG renderer; capture the frame from the preview instead
+    exportSvgFrameFromPreview();
+}
+
+async function exportSvgFrameRange(button) {
+    const start = parseInt(document.getElementById('frameRangeStart').value) || 0;
+    const end = parseInt(document.getElementById('frameRangeEnd').value) || 0;
+    const stride = Math.max(parseInt(document.getElementById('frameRangeStride').value) || 1, 1);
+    try {
+        const exported = await runServerSvgExport({ start: svgFirstFrame + start, end: svgFirstFrame + end, stride }, button);
+        if (!exported) {
+            alert('Frame range export is not available on this server');
+            return;
+        }
+        const message = document.getElementById('message');
+        message.textContent = `SVG frames ${start}-${end} exported`;
+        message.className = 'success';
+        message.style.display = 'block';
+        setTimeout(() => message.style.display = 'none', 3000);
+    } catch (error) {
+        console.error('Error exporting SVG frames:', error);
+        alert('Error exporting SVG frames: ' + error.message);
+    }
+}
+
+function exportSvgFrameFromPreview() {
+    const svgString = getPrepareSvgString();
+    if (!svgString) return;
+
+    try {
+        // Create a Blob from the SVG string
+        const blob = new Blob([svgString], {type: 'image/svg+xml'});
+
+        // Create a download link and trigger download
+        const name = currentAnimation.name || 'animation';
+        const url = URL.createObjectURL(blob);
+        const a = document.createElement('a');
+        a.href = url;
+        a.download = `${name}_frame_${currentFrame}.svg`;
+        document.body.appendChild(a);
+        a.click();
+        document.body.removeChild(a);
+        URL.revokeObjectURL(url);
+
+        // Show success message using the shared function
+        showSvgSuccess('exported');
+
+        // Close the modal
+        closeSvgExportModal();
+    } catch (error) {
+        console.error('Error exporting SVG:', error);
+        alert('Error exporting SVG: ' + error.message);
+    }
+}
+
+// Handle direct animation links (from shared URLs)
+async function handleSharedAnimation(category, animationName) {
+    // Decode URI components to handle spaces and special characters
+    const decodedCategory = decodeURIComponent(category);
+    const decodedName = decodeURIComponent(animationName);
+
+    // Set current category and update UI
+    currentCategory = decodedCategory;
+    document.querySelectorAll('.category-btn').forEach(btn => {
+        if (btn.dataset.category === decodedCategory) {
+            btn.classList.add('active');
+        } else {
+            btn.classList.remove('active');
+        }
+    });
+
+    // Make sure grid is visible
+    document.querySelector('.container').classList.add('active');
+    document.getElementById('animationGrid').style.display = 'grid';
+
+    // Load animations for this category
+    currentPage = 1; // Reset page number
+    releaseGridPreviews();
+    document.getElementById('animationGrid').innerHTML = ''; // Clear existing animations
+
+    loadMoreAnimations();
+
+    // The manifest knows the animation's current file; without it, guess the usual path
+    const manifestEntry = await getManifestEntry(decodedCategory, decodedName);
+    const animationPath = manifestEntry ? manifestEntry.path :
+        `/static/animations/${decodedCategory}/lottie/${decodedName}.json`;
+
+    // Try to load the animation directly
+    setTimeout(() => {
+        // Delay slightly to allow animations to load
+        // Find the animation in the loaded grid
+        let found = false;
+        document.querySelectorAll('.animation-card .animation-name').forEach(nameElement => {
+            if (nameElement.textContent === decodedName) {
+                // Trigger click on this animation's card
+                nameElement.closest('.animation-card').click();
+                found = true;
+            }
+        });
+
+        if (!found) {
+            // Just open with the path directly
+            openPopup(decodedName, animationPath, []);
+        }
+    }, 1000);
+}
+
+// Setup the share button event listener
+function setupShareButton() {
+    const shareLinkBtn = document.getElementById('shareLinkBtn');
+    const shareTooltip = document.getElementById('shareTooltip');
+
+    if (shareLinkBtn) {
+        // Remove any existing event listeners by cloning and replacing
+        const newBtn = shareLinkBtn.cloneNode(true);
+        shareLinkBtn.parentNode.replaceChild(newBtn, shareLinkBtn);
+
+        newBtn.addEventListener('click', function() {
+            // Generate a shareable link for the current animation
+            const shareableLink = generateShareableLink(currentAnimation);
+
+            // Copy link to clipboard
+            navigator.clipboard.writeText(shareableLink).then(() => {
+                // Show tooltip
+                shareTooltip.classList.add('visible');
+
+                // Hide tooltip after 2 seconds
+                setTimeout(() => {
+                    shareTooltip.classList.remove('visible');
+                }, 2000);
+            }).catch(err => {
+                console.error('Could not copy text: ', err);
+                alert('Failed to copy link to clipboard');
+            });
+        });
+    }
+
+    // Setup background toggle
+    const backgroundToggle = document.getElementById('backgroundToggle');
+    const previewContainer = document.getElementById('previewContainer');
+    const lottiePlayer = document.getElementById('popupPlayer');
+
+    if (backgroundToggle && previewContainer && lottiePlayer) {
+        backgroundToggle.addEventListener('change', function() {
+            if (this.checked) {
+                previewContainer.classList.add('dark-mode');
+                // Change lottie player background to dark
+                lottiePlayer.setAttribute('background', '#202124');
+            } else {
+                previewContainer.classList.remove('dark-mode');
+                // Change lottie player background to light
+                lottiePlayer.setAttribute('background', '#f0f0f0');
+            }
+        });
+
+        // Initialize with the correct background
+        lottiePlayer.setAttribute('background', '#f0f0f0');
+    }
+}
+
+// Animation delete functionality
+let animationToDelete = null;
+
+function setupDeleteConfirmation() {
+    // Set up event listeners for the delete confirmation modal
+    document.getElementById('cancelDeleteBtn').addEventListener('click', function() {
+        document.getElementById('deleteConfirmModal').classList.remove('active');
+        document.body.classList.remove('no-scroll');
+        animationToDelete = null;
+    });
+
+    document.getElementById('confirmDeleteBtn').addEventListener('click', function() {
+        deleteAnimation();
+    });
+}
+
+function confirmDeleteAnimation(animation) {
+    // Store the animation to delete
+    animationToDelete = animation;
+
+    // Update the modal with animation details
+    document.getElementById('deleteAnimationName').textContent = animation.name;
+
+    // Show the modal and prevent background scrolling
+    document.getElementById('deleteConfirmModal').classList.add('active');
+    document.body.classList.add('no-scroll');
+}
+
+function deleteAnimation() {
+    if (!animationToDelete) return;
+
+    // Show loading message
+    const message = document.getElementById('message');
+    message.textContent = 'Deleting animation...';
+    message.className = 'info';
+    message.style.display = 'block';
+
+    // Send delete request to server
+    fetch(`/api/delete-animation`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+            name: animationToDelete.name,
+            category: animationToDelete.category
+        })
+    })
+    .then(response => response.json())
+    .then(data => {
+        if (data.success) {
+            message.textContent = 'Animation deleted successfully';
+            message.className = 'success';
+
+            // Remove the animation card from the grid
+            const cards = document.querySelectorAll('.animation-card');
+            cards.forEach(card => {
+                const nameElement = card.querySelector('.animation-name');
+                if (nameElement && nameElement.textContent === animationToDelete.name) {
+                    releaseGridPreview(card);
+                    card.remove();
+                }
+            });
+
+            // Close the popup if it's open
+            if (currentAnimation && currentAnimation.name === animationToDelete.name) {
+                closePopup();
+            }
+            refreshCategoryCounts();
+        } else {
+            message.textContent = data.error || 'Failed to delete animation';
+            message.className = 'error';
+        }
+    })
+    .catch(error => {
+        console.error('Error deleting animation:', error);
+        message.textContent = 'Error deleting animation';
+        message.className = 'error';
+    })
+    .finally(() => {
+        // Hide message after a delay
+        setTimeout(() => {
+            message.style.display = 'none';
+        }, 3000);
+
+        // Reset animation to delete
+        animationToDelete = null;
+
+        // Close the modal
+        document.getElementById('deleteConfirmModal').classList.remove('active');
+        document.body.classList.remove('no-scroll');
+    });
+}
@@ -0,0 +1,36 @@
+// Service worker for the library. Files requested with their content version
+// (?v=<hash>) never change, so once fetched they are answered from Cache
+// Storage without touching the network. The page removes the copies the
+// manifest no longer lists (see syncManifest in index.js).
+const ASSET_CACHE = 'lootbox-assets-v1';
+
+self.addEventListener('install', () => self.skipWaiting());
+
+self.addEventListener('activate', event => {
+    // Drop caches left behind by earlier versions of this worker
+    event.waitUntil(
+        caches.keys()
+            .then(names => Promise.all(names
+                .filter(name => name.startsWith('lootbox-') && name !== ASSET_CACHE)
+                .map(name => caches.delete(name))))
+            .then(() => self.clients.claim())
+    );
+});
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+    if (request.method !== 'GET' || url.origin !== self.location.origin) return;
+    if (!url.pathname.startsWith('/static/') || !url.searchParams.has('v')) return;
+    // Lottie JSON is kept parsed in IndexedDB by the page, and partial
+    // responses can't be stored, so those go straight to the network
+    if (url.pathname.endsWith('.json') || request.headers.has('Range')) return;
+
+    event.respondWith(caches.open(ASSET_CACHE).then(async cache => {
+        const cached = await cache.match(request);
+        if (cached) return cached;
+        const response = await fetch(request);
+        if (response.status === 200) cache.put(request, response.clone());
+        return response;
+    }));
+});
@@ -0,0 +1,53 @@
+"""Frame rendering for server-side SVG export (see start_svg_export in app.py).
+
+Runs in the export process pool, which is started with forkserver or spawn
+rather than fork: the server process holds locks and database handles in
+other threads that a forked child would inherit mid-use. Importing app.py
+would build the whole catalog, so the worker lives here and only deals in
+paths and parameters.
+"""
+import io
+import json
+import os
+import time
+import uuid
+import zipfile
+
+
+def write_job_record(record_path, record):
+    """Replace a job record, so readers never see it half written"""
+    record['updated'] = time.time()
+    tmp_path = f'{record_path}.{uuid.uuid4().hex}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(record, f)
+    os.replace(tmp_path, record_path)
+
+
+def render_svg_export(source_path, output_path, record_path, record):
+    """Render the job's frames to one SVG, or a zip of SVGs"""
+    from lottie.objects import Animation
+    from lottie.exporters.svg import export_svg
+
+    with open(source_path, encoding='utf-8') as f:
+        document = Animation.load(json.load(f))
+    frames = range(record['start'], record['end'] + 1, record['stride'])
+    record['status'] = 'running'
+    write_job_record(record_path, record)
+
+    tmp_path = f'{output_path}.{uuid.uuid4().hex}.tmp'
+    if len(frames) == 1:
+        with open(tmp_path, 'wb') as f:
+            export_svg(document, f, frame=frames[0], pretty=False)
+    else:
+        with zipfile.ZipFile(tmp_path, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for done, frame in enumerate(frames, 1):
+                svg = io.BytesIO()
+                export_svg(document, svg, frame=frame, pretty=False)
+                archive.writestr(f"{record['name']}_frame_{frame:05d}.svg", svg.getvalue())
+                if done % 10 == 0:
+                    record['frames_done'] = done
+                    write_job_record(record_path, record)
+    os.replace(tmp_path, output_path)
+
+    record.update(status='done', frames_done=len(frames), size=os.path.getsize(output_path))
+    write_job_record(record_path, record)